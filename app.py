@@ -1,39 +1,59 @@
 import gradio as gr
-from langgraph_rag import chat, chat_neo4j
+from typing import Dict
+from conversation_memory import ConversationMemory
+from langgraph_rag import achat_stream, achat_vector_stream, achat_neo4j_stream, warm_up
 
-chat_history_memory = []
+# Số request xử lý đồng thời và độ dài hàng đợi của Gradio
+CONCURRENCY_LIMIT = 16
+MAX_QUEUE_SIZE = 256
+
+# Lịch sử hội thoại riêng cho từng phiên (theo session_hash của Gradio)
+session_histories: Dict[str, ConversationMemory] = {}
 
 with gr.Blocks(title="📱 Phone Specs Chatbot") as demo:
     gr.Markdown("## 🤖 Trợ lý AI - Hỏi gì về điện thoại cũng biết!")
 
     chatbot = gr.Chatbot()
     msg = gr.Textbox(placeholder="Nhập câu hỏi về điện thoại...", label="Bạn hỏi:")
-    mode = gr.Radio(["Vector Search (RAG)", "Cypher Query (Graph)"], value="Vector Search (RAG)", label="Chế độ trả lời")
+    mode = gr.Radio(["Vector Search (RAG)", "Cypher Query (Graph)", "Hybrid (Graph + Vector)"], value="Vector Search (RAG)", label="Chế độ trả lời")
     clear = gr.Button("🧹 Xoá hội thoại")
 
-    def respond(user_input, history_ui, selected_mode):
-        global chat_history_memory
+    async def respond(user_input, history_ui, selected_mode, request: gr.Request):
+        history = session_histories.get(request.session_hash)
+        if history is None:
+            # Bộ nhớ có giới hạn token: prompt không lớn dần theo độ dài phiên
+            history = session_histories[request.session_hash] = ConversationMemory()
 
         if selected_mode == "Vector Search (RAG)":
-            result = chat(user_input, chat_history_memory)
-            response = result  # Sửa ở đây
-            # chat_history_memory = result["chat_history"]  # Nếu cần lưu history, tự xử lý thêm
+            chunks = achat_vector_stream(user_input, history)
+        elif selected_mode == "Hybrid (Graph + Vector)":
+            # Template, đồ thị và vector chạy song song (xem ahybrid_retrieve)
+            chunks = achat_stream(user_input, history)
         else:  # dùng Cypher
-            results = chat_neo4j(user_input)
-            if not results:
-                response = "Không tìm thấy kết quả phù hợp."
-            else:
-                response = "\n".join([str(r) for r in results])
+            chunks = achat_neo4j_stream(user_input)
 
+        # Hiện câu hỏi ngay, sau đó cập nhật câu trả lời theo từng đoạn nhận được
+        response = ""
         history_ui.append((user_input, response))
-        return "", history_ui
-
-    def clear_all():
-        global chat_history_memory
-        chat_history_memory = []
+        yield "", history_ui
+        async for chunk in chunks:
+            response += chunk
+            history_ui[-1] = (user_input, response)
+            yield "", history_ui
+
+    def clear_all(request: gr.Request):
+        session_histories.pop(request.session_hash, None)
         return []
 
-    msg.submit(respond, [msg, chatbot, mode], [msg, chatbot])
+    def drop_session(request: gr.Request):
+        # Giải phóng lịch sử khi người dùng đóng trang
+        session_histories.pop(request.session_hash, None)
+
+    msg.submit(respond, [msg, chatbot, mode], [msg, chatbot], concurrency_limit=CONCURRENCY_LIMIT)
     clear.click(clear_all, outputs=chatbot)
+    demo.unload(drop_session)
 
+# Kết nối Neo4j, tạo LLM và nạp cache trong nền trong lúc Gradio khởi động
+warm_up()
+demo.queue(max_size=MAX_QUEUE_SIZE)
 demo.launch()
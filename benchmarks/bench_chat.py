@@ -0,0 +1,386 @@
+"""Replay a question corpus through the chat pipeline and check for latency regressions.
+
+The LLM is a deterministic stub with configurable latencies, each with its
+own baseline (the 1000ms level exposes extra LLM calls that only pay off when
+the LLM is fast). The graph is either the embedded in-memory graph or a stub
+Neo4j driver that counts round-trips. For every concurrency level the
+benchmark reports latency percentiles, throughput, LLM requests and prompts
+per question (a batch of prompts is one request) and DB round-trips per
+question, then compares them with a stored baseline and exits with status 1
+on regression.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chat --backend stub --concurrency 1 4 16
+    python -m benchmarks.bench_chat --update-baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+from benchmarks.bench_etl import synthetic_catalog
+from model_specs import CATALOG_SPECS_QUERY, spec_properties
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline_chat.json")
+# Độ lệch tuyệt đối cho phép, để các câu trả lời từ cache (vài ms) không báo nhầm
+LATENCY_SLACK_MS = 5.0
+
+# Câu hỏi trong README, các ví dụ few-shot của prompt Cypher và các câu hỏi tự do
+QUESTIONS = [
+    "Các điện thoại nào có cân nặng 194g?",
+    "Điện thoại Samsung nào có RAM 8GB?",
+    "Các mẫu iPhone ra mắt năm 2024?",
+    "Điện thoại nào giá dưới PKR 200,000?",
+    "Điện thoại nào của Samsung có RAM 8GB?",
+    "Điện thoại nào có camera sau 50MP?",
+    "Điện thoại nào có pin trên 4000mAh và màn hình từ 6.5 inches?",
+    "Điện thoại nào có pin 5000mAh?",
+    "Điện thoại nào có màn hình 6.7 inches?",
+    "Điện thoại nào có processor Snapdragon 8 Gen 2?",
+    "Giá trung quốc của điện thoại iPhone 15 Pro 128GB là bao nhiêu?",
+    "Thông tin chi tiết điện thoại iPhone 15 Pro 128GB.",
+    "Xiaomi RAM 12GB ra mắt năm 2023",
+    "Điện thoại pin trên 5000mAh giá dưới INR 30,000",
+    "So sánh iPhone 15 và Galaxy S24",
+    "Tư vấn điện thoại chụp ảnh đẹp dưới PKR 150,000",
+    "Điện thoại nào chơi game tốt nhất?",
+    "Xin chào, bạn giúp mình chọn điện thoại được không?",
+    "Which Apple phones were launched in 2024?",
+    "Samsung phones under USD 500",
+    "Phones with battery above 5000mAh",
+    "Phones with screen from 6.8 inches launched after 2022",
+    "What is the lightest phone?",
+    "Compare Pixel 8 and OnePlus 12",
+    "Recommend a phone for photography",
+    "Thanks for your help!",
+]
+
+class StubMessage:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+
+class StubLLM:
+    """Deterministic stand-in for ChatOpenAI: fixed latency, canned answers.
+
+    ``calls`` counts provider requests (a batch is one request), ``prompts``
+    counts the prompts sent in them.
+    """
+
+    def __init__(self, latency_ms=200.0, tokens=20):
+        self.latency = latency_ms / 1000
+        self.tokens = tokens
+        self.calls = 0
+        self.prompts = 0
+
+    def _answer(self, prompt):
+        text = str(prompt)
+        if "Cypher query:" in text:
+            # Mỗi câu hỏi luôn dịch ra cùng một truy vấn
+            question = text.rsplit("Câu hỏi:", 1)[-1]
+            return f"MATCH (m:Model) WHERE m.name CONTAINS '{zlib.crc32(question.encode()) % 97}' RETURN m.name AS model"
+        return "Đây là câu trả lời mẫu. " * (self.tokens // 5)
+
+    def _chunks(self, prompt):
+        words = self._answer(prompt).split(" ")
+        return [StubMessage(word + " ") for word in words]
+
+    def invoke(self, prompt):
+        self.calls += 1
+        self.prompts += 1
+        time.sleep(self.latency)
+        return StubMessage(self._answer(prompt))
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        self.prompts += 1
+        await asyncio.sleep(self.latency)
+        return StubMessage(self._answer(prompt))
+
+    def batch(self, prompts, return_exceptions=False):
+        self.calls += 1
+        self.prompts += len(prompts)
+        time.sleep(self.latency)
+        return [StubMessage(self._answer(prompt)) for prompt in prompts]
+
+    async def abatch(self, prompts, return_exceptions=False):
+        self.calls += 1
+        self.prompts += len(prompts)
+        await asyncio.sleep(self.latency)
+        return [StubMessage(self._answer(prompt)) for prompt in prompts]
+
+    def stream(self, prompt):
+        self.calls += 1
+        self.prompts += 1
+        chunks = self._chunks(prompt)
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+    async def astream(self, prompt):
+        self.calls += 1
+        self.prompts += 1
+        chunks = self._chunks(prompt)
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+
+class StubRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+class StubSummary:
+    result_available_after = 0
+    result_consumed_after = 0
+    # Kế hoạch của EXPLAIN (cypher_guard)
+    plan = {"operatorType": "ProduceResults@neo4j", "arguments": {"EstimatedRows": 3.0}, "children": []}
+
+class StubResult:
+    def __init__(self, rows):
+        self.records = [StubRecord(row) for row in rows]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    async def _aiter(self):
+        for record in self.records:
+            yield record
+
+    def __aiter__(self):
+        return self._aiter()
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def consume(self):
+        return StubSummary()
+
+class AsyncStubResult(StubResult):
+    async def consume(self):
+        return StubSummary()
+
+class StubSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def _rows(self, query):
+        self.driver.round_trips += 1
+        if "CatalogVersion" in query:
+            return [{"version": 1}]
+        if query == self.driver.catalog_query:
+            return self.driver.catalog
+        # Khoảng 1/4 truy vấn không có kết quả để đi vào nhánh fallback
+        count = 0 if zlib.crc32(query.encode()) % 4 == 0 else 3
+        return [{"model": f"Phone {i}"} for i in range(count)]
+
+    def run(self, query, params=None):
+        if self.driver.asynchronous:
+            return self._arun(query)
+        time.sleep(self.driver.latency)
+        return StubResult(self._rows(query))
+
+    async def _arun(self, query):
+        await asyncio.sleep(self.driver.latency)
+        return AsyncStubResult(self._rows(query))
+
+class StubDriver:
+    """Neo4j driver stand-in with fixed latency per query; counts round-trips"""
+
+    def __init__(self, latency_ms=5.0, asynchronous=False, catalog=()):
+        self.latency = latency_ms / 1000
+        self.asynchronous = asynchronous
+        self.round_trips = 0
+        # Thuộc tính thông số của các node Model, trả về cho truy vấn đọc toàn catalog (recommender)
+        self.catalog = list(catalog)
+        self.catalog_query = CATALOG_SPECS_QUERY
+
+    def session(self, **kwargs):
+        return StubSession(self)
+
+    def verify_connectivity(self):
+        return None
+
+def configure(rag, backend, csv_file, llm_latency_ms, db_latency_ms):
+    """Point langgraph_rag at the stubs; returns (llm, drivers)"""
+    from langchain_core.prompts import PromptTemplate
+    from etl import clean_frame, read_csv_data
+    from extract_entities import extract_unique_entities
+    from intent_router import IntentRouter
+
+    llm = StubLLM(llm_latency_ms)
+    rag.llm = llm
+    rag.cypher_prompt_template = PromptTemplate.from_template(rag.CYPHER_PROMPT)
+    rag.CATALOG_CSV = csv_file
+    rag.intent_router = IntentRouter(extract_unique_entities(csv_file))
+    # Catalog tĩnh: bỏ kiểm tra version theo thời gian để số round-trip ổn định giữa các lần chạy
+    rag.result_cache.version_check_interval = float("inf")
+    drivers = []
+    if backend == "embedded":
+        rag.GRAPH_BACKEND = "embedded"
+        rag.get_embedded_graph()
+    else:
+        rag.GRAPH_BACKEND = "neo4j"
+        rag.NEO4J_URL = "bolt://stub"
+        df = clean_frame(read_csv_data(csv_file))
+        catalog = [
+            {"model": row["Model Name"], **{prop: row[column] or None for column, prop in spec_properties.items()}}
+            for row in df.to_dict("records")
+        ]
+        rag.driver = StubDriver(db_latency_ms, catalog=catalog)
+        rag.async_driver = StubDriver(db_latency_ms, asynchronous=True)
+        drivers = [rag.driver, rag.async_driver]
+    return llm, drivers
+
+def reset(rag, llm, drivers):
+    from tracing import Tracer
+
+    rag.translation_cache.clear()
+    rag.result_cache.clear()
+    rag.cypher_guard.clear()
+    rag.tracer = Tracer()
+    llm.calls = llm.prompts = 0
+    for driver in drivers:
+        driver.round_trips = 0
+
+async def replay(rag, questions, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ask(question):
+        async with semaphore:
+            await rag.achat(question)
+
+    await asyncio.gather(*(ask(question) for question in questions))
+
+def run_level(rag, llm, drivers, questions, concurrency, verbose=False):
+    reset(rag, llm, drivers)
+    # achat() in Cypher và thời gian từng câu; ẩn đi trừ khi --verbose
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output:
+        asyncio.run(replay(rag, questions, concurrency))
+    elapsed = time.perf_counter() - started
+    total = rag.tracer.percentiles()["total"]
+    return {
+        "p50_ms": total["p50"],
+        "p95_ms": total["p95"],
+        "p99_ms": total["p99"],
+        "throughput_qps": len(questions) / elapsed,
+        "llm_calls_per_question": llm.calls / len(questions),
+        "llm_prompts_per_question": llm.prompts / len(questions),
+        "db_round_trips_per_question": sum(d.round_trips for d in drivers) / len(questions),
+    }
+
+# Số request LLM phụ thuộc thời điểm các câu dịch tới (có lô nào đang chạy hay không), nên được so
+# như độ trễ; số prompt và số round-trip DB không phụ thuộc thời gian nên phải khớp tuyệt đối
+TIMING_DEPENDENT_COUNTS = {"llm_calls_per_question"}
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline`` (timings and request counts within tolerance, other counts exact)"""
+    regressions = []
+    for level, metrics in results.items():
+        expected = baseline.get(level)
+        if expected is None:
+            continue
+        for key, value in metrics.items():
+            if key not in expected:
+                continue
+            limit = expected[key]
+            if key.endswith("_ms") and value > limit * (1 + tolerance) + LATENCY_SLACK_MS:
+                regressions.append(f"c={level} {key}: {value:.1f} > {limit:.1f} (+{tolerance:.0%})")
+            elif key == "throughput_qps" and value < limit * (1 - tolerance):
+                regressions.append(f"c={level} {key}: {value:.1f} < {limit:.1f} (-{tolerance:.0%})")
+            elif key in TIMING_DEPENDENT_COUNTS and value > limit * (1 + tolerance) + 1e-9:
+                regressions.append(f"c={level} {key}: {value:.2f} > {limit:.2f} (+{tolerance:.0%})")
+            elif key.endswith("_per_question") and key not in TIMING_DEPENDENT_COUNTS and value > limit + 1e-9:
+                regressions.append(f"c={level} {key}: {value:.2f} > {limit:.2f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["stub", "embedded"], default="stub")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus per level")
+    # 200ms: LLM nhanh; 1000ms: độ trễ thực tế của API, nơi lời gọi LLM đoán trước (hedge) lộ ra
+    parser.add_argument("--llm-latency-ms", type=float, nargs="+", default=[200.0, 1000.0])
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--rows", type=int, default=1000, help="catalog size (router vocabularies, embedded graph)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="keep the per-question log of achat()")
+    args = parser.parse_args()
+
+    import langgraph_rag as rag
+
+    questions = QUESTIONS * args.repeat
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "catalog.csv")
+        synthetic_catalog(args.rows).to_csv(csv_file, index=False)
+        for llm_latency_ms in args.llm_latency_ms:
+            llm, drivers = configure(rag, args.backend, csv_file, llm_latency_ms, args.db_latency_ms)
+            key = f"{args.backend}/llm={llm_latency_ms:g}/db={args.db_latency_ms:g}/repeat={args.repeat}"
+            runs[key] = {
+                str(concurrency): run_level(rag, llm, drivers, questions, concurrency, args.verbose)
+                for concurrency in args.concurrency
+            }
+
+    for key, results in runs.items():
+        print(f"\n{key}: {len(questions)} questions per level")
+        print(f"{'concurrency':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/s':>8} {'LLM/q':>7} {'prompt/q':>9} {'DB/q':>7}")
+        for level, m in results.items():
+            print(f"{level:>11} {m['p50_ms']:>9.1f} {m['p95_ms']:>9.1f} {m['p99_ms']:>9.1f} "
+                  f"{m['throughput_qps']:>8.1f} {m['llm_calls_per_question']:>7.2f} {m['llm_prompts_per_question']:>9.2f} "
+                  f"{m['db_round_trips_per_question']:>7.2f}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines.update(runs)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nBaseline {', '.join(runs)} written to {args.baseline}")
+        return
+
+    regressions = []
+    for key, results in runs.items():
+        if key not in baselines:
+            print(f"\nNo baseline for {key}; run with --update-baseline to create one")
+            continue
+        regressions += [f"{key} {regression}" for regression in compare(results, baselines[key], args.tolerance)]
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against baseline")
+
+if __name__ == "__main__":
+    main()
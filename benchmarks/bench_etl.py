@@ -0,0 +1,84 @@
+"""Compare the single-pass ETL (etl.py) with the row-wise extraction scripts.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_etl --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+import etl
+from create_relationships import generate_relationship_queries
+from extract_entities import extract_unique_entities
+
+CSV_FILE = "data/Mobiles-Dataset(2025).csv"
+
+def synthetic_catalog(rows, seed=0):
+    """Enlarge the real catalog (or a generated one) to ``rows`` rows with unique model names"""
+    rng = random.Random(seed)
+    if os.path.exists(CSV_FILE):
+        base = etl.read_csv_data(CSV_FILE)
+    else:
+        companies = ["Apple", "Samsung", "Xiaomi", "Oppo", "Vivo", "Google"]
+        base = pd.DataFrame({
+            'Company Name': [rng.choice(companies) for _ in range(1000)],
+            'Model Name': [f"Phone {i} {rng.choice([128, 256, 512])}GB" for i in range(1000)],
+            'Mobile Weight': [f"{rng.randint(150, 240)}g" for _ in range(1000)],
+            'RAM': [f"{rng.choice([4, 6, 8, 12, 16])}GB" for _ in range(1000)],
+            'Front Camera': [f"{rng.choice([8, 12, 16, 32])}MP" for _ in range(1000)],
+            'Back Camera': [f"{rng.choice([12, 48, 50, 108, 200])}MP" for _ in range(1000)],
+            'Processor': [rng.choice(["A17 Bionic", "Snapdragon 8 Gen 3", "Dimensity 9300", "Helio G99"]) for _ in range(1000)],
+            'Battery Capacity': [f"{rng.randint(30, 60) * 100:,}mAh" for _ in range(1000)],
+            'Screen Size': [f"{rng.choice(['6.1', '6.5', '6.7', '6.8'])} inches" for _ in range(1000)],
+            'Launched Price (Pakistan)': [f"PKR {rng.randint(30, 600) * 1000:,}" for _ in range(1000)],
+            'Launched Price (India)': [f"INR {rng.randint(10, 200) * 1000:,}" for _ in range(1000)],
+            'Launched Price (China)': [f"CNY {rng.randint(1, 15) * 1000:,}" for _ in range(1000)],
+            'Launched Price (USA)': [f"USD {rng.randint(100, 1600):,}" for _ in range(1000)],
+            'Launched Price (Dubai)': [f"AED {rng.randint(400, 6000):,}" for _ in range(1000)],
+            'Launched Year': [rng.choice([2021, 2022, 2023, 2024, 2025]) for _ in range(1000)],
+        })
+    repeats = -(-rows // len(base))
+    df = pd.concat([base] * repeats, ignore_index=True).iloc[:rows].copy()
+    df['Model Name'] = df['Model Name'].astype(str) + " #" + df.index.astype(str)
+    return df
+
+def bench_legacy(csv_file):
+    started = time.perf_counter()
+    entities = extract_unique_entities(csv_file)
+    queries = generate_relationship_queries(etl.read_csv_data(csv_file))
+    relationships = sum(1 for query in queries if query.startswith("MATCH"))
+    return time.perf_counter() - started, sum(len(v) for v in entities.values()), relationships
+
+def bench_etl(csv_file):
+    started = time.perf_counter()
+    _, entities, relationships = etl.run_etl(csv_file)
+    queries = etl.generate_relationship_queries(relationships)
+    return time.perf_counter() - started, sum(len(v) for v in entities.values()), len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the new ETL")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "catalog.csv")
+        synthetic_catalog(args.rows).to_csv(csv_file, index=False)
+        print(f"Synthetic catalog: {args.rows} rows")
+
+        results = {"etl": bench_etl(csv_file)}
+        if not args.skip_legacy:
+            results["legacy"] = bench_legacy(csv_file)
+
+    print(f"\n{'pipeline':<10} {'seconds':>10} {'rows/sec':>12} {'entities':>10} {'relationships':>14}")
+    for name, (seconds, entities, relationships) in results.items():
+        print(f"{name:<10} {seconds:>10.2f} {args.rows / seconds:>12.0f} {entities:>10} {relationships:>14}")
+    if "legacy" in results:
+        print(f"\nSpeedup: {results['legacy'][0] / results['etl'][0]:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure cold start of langgraph_rag: import time and time to first answer.
+
+Every run starts a fresh interpreter. The first answer is a router question
+served by the embedded graph, so no Neo4j server or LLM call is needed.
+With --snapshot the graph and router load from a catalog snapshot
+(catalog_snapshot.py) instead of parsing the CSV.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --runs 5 --json startup.json
+    python -m benchmarks.bench_startup --snapshot
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_etl import synthetic_catalog
+
+QUESTION = "Điện thoại Samsung nào có RAM 8GB?"
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import langgraph_rag as rag
+imported = time.perf_counter()
+modules = len(sys.modules)
+rag.GRAPH_BACKEND = "embedded"
+rag.CATALOG_CSV = sys.argv[1]
+rag.CATALOG_SNAPSHOT = sys.argv[3]
+rag.chat(sys.argv[2])
+first = time.perf_counter()
+rag.chat(sys.argv[2])
+second = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_answer_ms": (first - imported) * 1000,
+    "second_answer_ms": (second - first) * 1000,
+    "modules": modules,
+}))
+"""
+
+def run_once(csv_file, question, snapshot_dir):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, csv_file, question, snapshot_dir],
+        capture_output=True, text=True, check=True, cwd=os.getcwd(),
+    ).stdout
+    # chat() in log ra stdout, kết quả là dòng cuối
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=1000, help="catalog size for the embedded graph")
+    parser.add_argument("--question", default=QUESTION)
+    parser.add_argument("--snapshot", action="store_true", help="build a catalog snapshot and load from it")
+    parser.add_argument("--json", help="write the medians to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "catalog.csv")
+        synthetic_catalog(args.rows).to_csv(csv_file, index=False)
+        # Không có snapshot: đường dẫn không tồn tại, langgraph_rag đọc CSV
+        snapshot_dir = os.path.join(tmp, "catalog_snapshot")
+        if args.snapshot:
+            from catalog_snapshot import build_snapshot
+            build_snapshot(csv_file, snapshot_dir)
+        runs = [run_once(csv_file, args.question, snapshot_dir) for _ in range(args.runs)]
+
+    metrics = [key for key in runs[0] if key.endswith("_ms")]
+    summary = {key: statistics.median(run[key] for run in runs) for key in metrics}
+    summary["modules"] = runs[0]["modules"]
+
+    print(f"{'metric':<18} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for key in metrics:
+        values = [run[key] for run in runs]
+        print(f"{key[:-3]:<18} {summary[key]:>10.1f} {min(values):>10.1f} {max(values):>10.1f}")
+    print(f"Modules loaded after import: {summary['modules']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
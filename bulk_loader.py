@@ -0,0 +1,161 @@
+import argparse
+import time
+
+from neo4j import GraphDatabase
+
+from etl import clean_frame, column_mapping, first_row_per_model, read_csv_data
+from model_specs import refresh_model_specs
+from result_cache import bump_catalog_version
+from similar_phones import refresh_similarities
+from spec_parsing import numeric_columns, numeric_properties, range_index_queries
+
+# Neo4j config
+NEO4J_URL = ""
+NEO4J_USER = ""
+NEO4J_PASSWORD = ""
+
+DEFAULT_BATCH_SIZE = 500
+
+schema_queries = [
+    "CREATE CONSTRAINT model_name_unique IF NOT EXISTS FOR (m:Model) REQUIRE m.name IS UNIQUE",
+    "CREATE INDEX company_name_index IF NOT EXISTS FOR (c:Company) ON (c.name)",
+    "CREATE INDEX processor_name_index IF NOT EXISTS FOR (p:Processor) ON (p.name)",
+    "CREATE INDEX camera_name_index IF NOT EXISTS FOR (cam:Camera) ON (cam.name)",
+    "CREATE INDEX ram_size_index IF NOT EXISTS FOR (r:RAM) ON (r.size)",
+    "CREATE INDEX battery_capacity_index IF NOT EXISTS FOR (b:Battery) ON (b.capacity)",
+    "CREATE INDEX screen_size_index IF NOT EXISTS FOR (s:Screen) ON (s.size)",
+    "CREATE INDEX price_value_index IF NOT EXISTS FOR (pr:Price) ON (pr.value)",
+    "CREATE INDEX year_index IF NOT EXISTS FOR (y:Year) ON (y.year)",
+    "CREATE INDEX weight_value_index IF NOT EXISTS FOR (w:Weight) ON (w.value)",
+] + range_index_queries
+
+MERGE_MODELS_QUERY = "UNWIND $rows AS row MERGE (:Model {name: row.model})"
+
+def build_merge_query(column):
+    """Build the parameterized UNWIND/MERGE statement for one mapped column.
+
+    Labels and relationship types cannot be parameters, so there is one
+    statement per column; the values always travel in ``$rows`` which keeps
+    the query text (and the server's plan cache) constant across batches.
+    """
+    relationship_type, target_label, target_property = column_mapping[column]
+    if column == 'Front Camera':
+        target = "(t:Camera {name: row.value, type: 'Front'})"
+    elif column == 'Back Camera':
+        target = "(t:Camera {name: row.value, type: 'Back'})"
+    elif column.startswith('Launched Price'):
+        country = column.split('(')[1].split(')')[0]
+        target = f"(t:Price {{value: row.value, country: '{country}'}})"
+    else:
+        target = f"(t:{target_label} {{{target_property}: row.value}})"
+    query = (
+        "UNWIND $rows AS row "
+        "MATCH (m:Model {name: row.model}) "
+        f"MERGE {target} "
+        f"MERGE (m)-[:{relationship_type}]->(t)"
+    )
+    if column in numeric_columns:
+        # Typed numeric properties (grams, gb, mah, inches, amount) for range queries
+        query += " SET t += row.props"
+    return query
+
+merge_queries = {column: build_merge_query(column) for column in column_mapping}
+
+def convert_value(column, value):
+    """Convert a cleaned cell to the type stored on the target node"""
+    if column_mapping[column][1] == 'Year':
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+    return value
+
+def iter_batches(df, batch_size):
+    """Yield (models, rows_by_column) for consecutive slices of a cleaned dataframe"""
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        chunk = chunk[chunk['Model Name'] != ""]
+        models = chunk['Model Name']
+
+        rows_by_column = {}
+        for column in column_mapping:
+            rows = []
+            for model, value in zip(models, chunk[column]):
+                if not value:
+                    continue
+                value = convert_value(column, value)
+                if value is None:
+                    continue
+                row = {"model": model, "value": value}
+                if column in numeric_columns:
+                    row["props"] = numeric_properties(column, value)
+                rows.append(row)
+            rows_by_column[column] = rows
+
+        yield [{"model": model} for model in models], rows_by_column
+
+def write_batch(tx, models, rows_by_column):
+    tx.run(MERGE_MODELS_QUERY, rows=models)
+    for column, rows in rows_by_column.items():
+        if rows:
+            tx.run(merge_queries[column], rows=rows)
+    # Thuộc tính phẳng trên Model được dựng lại từ quan hệ trong cùng transaction
+    refresh_model_specs(tx, [row["model"] for row in models])
+
+def load_catalog(driver, df, batch_size=DEFAULT_BATCH_SIZE):
+    """Load all models and their relationships in UNWIND batches.
+
+    Returns a dict with the number of rows, relationships, elapsed seconds
+    and rows per second.
+    """
+    df = first_row_per_model(clean_frame(df))
+    with driver.session() as session:
+        for query in schema_queries:
+            session.run(query).consume()
+
+    total_rows = 0
+    total_relationships = 0
+    started = time.perf_counter()
+    with driver.session() as session:
+        for models, rows_by_column in iter_batches(df, batch_size):
+            session.execute_write(write_batch, models, rows_by_column)
+            total_rows += len(models)
+            total_relationships += sum(len(rows) for rows in rows_by_column.values())
+            elapsed = time.perf_counter() - started
+            print(f"Loaded {total_rows} rows ({total_rows / elapsed:.0f} rows/sec)")
+        similar = refresh_similarities(driver)
+        print(f"Similar phones: {similar['refreshed']} models in {similar['seconds']:.2f}s")
+        # Báo cho các cache kết quả phía chatbot rằng catalog đã thay đổi
+        version = session.execute_write(bump_catalog_version)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": total_rows,
+        "relationships": total_relationships,
+        "seconds": elapsed,
+        "rows_per_sec": total_rows / elapsed if elapsed else 0.0,
+        "version": version,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load the mobile catalog into Neo4j")
+    parser.add_argument("--csv", default="data/Mobiles-Dataset(2025).csv")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print("Reading CSV file...")
+    df = read_csv_data(args.csv)
+
+    driver = GraphDatabase.driver(NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        stats = load_catalog(driver, df, args.batch_size)
+    finally:
+        driver.close()
+
+    print(f"Total rows: {stats['rows']}")
+    print(f"Total relationships: {stats['relationships']}")
+    print(f"Elapsed: {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)")
+    print(f"Catalog version: {stats['version']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+SNAPSHOT_FORMAT = 2
+DEFAULT_SNAPSHOT_DIR = "data/catalog_snapshot"
+MANIFEST_FILE = "manifest.json"
+
+_SLUG_PATTERN = re.compile(r"\W+")
+
+def _slug(column: str) -> str:
+    return _SLUG_PATTERN.sub("_", column).strip("_").lower()
+
+def source_version(csv_file: str) -> str:
+    """Content stamp of the source CSV (the snapshot's version)"""
+    digest = hashlib.sha256()
+    with open(csv_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{SNAPSHOT_FORMAT}-{digest.hexdigest()[:16]}"
+
+def _encode_dictionary(values: Sequence[str]) -> np.ndarray:
+    # clean_text gộp mọi khoảng trắng thành dấu cách, nên "\n" phân tách được các giá trị
+    if any("\n" in value for value in values):
+        raise ValueError("dictionary values must not contain newlines")
+    return np.frombuffer("\n".join(values).encode("utf-8"), dtype=np.uint8)
+
+def _decode_dictionary(data: np.ndarray, size: int) -> np.ndarray:
+    values = data.tobytes().decode("utf-8").split("\n") if size else []
+    return np.array(values, dtype=object)
+
+def _numeric_columns(column: str, dictionary: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Typed properties (spec_parsing) of each dictionary entry, NaN where a value has none"""
+    from spec_parsing import numeric_properties, parse_year
+
+    parsed: Dict[str, np.ndarray] = {}
+    for i, value in enumerate(dictionary):
+        if not value:
+            continue
+        properties = {"year": parse_year(value)} if column == 'Launched Year' else numeric_properties(column, value)
+        for prop, number in properties.items():
+            if isinstance(number, (int, float)):
+                parsed.setdefault(prop, np.full(len(dictionary), np.nan))[i] = number
+    return parsed
+
+def build_snapshot(csv_file: str, out_dir: str = DEFAULT_SNAPSHOT_DIR) -> Dict[str, Any]:
+    """Write the cleaned catalog of ``csv_file`` as a columnar snapshot directory; returns its manifest.
+
+    Each column is stored as ``int32`` codes into a dictionary of its
+    distinct cleaned values (``""`` for missing; newline-joined UTF-8), so the
+    distinct values are also the router vocabularies. Numeric columns
+    additionally get the typed properties (``gb``, ``mah``, ``amount``, ...)
+    of each dictionary entry as ``float64``, parsed once per distinct value
+    instead of once per row. Every build goes to its own subdirectory of
+    ``out_dir`` and is never modified afterwards; ``manifest.json`` names the
+    current build and is swapped in last. The previous build is kept for
+    readers that read the old manifest but have not mapped its files yet.
+    """
+    import pandas as pd
+
+    from etl import clean_frame, read_csv_data
+
+    started = time.perf_counter()
+    version = source_version(csv_file)
+    df = clean_frame(read_csv_data(csv_file))
+    build = f"build-{version}-{time.time_ns()}"
+    build_dir = os.path.join(out_dir, build)
+    os.makedirs(build_dir)
+    columns: Dict[str, Dict[str, Any]] = {}
+    for column in df.columns:
+        codes, uniques = pd.factorize(df[column])
+        dictionary = [str(value) for value in uniques]
+        entry: Dict[str, Any] = {
+            "codes": f"{_slug(column)}.codes.npy",
+            "dictionary": f"{_slug(column)}.dict.npy",
+            "dictionary_size": len(dictionary),
+        }
+        np.save(os.path.join(build_dir, entry["codes"]), codes.astype(np.int32))
+        np.save(os.path.join(build_dir, entry["dictionary"]), _encode_dictionary(dictionary))
+        numeric = {}
+        for prop, values in _numeric_columns(column, dictionary).items():
+            numeric[prop] = f"{_slug(column)}.{prop}.npy"
+            np.save(os.path.join(build_dir, numeric[prop]), values)
+        if numeric:
+            entry["numeric"] = numeric
+        columns[column] = entry
+    stat = os.stat(csv_file)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "build": build,
+        "rows": len(df),
+        "columns": columns,
+        "source": {"path": csv_file, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "created_at": time.time(),
+        "build_seconds": time.perf_counter() - started,
+    }
+    previous = _current_build(out_dir)
+    manifest_file = os.path.join(out_dir, MANIFEST_FILE)
+    tmp_file = f"{manifest_file}.{build}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, manifest_file)
+    # Chỉ xoá các bản cũ hơn bản trước đó: reader đã đọc manifest cũ vẫn map được file của nó
+    for name in os.listdir(out_dir):
+        if name.startswith("build-") and name not in (build, previous):
+            shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+    return manifest
+
+def _current_build(out_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("build")
+    except (OSError, ValueError):
+        return None
+
+class CatalogSnapshot:
+    """Memory-mapped, read-only view of a snapshot written by ``build_snapshot``.
+
+    Opening reads the manifest and maps every array of the build it names
+    with ``np.load(mmap_mode="r")``, so an open snapshot keeps reading one
+    consistent build while ``build_snapshot`` writes the next one. Nothing
+    is read until used; the pages come from the OS page cache, so worker
+    processes opening the same snapshot share them. A column's dictionary
+    is decoded once, on first use (one ``split``).
+    ``values(column)`` decodes a column through its dictionary and
+    ``entities()`` returns the distinct values of every column in the shape
+    of ``extract_entities.extract_unique_entities``, decoding each distinct
+    value once.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any], mmap: bool = True):
+        self.path = path
+        self.manifest = manifest
+        self.version: str = manifest["version"]
+        self.rows: int = manifest["rows"]
+        self.columns: List[str] = list(manifest["columns"])
+        self.build_path = os.path.join(path, manifest["build"])
+        mmap_mode = "r" if mmap else None
+        names = [name for entry in manifest["columns"].values()
+                 for name in (entry["codes"], entry["dictionary"], *entry.get("numeric", {}).values())]
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(self.build_path, name), mmap_mode=mmap_mode) for name in names
+        }
+        self._dictionaries: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_SNAPSHOT_DIR, mmap: bool = True) -> "CatalogSnapshot":
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"unsupported snapshot format {manifest.get('format')!r} in {path}")
+        return cls(path, manifest, mmap)
+
+    def _array(self, name: str) -> np.ndarray:
+        return self._arrays[name]
+
+    def codes(self, column: str) -> np.ndarray:
+        return self._array(self.manifest["columns"][column]["codes"])
+
+    def dictionary(self, column: str) -> np.ndarray:
+        """Distinct values of a column (object array, indexed by its codes)"""
+        dictionary = self._dictionaries.get(column)
+        if dictionary is None:
+            entry = self.manifest["columns"][column]
+            dictionary = _decode_dictionary(self._array(entry["dictionary"]), entry["dictionary_size"])
+            self._dictionaries[column] = dictionary
+        return dictionary
+
+    def numeric(self, column: str, prop: str) -> Optional[np.ndarray]:
+        """Typed property of every row (NaN where missing), or None if the column has no such property"""
+        name = self.manifest["columns"][column].get("numeric", {}).get(prop)
+        return self._array(name)[self.codes(column)] if name is not None else None
+
+    def values(self, column: str) -> List[str]:
+        return self.dictionary(column)[self.codes(column)].tolist()
+
+    def first_rows(self) -> np.ndarray:
+        """Indexes of the rows ``etl.first_row_per_model`` keeps (first row of each non-empty model name)"""
+        names = self.codes('Model Name')
+        _, first = np.unique(names, return_index=True)
+        first = np.sort(first)
+        return first[self.dictionary('Model Name')[names[first]] != ""]
+
+    def unique(self, column: str) -> Set[str]:
+        return {value for value in self.dictionary(column).tolist() if value}
+
+    def entities(self) -> Dict[str, Set[str]]:
+        # Chỉ các giá trị của dòng được nạp vào đồ thị, như extract_unique_entities
+        rows = self.first_rows()
+        return {
+            column: {value for value in self.dictionary(column)[np.unique(self.codes(column)[rows])].tolist() if value}
+            for column in self.columns
+        }
+
+    def iter_rows(self, columns: Optional[Sequence[str]] = None, first_per_model: bool = False) -> Iterator[Tuple[str, ...]]:
+        """Rows as tuples of ``columns`` (all when None); ``first_per_model`` keeps the rows of ``first_rows``"""
+        columns = list(columns or self.columns)
+        rows = self.first_rows() if first_per_model else np.arange(self.rows)
+        decoded = [self.dictionary(column)[self.codes(column)[rows]].tolist() for column in columns]
+        return zip(*decoded)
+
+    def matches(self, csv_file: str) -> bool:
+        """True if the snapshot was built from the current content of ``csv_file``"""
+        source = self.manifest.get("source", {})
+        try:
+            stat = os.stat(csv_file)
+        except OSError:
+            return False
+        if stat.st_size == source.get("size") and stat.st_mtime_ns == source.get("mtime_ns"):
+            return True
+        # File chép sang chỗ khác (mtime đổi): so nội dung
+        return stat.st_size == source.get("size") and source_version(csv_file) == self.version
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None):
+        """A cleaned DataFrame, as ``etl.clean_frame(etl.read_csv_data(csv))`` would return"""
+        import pandas as pd
+
+        columns = list(columns or self.columns)
+        return pd.DataFrame({column: pd.Series(self.values(column), dtype=object) for column in columns})
+
+def load_snapshot(path: str = DEFAULT_SNAPSHOT_DIR, source: Optional[str] = None) -> Optional[CatalogSnapshot]:
+    """The snapshot at ``path``, or None when it is missing, unreadable or older than ``source``"""
+    if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return None
+    try:
+        snapshot = CatalogSnapshot.open(path)
+    except (OSError, ValueError) as e:
+        print("❌ Could not open catalog snapshot:", e)
+        return None
+    if source is not None and os.path.exists(source) and not snapshot.matches(source):
+        print(f"⚠️ Catalog snapshot {path} is older than {source}; run python catalog_snapshot.py to rebuild it")
+        return None
+    return snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mappable columnar snapshot of the cleaned catalog")
+    parser.add_argument("--csv", default="data/Mobiles-Dataset(2025).csv")
+    parser.add_argument("--out", default=DEFAULT_SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    manifest = build_snapshot(args.csv, args.out)
+    build_dir = os.path.join(args.out, manifest["build"])
+    size = sum(os.path.getsize(os.path.join(build_dir, name)) for name in os.listdir(build_dir))
+    print(f"Snapshot {manifest['version']}: {manifest['rows']} rows, {len(manifest['columns'])} columns, "
+          f"{size / 1024:.0f} KiB in {manifest['build_seconds']:.2f}s -> {build_dir}")
+    started = time.perf_counter()
+    snapshot = CatalogSnapshot.open(args.out)
+    entities = snapshot.entities()
+    print(f"Opened and read {sum(len(values) for values in entities.values())} distinct values "
+          f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from model_specs import refresh_query
+
 def combine_cypher_files():
     """Combine entity and relationship Cypher files into one comprehensive file"""
     
@@ -41,6 +43,19 @@ CREATE INDEX price_value_index IF NOT EXISTS FOR (pr:Price) ON (pr.value);
 CREATE INDEX year_index IF NOT EXISTS FOR (y:Year) ON (y.year);
 CREATE INDEX weight_value_index IF NOT EXISTS FOR (w:Weight) ON (w.value);
 
+-- Range indexes on the typed numeric properties (used by <, >, BETWEEN predicates)
+CREATE RANGE INDEX weight_grams_index IF NOT EXISTS FOR (w:Weight) ON (w.grams);
+CREATE RANGE INDEX ram_gb_index IF NOT EXISTS FOR (r:RAM) ON (r.gb);
+CREATE RANGE INDEX battery_mah_index IF NOT EXISTS FOR (b:Battery) ON (b.mah);
+CREATE RANGE INDEX screen_inches_index IF NOT EXISTS FOR (s:Screen) ON (s.inches);
+CREATE RANGE INDEX price_amount_index IF NOT EXISTS FOR (pr:Price) ON (pr.amount);
+
+-- Denormalized spec properties on each Model (single-node details/compare queries)
+{refresh_query(all_models=True)};
+
+-- Bump the catalog version stamp so the chatbot's result cache is refreshed
+MERGE (v:CatalogVersion {{id: 'catalog'}}) SET v.version = coalesce(v.version, 0) + 1, v.updated_at = datetime();
+
 -- ===========================================
 -- PART 4: SAMPLE QUERIES FOR TESTING
 -- ===========================================
@@ -61,10 +76,10 @@ CREATE INDEX weight_value_index IF NOT EXISTS FOR (w:Weight) ON (w.value);
 -- MATCH (m:Model)-[:HAS_YEAR]->(y:Year {year: 2024}) RETURN m.name, y.year;
 
 -- Query 6: Find all models with price range in Pakistan
--- MATCH (m:Model)-[:HAS_PAKISTAN_PRICE]->(p:Price) WHERE p.value CONTAINS 'PKR 200,000' RETURN m.name, p.value;
+-- MATCH (m:Model)-[:HAS_PAKISTAN_PRICE]->(p:Price) WHERE p.amount >= 150000 AND p.amount <= 200000 RETURN m.name, p.value;
 
 -- Query 7: Find all models with battery capacity above 4000mAh
--- MATCH (m:Model)-[:HAS_BATTERY]->(b:Battery) WHERE b.capacity CONTAINS '4' AND b.capacity CONTAINS 'mAh' RETURN m.name, b.capacity;
+-- MATCH (m:Model)-[:HAS_BATTERY]->(b:Battery) WHERE b.mah > 4000 RETURN m.name, b.capacity;
 
 -- Query 8: Find all Samsung models with their specifications
 -- MATCH (m:Model)-[:HAS_COMPANY_NAME]->(c:Company {name: 'Samsung'})
@@ -74,7 +89,7 @@ CREATE INDEX weight_value_index IF NOT EXISTS FOR (w:Weight) ON (w.value);
 -- RETURN m.name, c.name, r.size, p.name, b.capacity LIMIT 10;
 
 -- Query 9: Find all models with screen size 6.7 inches or larger
--- MATCH (m:Model)-[:HAS_SCREEN]->(s:Screen) WHERE s.size CONTAINS '6.7' OR s.size CONTAINS '6.8' OR s.size CONTAINS '6.9' RETURN m.name, s.size;
+-- MATCH (m:Model)-[:HAS_SCREEN]->(s:Screen) WHERE s.inches >= 6.7 RETURN m.name, s.size;
 
 -- Query 10: Find all models with their prices in all countries
 -- MATCH (m:Model)-[:HAS_COMPANY_NAME]->(c:Company)
@@ -0,0 +1,168 @@
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from intent_router import company_aliases, currency_countries
+from translation_cache import normalize_question
+
+DEFAULT_MAX_TURNS = 4
+DEFAULT_TOKEN_BUDGET = 1000
+# Số lượt gần nhất giữ lại trong bộ đếm token của prompt
+PROMPT_TOKEN_WINDOW = 256
+
+# Hãng mặc định khi không có danh sách hãng lấy từ đồ thị
+default_brands = [
+    "Apple", "Samsung", "Xiaomi", "Google", "OnePlus", "Oppo", "Vivo", "Realme",
+    "Huawei", "Honor", "Motorola", "Nokia", "Sony", "Tecno", "Infinix",
+]
+
+# Nhu cầu sử dụng -> từ khoá (đã chuẩn hoá, không dấu)
+use_case_words = {
+    "gaming": r"choi game|gaming|game",
+    "camera": r"chup anh|chup hinh|quay phim|camera|photo",
+    "battery": r"pin trau|pin lau|pin khoe|battery life",
+}
+
+_BUDGET_PATTERN = re.compile(r"\b(pkr|inr|cny|usd|aed)\s*(\d[\d,.]*)\s*(k)?\b|\b(\d[\d,.]*)\s*(k)?\s*(pkr|inr|cny|usd|aed)\b")
+_BUDGET_MAX_PATTERN = re.compile(r"(duoi|under|below|toi da|khong qua|max|less than)\W*(?:\w+\W+){0,2}$")
+_RAM_PATTERN = re.compile(r"\b(?:ram\s*(\d+)\s*gb|(\d+)gb\s*ram)\b")
+_USE_CASE_PATTERNS = {use: re.compile(rf"\b({words})\b") for use, words in use_case_words.items()}
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Không có tiktoken (hoặc không tải được bảng mã): ước lượng theo số ký tự
+        return None
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+def extract_facts(text: str, brands: Iterable[str] = default_brands) -> Dict[str, str]:
+    """Structured facts stated in one user message (budget, brand, RAM, use case)"""
+    normalized = normalize_question(str(text).replace("$", " usd "))
+    padded = f" {normalized} "
+    facts = {}
+
+    match = _BUDGET_PATTERN.search(normalized)
+    if match:
+        currency = match.group(1) or match.group(6)
+        amount = float((match.group(2) or match.group(4)).replace(",", ""))
+        if match.group(3) or match.group(5):
+            amount *= 1000
+        prefix = "≤" if _BUDGET_MAX_PATTERN.search(normalized[:match.start()]) else "≈"
+        facts["budget"] = f"user budget {prefix} {currency.upper()} {int(amount):,} ({currency_countries[currency]} price)"
+
+    for brand in brands:
+        if f" {normalize_question(brand)} " in padded:
+            facts["brand"] = f"prefers {brand}"
+            break
+    else:
+        for alias, brand in company_aliases.items():
+            if f" {alias} " in padded:
+                facts["brand"] = f"prefers {brand}"
+                break
+
+    match = _RAM_PATTERN.search(normalized)
+    if match:
+        facts["ram"] = f"wants RAM ≥ {match.group(1) or match.group(2)}GB"
+
+    uses = [use for use, pattern in _USE_CASE_PATTERNS.items() if pattern.search(normalized)]
+    if uses:
+        facts["use"] = "uses the phone for " + ", ".join(uses)
+    return facts
+
+class ConversationMemory:
+    """Token-bounded chat history for one session.
+
+    The last ``max_turns`` turns are kept verbatim; older turns are dropped
+    and survive only as structured facts (budget, brand, ...) extracted from
+    every user message, newest value wins. ``render()`` never exceeds
+    ``token_budget`` tokens, so the prompt size stays constant however long
+    the session gets. Drop-in for the plain ``history`` list: ``chat()``
+    keeps calling ``append({"user": ..., "bot": ...})``.
+    """
+
+    def __init__(self, max_turns: int = DEFAULT_MAX_TURNS, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 brands: Optional[Iterable[str]] = None):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.brands = list(brands) if brands is not None else default_brands
+        self.turns: deque = deque()
+        self.facts: Dict[str, str] = {}
+        self.total_turns = 0
+        self.prompt_tokens: deque = deque(maxlen=PROMPT_TOKEN_WINDOW)
+        self._rendered: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.turns)
+
+    def append(self, turn: Any) -> None:
+        if isinstance(turn, dict):
+            self.facts.update(extract_facts(turn.get("user", ""), self.brands))
+        self.turns.append(turn)
+        while len(self.turns) > self.max_turns:
+            self.turns.popleft()
+        self.total_turns += 1
+        self._rendered = None
+
+    def clear(self) -> None:
+        self.turns.clear()
+        self.facts.clear()
+        self._rendered = None
+
+    def summary(self) -> str:
+        if not self.facts:
+            return ""
+        return "Known facts about the user:\n" + "\n".join(f"- {fact}" for fact in self.facts.values())
+
+    @staticmethod
+    def _turn_text(turn: Any) -> str:
+        if isinstance(turn, dict):
+            return f"User: {turn.get('user', '')}\nBot: {turn.get('bot', '')}\n"
+        return f"{turn}\n"
+
+    def render(self) -> str:
+        """Facts summary plus the most recent turns that fit in the token budget"""
+        if self._rendered is not None:
+            return self._rendered
+        summary = self.summary()
+        budget = self.token_budget - count_tokens(summary)
+        kept: List[str] = []
+        for turn in reversed(self.turns):
+            text = self._turn_text(turn)
+            tokens = count_tokens(text)
+            if tokens > budget:
+                if not kept and budget > 0:
+                    # Lượt mới nhất quá dài (vd. bảng kết quả lớn): cắt bớt phần đầu
+                    kept.append("..." + text[-budget * 4:])
+                break
+            kept.append(text)
+            budget -= tokens
+        history_text = "".join(reversed(kept))
+        self._rendered = f"{summary}\n\n{history_text}" if summary else history_text
+        return self._rendered
+
+    def record_prompt(self, prompt: str) -> int:
+        """Count the tokens of a prompt built from this memory (one entry per turn)"""
+        tokens = count_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": self.total_turns,
+            "kept_turns": len(self.turns),
+            "facts": dict(self.facts),
+            "last_prompt_tokens": self.prompt_tokens[-1] if self.prompt_tokens else 0,
+            "max_prompt_tokens": max(self.prompt_tokens, default=0),
+        }
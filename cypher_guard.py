@@ -0,0 +1,180 @@
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from result_cache import normalize_cypher
+from single_flight import SingleFlight
+
+# cypher: truy vấn sau khi viết lại (thêm/giảm LIMIT); reason: lý do từ chối, None nếu chạy được
+GuardResult = namedtuple("GuardResult", ["cypher", "ok", "reason", "estimated_rows", "rewritten"],
+                         defaults=(None, False))
+
+DEFAULT_MAX_ROWS = 50
+DEFAULT_MAX_ESTIMATED_ROWS = 100000
+DEFAULT_MAX_CARTESIAN_ROWS = 1000
+
+# Procedure chỉ đọc được phép gọi bằng CALL
+READ_PROCEDURES = (
+    "db.labels", "db.relationshiptypes", "db.propertykeys", "db.schema.",
+    "db.index.fulltext.query", "db.index.vector.query",
+)
+
+# Chuỗi, tên trong dấu ` và comment: thay bằng khoảng trắng (giữ nguyên vị trí) trước khi tìm từ khoá
+_LITERAL_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/", re.DOTALL)
+# Từ khoá đứng sau "." hoặc ":" là tên thuộc tính/nhãn, không phải mệnh đề
+_KEYWORD = r"(?<![.:\w$]){}(?![\w])"
+_WRITE_PATTERN = re.compile(_KEYWORD.format(
+    r"(create|merge|set|delete|detach|remove|drop|foreach|load\s+csv|periodic\s+commit|in\s+transactions|"
+    r"grant|deny|revoke|alter|rename|terminate|start\s+database|stop\s+database)"
+), re.IGNORECASE)
+_START_PATTERN = re.compile(r"^\s*(optional\s+match|match|with|unwind|return|call)\b", re.IGNORECASE)
+_CALL_PATTERN = re.compile(_KEYWORD.format(r"call\s+([\w.]+)"), re.IGNORECASE)
+_UNION_PATTERN = re.compile(_KEYWORD.format(r"union(\s+all)?"), re.IGNORECASE)
+_RETURN_PATTERN = re.compile(_KEYWORD.format("return"), re.IGNORECASE)
+_LIMIT_PATTERN = re.compile(_KEYWORD.format(r"limit\s+(\d+|\$\w+)"), re.IGNORECASE)
+
+def mask_literals(cypher_query: str) -> str:
+    return _LITERAL_PATTERN.sub(lambda match: " " * len(match.group(0)), cypher_query)
+
+def static_violation(cypher_query: str) -> Optional[str]:
+    """Reason the query must not run (write clause, procedure, several statements), else None"""
+    masked = mask_literals(cypher_query).strip().rstrip(";")
+    if not _START_PATTERN.match(masked):
+        return "not a read query"
+    if ";" in masked:
+        return "multiple statements"
+    match = _WRITE_PATTERN.search(masked)
+    if match is not None:
+        return f"write clause {match.group(1).upper()}"
+    for match in _CALL_PATTERN.finditer(masked):
+        if not match.group(1).lower().startswith(READ_PROCEDURES):
+            return f"procedure {match.group(1)}"
+    return None
+
+def enforce_limit(cypher_query: str, max_rows: int) -> str:
+    """Add ``LIMIT max_rows`` to every final RETURN without one and lower larger literal limits"""
+    cypher_query = cypher_query.strip().rstrip(";").rstrip()
+    masked = mask_literals(cypher_query)
+    bounds = [0] + [pos for match in _UNION_PATTERN.finditer(masked) for pos in match.span()] + [len(masked)]
+    edits = []
+    for start, end in zip(bounds[::2], bounds[1::2]):
+        part = masked[start:end]
+        returns = list(_RETURN_PATTERN.finditer(part))
+        # RETURN cuối nằm trong CALL { ... } thì nhánh này không có RETURN ngoài cùng
+        if not returns or part[:returns[-1].start()].count("{") != part[:returns[-1].start()].count("}"):
+            continue
+        limits = list(_LIMIT_PATTERN.finditer(part, returns[-1].end()))
+        if not limits:
+            edits.append((start + len(part.rstrip()), start + len(part.rstrip()), f" LIMIT {max_rows}"))
+        elif limits[-1].group(1).isdigit() and int(limits[-1].group(1)) > max_rows:
+            edits.append((start + limits[-1].start(1), start + limits[-1].end(1), str(max_rows)))
+    for edit_start, edit_end, text in reversed(edits):
+        cypher_query = cypher_query[:edit_start] + text + cypher_query[edit_end:]
+    return cypher_query
+
+def plan_operators(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    stack = [plan]
+    while stack:
+        operator = stack.pop()
+        yield operator
+        stack.extend(operator.get("children", ()))
+
+def explain_plan(driver, cypher_query: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Plan of ``EXPLAIN <query>``: compiled and estimated by Neo4j, not executed"""
+    with driver.session() as session:
+        result = session.run("EXPLAIN " + cypher_query, params or {})  # type: ignore
+        return result.consume().plan
+
+class CypherGuard:
+    """Validate LLM-generated Cypher before it reaches the database.
+
+    Static checks reject write/admin clauses, non read-only procedures and
+    multi-statement input; a missing ``LIMIT`` is added (larger literal limits
+    are lowered) so no query returns more than ``max_rows`` rows. When
+    ``explain`` is given, the plan's estimated rows are checked against
+    ``max_estimated_rows`` and Cartesian products above ``max_cartesian_rows``
+    are refused. EXPLAIN only estimates rows (db hits need PROFILE, which
+    executes the query), so the row estimate is the cost budget. Verdicts
+    are cached per normalized query, and concurrent checks of one query
+    share a single EXPLAIN whose verdict is cached before they are released.
+    """
+
+    def __init__(
+        self,
+        explain: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_estimated_rows: float = DEFAULT_MAX_ESTIMATED_ROWS,
+        max_cartesian_rows: float = DEFAULT_MAX_CARTESIAN_ROWS,
+        max_entries: int = 1024,
+    ):
+        self.explain = explain
+        self.max_rows = max_rows
+        self.max_estimated_rows = max_estimated_rows
+        self.max_cartesian_rows = max_cartesian_rows
+        self.max_entries = max_entries
+        self.checked = 0
+        self.rejected = 0
+        self._verdicts: "OrderedDict[str, GuardResult]" = OrderedDict()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+
+    def check_plan(self, plan: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[float]]:
+        """(reason to refuse or None, largest estimated row count of any operator)"""
+        if not plan:
+            return None, None
+        largest = 0.0
+        for operator in plan_operators(plan):
+            name = str(operator.get("operatorType", "")).split("@")[0]
+            rows = float(operator.get("arguments", {}).get("EstimatedRows", 0) or 0)
+            largest = max(largest, rows)
+            if name == "CartesianProduct" and rows > self.max_cartesian_rows:
+                return f"cartesian product of ~{rows:.0f} rows", largest
+        if largest > self.max_estimated_rows:
+            return f"~{largest:.0f} estimated rows", largest
+        return None, largest
+
+    def _remember(self, key: str, verdict: GuardResult) -> GuardResult:
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+        return verdict
+
+    def check(self, cypher_query: str) -> GuardResult:
+        cypher_query = str(cypher_query)
+        key = normalize_cypher(cypher_query)
+        with self._lock:
+            self.checked += 1
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+        if verdict is None:
+            verdict, _ = self._flights.do(key, lambda: self._check(cypher_query, key))
+        with self._lock:
+            self.rejected += not verdict.ok
+        return verdict
+
+    def _check(self, cypher_query: str, key: str) -> GuardResult:
+        reason = static_violation(cypher_query)
+        if reason is not None:
+            return self._remember(key, GuardResult(cypher_query, False, reason))
+        rewritten = enforce_limit(cypher_query, self.max_rows)
+        changed = normalize_cypher(rewritten) != key
+        estimated_rows = None
+        if self.explain is not None:
+            try:
+                reason, estimated_rows = self.check_plan(self.explain(rewritten))
+            except Exception as e:
+                # Lỗi cú pháp hoặc mất kết nối: không chạy, cũng không nhớ kết quả
+                return GuardResult(rewritten, False, f"EXPLAIN failed: {e}", None, changed)
+        return self._remember(key, GuardResult(rewritten, reason is None, reason, estimated_rows, changed))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._verdicts.clear()
+            self.checked = self.rejected = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"checked": self.checked, "rejected": self.rejected, "verdicts": len(self._verdicts)}
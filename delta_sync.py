@@ -0,0 +1,111 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from neo4j import GraphDatabase
+
+from bulk_loader import DEFAULT_BATCH_SIZE, NEO4J_PASSWORD, NEO4J_URL, NEO4J_USER, iter_batches, schema_queries, write_batch
+from etl import clean_frame, column_mapping, first_row_per_model, read_csv_data
+from result_cache import bump_catalog_version
+from similar_phones import refresh_similarities
+
+MANIFEST_FILE = "catalog_manifest.json"
+
+DELETE_MODELS_QUERY = "UNWIND $names AS name MATCH (m:Model {name: name}) DETACH DELETE m"
+DELETE_RELATIONSHIPS_QUERY = "UNWIND $names AS name MATCH (m:Model {name: name})-[r]->() DELETE r"
+
+def fingerprint_rows(df):
+    """Map each model name of a cleaned frame to a content hash of its mapped columns.
+
+    When a model appears several times the first row wins
+    (``etl.first_row_per_model``), like every other loader.
+    """
+    columns = [column for column in column_mapping if column in df.columns]
+    fingerprints = {}
+    for row in first_row_per_model(df)[['Model Name'] + columns].itertuples(index=False, name=None):
+        content = "\x1f".join(row[1:])
+        fingerprints[row[0]] = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    return fingerprints
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"version": 0, "models": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def diff_fingerprints(previous, current):
+    """Return (inserted, changed, deleted) model names"""
+    inserted = sorted(name for name in current if name not in previous)
+    deleted = sorted(name for name in previous if name not in current)
+    changed = sorted(name for name in current if name in previous and previous[name] != current[name])
+    return inserted, changed, deleted
+
+def write_delta_batch(tx, changed, models, rows_by_column):
+    # Xoá quan hệ cũ của các model đã đổi rồi MERGE lại từ dòng mới
+    if changed:
+        tx.run(DELETE_RELATIONSHIPS_QUERY, names=changed)
+    write_batch(tx, models, rows_by_column)
+
+def sync_catalog(driver, df, manifest_path=MANIFEST_FILE, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Send only inserted/changed/deleted models to Neo4j and update the manifest"""
+    df = first_row_per_model(clean_frame(df))
+    manifest = load_manifest(manifest_path)
+    current = fingerprint_rows(df)
+    inserted, changed, deleted = diff_fingerprints(manifest["models"], current)
+    stats = {"inserted": len(inserted), "changed": len(changed), "deleted": len(deleted), "seconds": 0.0}
+    if dry_run or not (inserted or changed or deleted):
+        return stats
+
+    started = time.perf_counter()
+    with driver.session() as session:
+        for query in schema_queries:
+            session.run(query).consume()
+
+        for start in range(0, len(deleted), batch_size):
+            session.execute_write(lambda tx, names: tx.run(DELETE_MODELS_QUERY, names=names).consume(),
+                                  deleted[start:start + batch_size])
+
+        upserts = set(inserted) | set(changed)
+        changed_set = set(changed)
+        delta = df[df['Model Name'].isin(upserts)]
+        for models, rows_by_column in iter_batches(delta, batch_size):
+            batch_changed = [row["model"] for row in models if row["model"] in changed_set]
+            session.execute_write(write_delta_batch, batch_changed, models, rows_by_column)
+        # Chỉ tính lại SIMILAR_TO của các model mà thay đổi có thể ảnh hưởng
+        stats["similar_refreshed"] = refresh_similarities(driver, inserted + changed + deleted)["refreshed"]
+        stats["catalog_version"] = session.execute_write(bump_catalog_version)
+
+    manifest = {"version": manifest["version"] + 1, "models": current}
+    save_manifest(manifest_path, manifest)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync only the changed part of the catalog into Neo4j")
+    parser.add_argument("--csv", default="data/Mobiles-Dataset(2025).csv")
+    parser.add_argument("--manifest", default=MANIFEST_FILE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only print what would change")
+    args = parser.parse_args()
+
+    df = read_csv_data(args.csv)
+    driver = GraphDatabase.driver(NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        stats = sync_catalog(driver, df, args.manifest, args.batch_size, args.dry_run)
+    finally:
+        driver.close()
+
+    print(f"Inserted: {stats['inserted']}, changed: {stats['changed']}, deleted: {stats['deleted']}")
+    if not args.dry_run:
+        print(f"Synced in {stats['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import itertools
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from etl import clean_frame, column_mapping, first_row_per_model, read_csv_data
+from intent_router import DEFAULT_LIMIT, RoutedQuery, attribute_schema
+from model_specs import SIMILAR_PROPERTIES, spec_properties
+from spec_parsing import numeric_properties
+
+# Thuộc tính của router -> cột CSV (giá lấy theo quốc gia)
+attribute_columns = {
+    "company": "Company Name",
+    "ram": "RAM",
+    "year": "Launched Year",
+    "battery": "Battery Capacity",
+    "screen": "Screen Size",
+    "weight": "Mobile Weight",
+}
+
+def target_node(column: str, value: str) -> Dict[str, Any]:
+    """Properties of the target node a column value maps to, as the loaders write them"""
+    _, label, prop = column_mapping[column]
+    if label == 'Year':
+        return {"year": int(float(value))}
+    node: Dict[str, Any] = {prop: value}
+    if column == 'Front Camera':
+        node["type"] = 'Front'
+    elif column == 'Back Camera':
+        node["type"] = 'Back'
+    elif column.startswith('Launched Price'):
+        node["country"] = column.split('(')[1].split(')')[0]
+    node.update(numeric_properties(column, value))
+    return node
+
+class EmbeddedGraph:
+    """In-process, read-only copy of the catalog graph.
+
+    Built from the same CSV and ``column_mapping`` schema as the loaders:
+    ``adjacency[relationship][model id]`` lists the target nodes of each
+    model, ``inverted[relationship][text value]`` the models pointing at a
+    value and ``ranges[relationship]`` the (number, model id) pairs sorted by
+    the typed numeric property, so router constraints are answered with set
+    intersections and binary searches instead of a Neo4j round-trip.
+    """
+
+    def __init__(self):
+        self.models: List[str] = []
+        self.model_ids: Dict[str, int] = {}
+        self.adjacency: Dict[str, Dict[int, List[Dict[str, Any]]]] = defaultdict(dict)
+        self.inverted: Dict[str, Dict[Any, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.ranges: Dict[str, Tuple[List[float], List[int]]] = {}
+        self.values: Dict[str, Set[str]] = defaultdict(set)
+        # similar_phones.SimilarityIndex, dựng khi có câu hỏi máy tương tự đầu tiên
+        self.similarity = None
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    @classmethod
+    def _from_rows(cls, columns: List[str], rows) -> "EmbeddedGraph":
+        graph = cls()
+        # Giá trị lặp lại nhiều (RAM, hãng, ...): mỗi giá trị chỉ parse một lần
+        nodes: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        for row in rows:
+            if row[0]:
+                graph.add_model(row[0], dict(zip(columns, row[1:])), nodes)
+        graph.build_ranges()
+        return graph
+
+    @classmethod
+    def from_frame(cls, df) -> "EmbeddedGraph":
+        # Mỗi model một dòng (dòng đầu tiên), như khi nạp vào Neo4j
+        df = first_row_per_model(clean_frame(df))
+        columns = [column for column in column_mapping if column in df.columns]
+        return cls._from_rows(columns, df[['Model Name'] + columns].itertuples(index=False, name=None))
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "EmbeddedGraph":
+        """From a ``catalog_snapshot.CatalogSnapshot`` (already cleaned, no CSV parsing)"""
+        started = time.perf_counter()
+        columns = [column for column in column_mapping if column in snapshot.columns]
+        graph = cls._from_rows(columns, snapshot.iter_rows(['Model Name'] + columns, first_per_model=True))
+        print(f"Embedded graph: {len(graph)} models from snapshot in {time.perf_counter() - started:.2f}s")
+        return graph
+
+    @classmethod
+    def from_csv(cls, csv_file: str) -> "EmbeddedGraph":
+        started = time.perf_counter()
+        graph = cls.from_frame(read_csv_data(csv_file))
+        print(f"Embedded graph: {len(graph)} models in {time.perf_counter() - started:.2f}s")
+        return graph
+
+    def add_model(self, model_name: str, specs: Dict[str, str],
+                  nodes: Optional[Dict[Tuple[str, str], Optional[Dict[str, Any]]]] = None) -> None:
+        """Add one CSV row; like MERGE, a repeated model keeps all its distinct targets.
+
+        ``nodes`` memoizes ``target_node`` per (column, value) across rows.
+        """
+        self.similarity = None
+        model_id = self.model_ids.get(model_name)
+        if model_id is None:
+            model_id = self.model_ids[model_name] = len(self.models)
+            self.models.append(model_name)
+        self.values['Model Name'].add(model_name)
+        for column, value in specs.items():
+            if not value:
+                continue
+            key = (column, value)
+            if nodes is not None and key in nodes:
+                node = nodes[key]
+            else:
+                try:
+                    node = target_node(column, value)
+                except ValueError:
+                    node = None
+                if nodes is not None:
+                    nodes[key] = node
+            if node is None:
+                continue
+            relationship, _, prop = column_mapping[column]
+            targets = self.adjacency[relationship].setdefault(model_id, [])
+            if node in targets:
+                continue
+            targets.append(node)
+            self.inverted[relationship][node[prop]].add(model_id)
+            self.values[column].add(str(node[prop]))
+
+    def build_ranges(self) -> None:
+        """(Re)build the sorted numeric indexes used by range constraints"""
+        self.ranges = {}
+        for column in column_mapping:
+            relationship, _, _ = column_mapping[column]
+            numeric_prop = self._numeric_prop(column)
+            if numeric_prop is None:
+                continue
+            pairs = sorted(
+                (node[numeric_prop], model_id)
+                for model_id, nodes in self.adjacency.get(relationship, {}).items()
+                for node in nodes if numeric_prop in node
+            )
+            self.ranges[relationship] = ([number for number, _ in pairs], [model_id for _, model_id in pairs])
+
+    @staticmethod
+    def _numeric_prop(column: str) -> Optional[str]:
+        if column.startswith('Launched Price'):
+            return attribute_schema["price"][4]
+        for attribute, attribute_column in attribute_columns.items():
+            if attribute_column == column:
+                return attribute_schema[attribute][4]
+        return None
+
+    def entities(self) -> Dict[str, Set[str]]:
+        """Column -> values, in the shape of ``extract_entities.extract_unique_entities``"""
+        return dict(self.values)
+
+    @staticmethod
+    def _relationship(attribute: str, country: Optional[str]) -> str:
+        if attribute == "price":
+            return column_mapping[f"Launched Price ({country})"][0]
+        return attribute_schema[attribute][0]
+
+    def _candidates(self, relationship: str, value: Any) -> Set[int]:
+        if not isinstance(value, dict):
+            return set(self.inverted.get(relationship, {}).get(value, ()))
+        numbers, ids = self.ranges.get(relationship, ([], []))
+        start, end = 0, len(numbers)
+        for op, bound in value.items():
+            if op == "<":
+                end = min(end, bisect_left(numbers, bound))
+            elif op == "<=":
+                end = min(end, bisect_right(numbers, bound))
+            elif op == ">":
+                start = max(start, bisect_right(numbers, bound))
+            elif op == ">=":
+                start = max(start, bisect_left(numbers, bound))
+        return set(ids[start:end])
+
+    @staticmethod
+    def _matches(node: Dict[str, Any], prop: str, numeric_prop: Optional[str], value: Any) -> bool:
+        if not isinstance(value, dict):
+            return node.get(prop) == value
+        number = node.get(numeric_prop)
+        if number is None:
+            return False
+        return all(
+            (op == "<" and number < bound) or (op == "<=" and number <= bound)
+            or (op == ">" and number > bound) or (op == ">=" and number >= bound)
+            for op, bound in value.items()
+        )
+
+    def details(self, model_name: str) -> List[Dict[str, Any]]:
+        """The spec projection of one model, with the columns of ``model_specs.MODEL_DETAILS_QUERY``"""
+        model_id = self.model_ids.get(model_name)
+        if model_id is None:
+            return []
+        record: Dict[str, Any] = {"model": model_name}
+        for column, prop in spec_properties.items():
+            relationship, _, target_property = column_mapping[column]
+            targets = self.adjacency.get(relationship, {}).get(model_id)
+            record[prop] = targets[0][target_property] if targets else None
+        return [record]
+
+    def similar(self, model_name: str, cheaper: bool = False, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """Nearest models, with the columns of ``model_specs.SIMILAR_MODELS_QUERY``"""
+        from similar_phones import SimilarityIndex
+
+        if self.similarity is None:
+            self.similarity = SimilarityIndex(self.details(name)[0] for name in self.models)
+        records = []
+        for neighbour in self.similarity.neighbours(model_name, limit, cheaper):
+            specs = self.details(neighbour.model)[0]
+            record = {"model": neighbour.model, "similarity": round(neighbour.score, 3),
+                      "price_ratio": neighbour.price_ratio}
+            record.update((prop, specs[prop]) for prop in SIMILAR_PROPERTIES)
+            records.append(record)
+        return records
+
+    def query(self, constraints: Dict[str, Any], limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """Records for router constraints, with the columns of ``intent_router.build_query``"""
+        if "model" in constraints:
+            return self.details(constraints["model"])
+        if "similar_to" in constraints:
+            return self.similar(constraints["similar_to"], constraints.get("cheaper", False), limit)
+        if "models" in constraints:
+            return [record for name in constraints["models"] for record in self.details(name)]
+        country = constraints.get("country")
+        attributes = [attribute for attribute in attribute_schema if attribute in constraints]
+        candidates: Optional[Set[int]] = None
+        for attribute in attributes:
+            ids = self._candidates(self._relationship(attribute, country), constraints[attribute])
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = set(range(len(self.models)))
+
+        records = []
+        for model_id in sorted(candidates):
+            options = []
+            for attribute in attributes:
+                _, _, _, prop, numeric_prop = attribute_schema[attribute]
+                relationship = self._relationship(attribute, country)
+                value = constraints[attribute]
+                options.append([
+                    node[prop] for node in self.adjacency[relationship].get(model_id, ())
+                    if self._matches(node, prop, numeric_prop, value)
+                ])
+            # Một dòng cho mỗi tổ hợp đích khớp, như MATCH của Neo4j
+            for combination in itertools.product(*options):
+                record = {"model": self.models[model_id]}
+                record.update(zip(attributes, combination))
+                records.append(record)
+                if len(records) >= limit:
+                    return records
+        return records
+
+    def run_routed(self, routed: RoutedQuery) -> Iterator[Dict[str, Any]]:
+        return iter(self.query(routed.constraints, routed.params.get("limit", DEFAULT_LIMIT)))
@@ -0,0 +1,166 @@
+import io
+import re
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from spec_parsing import numeric_properties_cypher
+
+ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+
+_QUOTES_PATTERN = re.compile(r'["\']')
+_SPACES_PATTERN = re.compile(r'\s+')
+
+# Define the mapping of columns to relationship types and target labels
+column_mapping = {
+    'Company Name': ('HAS_COMPANY_NAME', 'Company', 'name'),
+    'Mobile Weight': ('HAS_WEIGHT', 'Weight', 'value'),
+    'RAM': ('HAS_RAM', 'RAM', 'size'),
+    'Front Camera': ('HAS_FRONT_CAMERA', 'Camera', 'name'),
+    'Back Camera': ('HAS_BACK_CAMERA', 'Camera', 'name'),
+    'Processor': ('HAS_PROCESSOR', 'Processor', 'name'),
+    'Battery Capacity': ('HAS_BATTERY', 'Battery', 'capacity'),
+    'Screen Size': ('HAS_SCREEN', 'Screen', 'size'),
+    'Launched Price (Pakistan)': ('HAS_PAKISTAN_PRICE', 'Price', 'value'),
+    'Launched Price (India)': ('HAS_INDIA_PRICE', 'Price', 'value'),
+    'Launched Price (China)': ('HAS_CHINA_PRICE', 'Price', 'value'),
+    'Launched Price (USA)': ('HAS_USA_PRICE', 'Price', 'value'),
+    'Launched Price (Dubai)': ('HAS_DUBAI_PRICE', 'Price', 'value'),
+    'Launched Year': ('HAS_YEAR', 'Year', 'year')
+}
+
+def clean_text(text):
+    """Clean text by removing special characters and normalizing"""
+    if pd.isna(text):
+        return ""
+    text = str(text).strip()
+    # Remove quotes and extra spaces
+    text = _QUOTES_PATTERN.sub('', text)
+    text = _SPACES_PATTERN.sub(' ', text)
+    return text
+
+def clean_series(series):
+    """Vectorized clean_text for a whole column; missing values become ''
+
+    Catalog columns repeat the same few values, so only the distinct values
+    are cleaned and the result is expanded back with the factorized codes.
+    """
+    codes, uniques = pd.factorize(series)
+    cleaned = (
+        pd.Series(uniques).astype("string")
+        .str.strip()
+        .str.replace(_QUOTES_PATTERN, '', regex=True)
+        .str.replace(_SPACES_PATTERN, ' ', regex=True)
+        .fillna("")
+        .replace("nan", "")
+    )
+    values = np.append(cleaned.to_numpy(dtype=object), "")
+    # code -1 (missing) lấy phần tử "" cuối mảng
+    return pd.Series(values[codes], index=series.index, dtype=object)
+
+def detect_encoding(raw):
+    """Return the first encoding in ENCODINGS that decodes the bytes"""
+    for encoding in ENCODINGS:
+        try:
+            raw.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise Exception("Could not read CSV file with any encoding")
+
+def read_csv_data(csv_file):
+    """Read the CSV file once, detecting its encoding from the raw bytes"""
+    with open(csv_file, 'rb') as f:
+        raw = f.read()
+    encoding = detect_encoding(raw)
+    print(f"Successfully read CSV with {encoding} encoding")
+    return pd.read_csv(io.StringIO(raw.decode(encoding)))
+
+def clean_frame(df):
+    """Clean every column of the frame with vectorized string operations"""
+    return df.apply(clean_series)
+
+def first_row_per_model(df):
+    """One row per model of a cleaned frame: the first row of each name, unnamed rows dropped.
+
+    Every loader and reader of the catalog applies this rule, so Neo4j, the
+    delta manifest, the embedded graph, the recommender and the vector
+    documents agree on which row a duplicated model name stands for.
+    """
+    return df[df['Model Name'] != ""].drop_duplicates('Model Name')
+
+def numeric_set_cypher(column, value, variable):
+    """SET clause that (re)writes the typed numeric properties of a target node"""
+    properties = numeric_properties_cypher(column, value)
+    if not properties:
+        return ""
+    return f" SET {variable} += {{{properties[2:]}}}"
+
+@lru_cache(maxsize=None)
+def relationship_target(column, value):
+    """Target pattern, MERGE and SET part of a relationship statement (shared by all models)"""
+    relationship_type, target_label, target_property = column_mapping[column]
+    # Handle special cases for Camera and Price
+    if column == 'Front Camera':
+        return f"(c:Camera {{name: '{value}', type: 'Front'}}) MERGE (m)-[:{relationship_type}]->(c);"
+    if column == 'Back Camera':
+        return f"(c:Camera {{name: '{value}', type: 'Back'}}) MERGE (m)-[:{relationship_type}]->(c);"
+    if column.startswith('Launched Price'):
+        country = column.split('(')[1].split(')')[0]
+        return f"(p:Price {{value: '{value}', country: '{country}'}}) MERGE (m)-[:{relationship_type}]->(p){numeric_set_cypher(column, value, 'p')};"
+    if target_label == 'Year':
+        # Year nodes store the year as an integer
+        return f"(t:Year {{year: {int(float(value))}}}) MERGE (m)-[:{relationship_type}]->(t);"
+    return f"(t:{target_label} {{{target_property}: '{value}'}}) MERGE (m)-[:{relationship_type}]->(t){numeric_set_cypher(column, value, 't')};"
+
+def relationship_query(model_name, column, value):
+    """Cypher statement linking one model to the target node of one column"""
+    return f"MATCH (m:Model {{name: '{model_name}'}}), {relationship_target(column, value)}"
+
+def build_nodes(df):
+    """Unique non-empty values per column of a cleaned frame"""
+    return {column: set(df[column][df[column] != ""].unique()) for column in df.columns}
+
+def build_relationships(df):
+    """Long (model, column, value) frame of all relationships of a cleaned frame"""
+    columns = [column for column in column_mapping if column in df.columns]
+    relationships = df[df['Model Name'] != ""].melt(
+        id_vars='Model Name', value_vars=columns, var_name='column', value_name='value'
+    )
+    relationships = relationships[relationships['value'] != ""]
+    return relationships.rename(columns={'Model Name': 'model'}).reset_index(drop=True)
+
+def run_etl(csv_file):
+    """Read and clean the CSV once, then derive nodes and relationships from the same frame"""
+    df = first_row_per_model(clean_frame(read_csv_data(csv_file)))
+    return df, build_nodes(df), build_relationships(df)
+
+def generate_relationship_queries(relationships):
+    """Cypher statements for a relationships frame from build_relationships"""
+    return [
+        relationship_query(model, column, value)
+        for model, column, value in zip(relationships['model'], relationships['column'], relationships['value'])
+    ]
+
+def main():
+    from extract_entities import generate_cypher_queries
+
+    csv_file = "data/Mobiles-Dataset(2025).csv"
+
+    started = time.perf_counter()
+    df, entities, relationships = run_etl(csv_file)
+
+    with open("neo4j_entities.cypher", 'w', encoding='utf-8') as f:
+        f.write('\n'.join(generate_cypher_queries(entities)))
+    with open("neo4j_relationships.cypher", 'w', encoding='utf-8') as f:
+        f.write('\n'.join(generate_relationship_queries(relationships)))
+
+    print(f"Rows: {len(df)}")
+    print(f"Entities: {sum(len(values) for values in entities.values())}")
+    print(f"Relationships: {len(relationships)}")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
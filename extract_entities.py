@@ -1,34 +1,12 @@
-import pandas as pd
-import re
 from collections import defaultdict
-
-def clean_text(text):
-    """Clean text by removing special characters and normalizing"""
-    if pd.isna(text):
-        return ""
-    text = str(text).strip()
-    # Remove quotes and extra spaces
-    text = re.sub(r'["\']', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text
+from etl import clean_frame, first_row_per_model, numeric_set_cypher, read_csv_data
+from spec_parsing import range_index_queries
 
 def extract_unique_entities(csv_file):
     """Extract all unique entities from the CSV file"""
     
-    # Read CSV file with different encodings
-    encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-    df = None
-    
-    for encoding in encodings:
-        try:
-            df = pd.read_csv(csv_file, encoding=encoding)
-            print(f"Successfully read CSV with {encoding} encoding")
-            break
-        except UnicodeDecodeError:
-            continue
-    
-    if df is None:
-        raise Exception("Could not read CSV file with any encoding")
+    # Chỉ các giá trị của dòng được nạp vào đồ thị (dòng đầu tiên của mỗi model)
+    df = first_row_per_model(clean_frame(read_csv_data(csv_file)))
     
     # Dictionary to store unique entities by category
     entities = defaultdict(set)
@@ -38,9 +16,8 @@ def extract_unique_entities(csv_file):
         print(f"Processing column: {column}")
         
         for value in df[column]:
-            cleaned_value = clean_text(value)
-            if cleaned_value and cleaned_value != "nan":
-                entities[column].add(cleaned_value)
+            if value and value != "nan":
+                entities[column].add(value)
     
     return entities
 
@@ -60,76 +37,78 @@ def generate_cypher_queries(entities):
     cypher_queries.append("CREATE CONSTRAINT screen_size_unique IF NOT EXISTS FOR (s:Screen) REQUIRE s.size IS UNIQUE;")
     cypher_queries.append("CREATE CONSTRAINT price_unique IF NOT EXISTS FOR (pr:Price) REQUIRE pr.value IS UNIQUE;")
     cypher_queries.append("CREATE CONSTRAINT year_unique IF NOT EXISTS FOR (y:Year) REQUIRE y.year IS UNIQUE;")
+    for query in range_index_queries:
+        cypher_queries.append(f"{query};")
     cypher_queries.append("")
     
     # Create Company nodes
     cypher_queries.append("-- Create Company nodes")
     for company in entities['Company Name']:
-        cypher_queries.append(f"CREATE (c:Company {{name: '{company}'}});")
+        cypher_queries.append(f"MERGE (c:Company {{name: '{company}'}});")
     cypher_queries.append("")
     
     # Create Model nodes
     cypher_queries.append("-- Create Model nodes")
     for model in entities['Model Name']:
-        cypher_queries.append(f"CREATE (m:Model {{name: '{model}'}});")
+        cypher_queries.append(f"MERGE (m:Model {{name: '{model}'}});")
     cypher_queries.append("")
     
     # Create Processor nodes
     cypher_queries.append("-- Create Processor nodes")
     for processor in entities['Processor']:
-        cypher_queries.append(f"CREATE (p:Processor {{name: '{processor}'}});")
+        cypher_queries.append(f"MERGE (p:Processor {{name: '{processor}'}});")
     cypher_queries.append("")
     
     # Create Camera nodes (Front and Back)
     cypher_queries.append("-- Create Camera nodes")
     for camera in entities['Front Camera']:
-        cypher_queries.append(f"CREATE (cam:Camera {{name: '{camera}', type: 'Front'}});")
+        cypher_queries.append(f"MERGE (cam:Camera {{name: '{camera}', type: 'Front'}});")
     for camera in entities['Back Camera']:
-        cypher_queries.append(f"CREATE (cam:Camera {{name: '{camera}', type: 'Back'}});")
+        cypher_queries.append(f"MERGE (cam:Camera {{name: '{camera}', type: 'Back'}});")
     cypher_queries.append("")
     
     # Create RAM nodes
     cypher_queries.append("-- Create RAM nodes")
     for ram in entities['RAM']:
-        cypher_queries.append(f"CREATE (r:RAM {{size: '{ram}'}});")
+        cypher_queries.append(f"MERGE (r:RAM {{size: '{ram}'}}){numeric_set_cypher('RAM', ram, 'r')};")
     cypher_queries.append("")
     
     # Create Battery nodes
     cypher_queries.append("-- Create Battery nodes")
     for battery in entities['Battery Capacity']:
-        cypher_queries.append(f"CREATE (b:Battery {{capacity: '{battery}'}});")
+        cypher_queries.append(f"MERGE (b:Battery {{capacity: '{battery}'}}){numeric_set_cypher('Battery Capacity', battery, 'b')};")
     cypher_queries.append("")
     
     # Create Screen nodes
     cypher_queries.append("-- Create Screen nodes")
     for screen in entities['Screen Size']:
-        cypher_queries.append(f"CREATE (s:Screen {{size: '{screen}'}});")
+        cypher_queries.append(f"MERGE (s:Screen {{size: '{screen}'}}){numeric_set_cypher('Screen Size', screen, 's')};")
     cypher_queries.append("")
     
     # Create Price nodes for different countries
     cypher_queries.append("-- Create Price nodes")
     for price in entities['Launched Price (Pakistan)']:
-        cypher_queries.append(f"CREATE (pr:Price {{value: '{price}', country: 'Pakistan'}});")
+        cypher_queries.append(f"MERGE (pr:Price {{value: '{price}', country: 'Pakistan'}}){numeric_set_cypher('Launched Price (Pakistan)', price, 'pr')};")
     for price in entities['Launched Price (India)']:
-        cypher_queries.append(f"CREATE (pr:Price {{value: '{price}', country: 'India'}});")
+        cypher_queries.append(f"MERGE (pr:Price {{value: '{price}', country: 'India'}}){numeric_set_cypher('Launched Price (India)', price, 'pr')};")
     for price in entities['Launched Price (China)']:
-        cypher_queries.append(f"CREATE (pr:Price {{value: '{price}', country: 'China'}});")
+        cypher_queries.append(f"MERGE (pr:Price {{value: '{price}', country: 'China'}}){numeric_set_cypher('Launched Price (China)', price, 'pr')};")
     for price in entities['Launched Price (USA)']:
-        cypher_queries.append(f"CREATE (pr:Price {{value: '{price}', country: 'USA'}});")
+        cypher_queries.append(f"MERGE (pr:Price {{value: '{price}', country: 'USA'}}){numeric_set_cypher('Launched Price (USA)', price, 'pr')};")
     for price in entities['Launched Price (Dubai)']:
-        cypher_queries.append(f"CREATE (pr:Price {{value: '{price}', country: 'Dubai'}});")
+        cypher_queries.append(f"MERGE (pr:Price {{value: '{price}', country: 'Dubai'}}){numeric_set_cypher('Launched Price (Dubai)', price, 'pr')};")
     cypher_queries.append("")
     
     # Create Year nodes
     cypher_queries.append("-- Create Year nodes")
     for year in entities['Launched Year']:
-        cypher_queries.append(f"CREATE (y:Year {{year: {year}}});")
+        cypher_queries.append(f"MERGE (y:Year {{year: {year}}});")
     cypher_queries.append("")
     
     # Create Weight nodes
     cypher_queries.append("-- Create Weight nodes")
     for weight in entities['Mobile Weight']:
-        cypher_queries.append(f"CREATE (w:Weight {{value: '{weight}'}});")
+        cypher_queries.append(f"MERGE (w:Weight {{value: '{weight}'}}){numeric_set_cypher('Mobile Weight', weight, 'w')};")
     cypher_queries.append("")
     
     return cypher_queries
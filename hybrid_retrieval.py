@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections import defaultdict, namedtuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+# status: "done", "error", "timeout" (quá hạn chót của nhánh) hoặc "cancelled" (đã có kết quả đủ tốt)
+BranchResult = namedtuple("BranchResult", ["name", "status", "value", "error", "elapsed_ms"])
+
+RRF_K = 60
+
+def reciprocal_rank_fusion(rankings: Dict[str, Sequence[Any]], k: int = RRF_K,
+                           weights: Optional[Dict[str, float]] = None) -> List[Tuple[Any, float]]:
+    """Fuse ranked lists: ``score(item) = sum(weight / (k + rank))`` over the lists that contain it.
+
+    Ranks start at 1 and an item repeated in one list only counts once. Ties
+    keep the order in which items first appear.
+    """
+    scores: Dict[Any, float] = defaultdict(float)
+    for source, ranking in rankings.items():
+        weight = (weights or {}).get(source, 1.0)
+        seen = set()
+        for rank, item in enumerate(ranking, 1):
+            if item in seen:
+                continue
+            seen.add(item)
+            scores[item] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda entry: -entry[1])
+
+async def fan_out(
+    branches: Dict[str, Callable[[], Awaitable[Any]]],
+    deadlines: Optional[Dict[str, float]] = None,
+    good_enough: Optional[Callable[[Dict[str, BranchResult]], bool]] = None,
+    on_result: Optional[Callable[[BranchResult], None]] = None,
+) -> Dict[str, BranchResult]:
+    """Run ``branches`` concurrently and return one BranchResult per branch.
+
+    A branch still running at its deadline (seconds from the start,
+    ``deadlines[name]``; no deadline when absent) is cancelled as "timeout".
+    After every completion ``good_enough(results)`` is asked and, once it is
+    true, the branches still running are cancelled. The wait therefore ends
+    at the first good enough result or at the slowest deadline, never at the
+    sum of the branches. ``on_result`` sees each result as it arrives.
+    """
+    deadlines = deadlines or {}
+    started = time.perf_counter()
+    tasks = {asyncio.ensure_future(branch()): name for name, branch in branches.items()}
+    results: Dict[str, BranchResult] = {}
+
+    def record(task, status: str) -> None:
+        value = error = None
+        if status == "done":
+            if task.cancelled():
+                status = "cancelled"
+            elif task.exception() is not None:
+                status, error = "error", task.exception()
+            else:
+                value = task.result()
+        result = BranchResult(tasks[task], status, value, error, (time.perf_counter() - started) * 1000)
+        results[result.name] = result
+        if on_result is not None:
+            on_result(result)
+
+    pending = set(tasks)
+    try:
+        while pending:
+            now = time.perf_counter() - started
+            remaining = [deadlines[tasks[task]] - now for task in pending if tasks[task] in deadlines]
+            done, pending = await asyncio.wait(pending, timeout=max(min(remaining), 0) if remaining else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                record(task, "done")
+            now = time.perf_counter() - started
+            expired = {task for task in pending if deadlines.get(tasks[task], float("inf")) <= now}
+            for task in expired:
+                task.cancel()
+                record(task, "timeout")
+            pending -= expired
+            if pending and good_enough is not None and good_enough(results):
+                for task in pending:
+                    task.cancel()
+                    record(task, "cancelled")
+                pending = set()
+    finally:
+        # Kể cả khi chính lời gọi bị huỷ: không để nhánh nào chạy tiếp
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
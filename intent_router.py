@@ -0,0 +1,523 @@
+import itertools
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from model_specs import CATALOG_SPECS_QUERY, COMPARE_MODELS_QUERY, MODEL_DETAILS_QUERY, SIMILAR_MODELS_QUERY
+from name_index import Mention, NameIndex
+from translation_cache import normalize_question
+
+# constraints: ràng buộc router đã trích (để backend khác ngoài Neo4j thực thi cùng truy vấn)
+RoutedQuery = namedtuple("RoutedQuery", ["name", "cypher", "params", "constraints"], defaults=(None,))
+
+DEFAULT_LIMIT = 20
+RECOMMEND_LIMIT = 5
+SIMILAR_LIMIT = 5
+
+# attribute -> (relationship, label, variable, text property, numeric property)
+attribute_schema = {
+    "company": ("HAS_COMPANY_NAME", "Company", "c", "name", None),
+    "ram": ("HAS_RAM", "RAM", "r", "size", "gb"),
+    "year": ("HAS_YEAR", "Year", "y", "year", "year"),
+    "battery": ("HAS_BATTERY", "Battery", "b", "capacity", "mah"),
+    "screen": ("HAS_SCREEN", "Screen", "s", "size", "inches"),
+    "weight": ("HAS_WEIGHT", "Weight", "w", "value", "grams"),
+    "price": (None, "Price", "p", "value", "amount"),
+}
+
+currency_countries = {"pkr": "Pakistan", "inr": "India", "cny": "China", "usd": "USA", "aed": "Dubai"}
+
+# Tên dòng máy -> hãng
+company_aliases = {
+    "iphone": "Apple",
+    "ipad": "Apple",
+    "galaxy": "Samsung",
+    "redmi": "Xiaomi",
+    "poco": "Xiaomi",
+    "pixel": "Google",
+}
+
+# Hãng điện thoại phổ biến: hỏi về hãng không có trong catalog thì để LLM trả lời,
+# không bỏ qua tên hãng rồi trả về điện thoại của mọi hãng
+phone_brands = {
+    "apple": "Apple", "samsung": "Samsung", "xiaomi": "Xiaomi", "google": "Google", "oneplus": "OnePlus",
+    "oppo": "Oppo", "vivo": "Vivo", "realme": "Realme", "huawei": "Huawei", "honor": "Honor",
+    "motorola": "Motorola", "moto": "Motorola", "nokia": "Nokia", "sony": "Sony", "asus": "Asus",
+    "lenovo": "Lenovo", "infinix": "Infinix", "tecno": "Tecno", "iqoo": "iQOO", "zte": "ZTE", "meizu": "Meizu",
+}
+
+# Nhu cầu sử dụng (hồ sơ điểm trong recommender.use_case_profiles) -> cách nói trong câu hỏi
+use_case_keywords = {
+    "gaming": r"choi game|chien game|gaming|gamer|for games?",
+    "photography": r"chup anh|chup hinh|quay phim|quay video|photography|photos?|pictures?",
+    "selfie": r"selfie|tu suong",
+    "battery": r"pin trau|pin khoe|pin lau|pin ben|battery life|long battery|long lasting",
+    "compact": r"nho gon|gon nhe|compact|small phone",
+    "budget": r"gia re|binh dan|sinh vien|cheap|budget|affordable",
+    "big_screen": r"man hinh lon|xem phim|big screen|large screen|movies?",
+}
+
+# Từ so sánh đứng trước giá trị -> toán tử
+comparator_words = [
+    (r"duoi|under|below|less than|nho hon|it hon|re hon|nhe hon|truoc|before", "<"),
+    (r"toi da|khong qua|at most|max|den|to", "<="),
+    (r"tren|over|above|more than|lon hon|nhieu hon|cao hon|sau|after", ">"),
+    (r"tu|from|it nhat|toi thieu|at least|min|since", ">="),
+]
+range_param_names = {"<": "max", "<=": "max", ">": "min", ">=": "min"}
+
+# Câu hỏi có các từ này cần LLM (chi tiết, so sánh, thuộc tính khác, xếp hạng, ...)
+_BLOCKING_PATTERN = re.compile(
+    r"\b(chi tiet|thong tin|so sanh|compare|detail|details|spec|specs|camera|chip|cpu|processor|"
+    r"vi xu ly|snapdragon|dimensity|bionic|exynos|helio|bao nhieu|how much|nhat|cheapest|best|"
+    r"tu van|goi y|recommend|khong phai|except|without|hoac|or)\b"
+)
+# Phủ định, đếm/tổng hợp và sắp xếp: không template nào giữ được nghĩa này, để LLM xử lý
+_CHANGES_MEANING_PATTERN = re.compile(
+    r"\b(not|isn t|aren t|don t|doesn t|other than|except|excluding|exclude|without|"
+    r"khong phai|khong co|khong la|ngoai|tru|loai tru|"
+    r"count|how many|number of|total|average|avg|dem|tong|trung binh|so luong|"
+    r"sort|sorted|sort by|order by|ordered|rank|ranked|ranking|ascending|descending|"
+    r"sap xep|xep hang|xep theo|tang dan|giam dan|"
+    r"cheapest|(?<!at )most|(?<!at )least|highest|lowest|largest|smallest|newest|latest|oldest|"
+    r"nhieu nhat|cao nhat|thap nhat|re nhat|dat nhat|lon nhat|nho nhat|nhe nhat|nang nhat|moi nhat)\b"
+)
+# Câu hỏi chi tiết về đúng một model: đọc thuộc tính phẳng trên node Model (model_specs)
+_DETAILS_PATTERN = re.compile(r"\b(chi tiet|thong tin|thong so|cau hinh|detail|details|spec|specs|specifications)\b")
+# So sánh nhiều model: tên chưa khớp chính xác thì tách theo các từ nối rồi so khớp gần đúng
+_COMPARE_PATTERN = re.compile(r"\b(so sanh|compare|vs|versus)\b")
+_COMPARE_SEPARATOR_PATTERN = re.compile(r"\s*(?:,|\bva\b|\bvoi\b|\bvs\b|\bversus\b|\band\b|\bwith\b)\s*")
+# Máy tương tự một model: đọc quan hệ SIMILAR_TO tính trước (similar_phones)
+_SIMILAR_PATTERN = re.compile(
+    r"\b(giong|tuong tu|tuong duong|thay the|similar|alternatives?|phones? like|something like)\b"
+)
+_CHEAPER_PATTERN = re.compile(r"\b(re hon|gia thap hon|cheaper|less expensive|lower price)\b")
+# Tư vấn theo nhu cầu: chấm điểm toàn catalog trong bộ nhớ (recommender), không dùng Cypher
+_USE_CASE_PATTERNS = {use_case: re.compile(rf"\b({words})\b") for use_case, words in use_case_keywords.items()}
+_RECOMMEND_PATTERN = re.compile(r"\b(tu van|goi y|de xuat|nen mua|recommend|suggest|should i buy)\b")
+_MULTI_MODEL_PATTERN = re.compile(r"\b(so sanh|compare|vs|versus|hoac|or)\b")
+_COMPARATOR_PATTERN = re.compile(r"\b(" + "|".join(words for words, _ in comparator_words) + r")\b")
+_COMPARATOR_OPS = [(re.compile(rf"^(?:{words})$"), op) for words, op in comparator_words]
+# Giữa từ so sánh và giá trị chỉ được có tên thuộc tính / từ đệm
+_GAP_PATTERN = re.compile(r"^(?:\s|gia|ram|pin|nam|man hinh|man|can nang|nang|la|khoang|co|bang|muc|la khoang)*$")
+_PRICE_PATTERN = re.compile(r"\b(pkr|inr|cny|usd|aed)\s*(\d[\d,.]*)")
+_PRICE_AFTER_PATTERN = re.compile(r"\b(\d[\d,.]*)\s*(pkr|inr|cny|usd|aed)\b")
+_GB_PATTERN = re.compile(r"\b(\d+)\s*gb\b")
+_BATTERY_PATTERN = re.compile(r"\b(\d[\d,.]*)\s*mah\b")
+_SCREEN_PATTERN = re.compile(r"\b(\d{1,2}(?:\.\d+)?)\s*(?:inches|inch|in)\b")
+_WEIGHT_PATTERN = re.compile(r"\b(\d{2,3}(?:\.\d+)?)\s*(?:g|gram|grams)\b")
+_YEAR_PATTERN = re.compile(r"\b(20[0-4]\d)\b(?![.,]?\d)")
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+def _number(text: str) -> Optional[float]:
+    match = _NUMBER_PATTERN.search(str(text))
+    if match is None:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+def _comparator(text: str, start: int) -> Optional[str]:
+    """Operator of the comparator word right before position ``start``, if any"""
+    window_start = max(0, start - 30)
+    window = text[window_start:start]
+    op = None
+    for match in _COMPARATOR_PATTERN.finditer(window):
+        if _GAP_PATTERN.match(window[match.end():]):
+            for pattern, candidate in _COMPARATOR_OPS:
+                if pattern.match(match.group(1)):
+                    op = candidate
+                    break
+    return op
+
+@lru_cache(maxsize=256)
+def build_query(shape: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> str:
+    """Compose a parameterized Cypher query.
+
+    ``shape`` is a tuple of (attribute, operators); an empty operator tuple
+    means equality on the stored text value (``$<attribute>``), otherwise a
+    range predicate on the numeric property (``$<attribute>_min``/``_max``)
+    that a range index can serve.
+    """
+    lines = ["MATCH (m:Model)"]
+    columns = ["m.name AS model"]
+    for attribute, ops in shape:
+        relationship, label, var, text_prop, numeric_prop = attribute_schema[attribute]
+        arrow = f"-[:{relationship}]->" if relationship else "-->"
+        if not ops:
+            if attribute == "price":
+                lines.append(f"MATCH (m){arrow}({var}:{label} {{{text_prop}: $price, country: $country}})")
+            else:
+                lines.append(f"MATCH (m){arrow}({var}:{label} {{{text_prop}: ${attribute}}})")
+        else:
+            predicates = [f"{var}.{numeric_prop} {op} ${attribute}_{range_param_names[op]}" for op in ops]
+            if attribute == "price":
+                predicates.insert(0, f"{var}.country = $country")
+            lines.append(f"MATCH (m){arrow}({var}:{label}) WHERE " + " AND ".join(predicates))
+        columns.append(f"{var}.{text_prop} AS {attribute}")
+    lines.append(f"RETURN {', '.join(columns)} LIMIT $limit")
+    return "\n".join(lines)
+
+def shape_name(shape) -> str:
+    return "find_by_" + "_and_".join(attribute if not ops else f"{attribute}_range" for attribute, ops in shape)
+
+# Một số Cypher template mẫu cho các truy vấn phổ biến (có tham số)
+cypher_templates = {
+    shape_name(shape): build_query(shape)
+    for shape in (
+        (("company", ()),),
+        (("ram", ()),),
+        (("price", ()),),
+        (("year", ()),),
+        (("battery", ()),),
+        (("screen", ()),),
+        (("weight", ()),),
+        (("price", ("<=",)),),
+        (("ram", (">=",)),),
+        (("battery", (">=",)),),
+        (("screen", (">=",)),),
+        (("weight", ("<=",)),),
+        (("year", (">=",)),),
+    )
+}
+cypher_templates["model_details"] = MODEL_DETAILS_QUERY
+cypher_templates["compare_models"] = COMPARE_MODELS_QUERY
+
+def compare_query(models) -> RoutedQuery:
+    models = list(models)
+    return RoutedQuery("compare_models", COMPARE_MODELS_QUERY, {"names": models}, {"models": models})
+
+class IntentRouter:
+    """Rule/lexicon based router from questions to parameterized Cypher templates.
+
+    ``entities`` maps CSV column names (``Company Name``, ``RAM``, ...) to the
+    values stored in the graph, as returned by
+    ``extract_entities.extract_unique_entities``. Equality constraints are
+    snapped to these vocabularies so the templates match the graph exactly,
+    comparisons ("dưới PKR 200,000", "pin trên 4000mAh") become range
+    predicates on the typed numeric properties. Questions the router cannot
+    fully explain return ``None`` and go to the LLM. ``names`` resolves typed
+    model/company mentions ("ip 15 pro", "samsng") to catalog names.
+    """
+
+    def __init__(self, entities: Optional[Dict[str, Iterable[str]]] = None, limit: int = DEFAULT_LIMIT):
+        entities = entities or {}
+        self.limit = limit
+        self.companies = {normalize_question(c): c for c in entities.get("Company Name", ())}
+        self.model_names = {normalize_question(m): m for m in entities.get("Model Name", ())}
+        self.models = sorted(self.model_names, key=len, reverse=True)
+        self.names = NameIndex(entities.get("Model Name", ()), entities.get("Company Name", ()))
+        self.vocabularies = {
+            "ram": self._by_number(entities.get("RAM", ())),
+            "battery": self._by_number(entities.get("Battery Capacity", ())),
+            "screen": self._by_number(entities.get("Screen Size", ())),
+            "weight": self._by_number(entities.get("Mobile Weight", ())),
+        }
+        self.years = {int(y) for y in (_number(v) for v in entities.get("Launched Year", ())) if y is not None}
+        self.prices = {}
+        for country in currency_countries.values():
+            self.prices[country] = self._by_number(entities.get(f"Launched Price ({country})", ()))
+
+    @staticmethod
+    def _by_number(values: Iterable[str]) -> Dict[float, str]:
+        by_number = {}
+        for value in values:
+            number = _number(value)
+            if number is not None:
+                by_number.setdefault(number, value)
+        return by_number
+
+    @classmethod
+    def from_csv(cls, csv_file: str, **kwargs) -> "IntentRouter":
+        from extract_entities import extract_unique_entities
+        return cls(extract_unique_entities(csv_file), **kwargs)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs) -> "IntentRouter":
+        """Vocabularies are the dictionaries of a ``catalog_snapshot.CatalogSnapshot`` (no row scan)"""
+        return cls(snapshot.entities(), **kwargs)
+
+    @classmethod
+    def from_graph(cls, driver, **kwargs) -> "IntentRouter":
+        queries = {
+            "Company Name": "MATCH (n:Company) RETURN DISTINCT n.name AS value",
+            "Model Name": "MATCH (n:Model) RETURN DISTINCT n.name AS value",
+            "RAM": "MATCH (n:RAM) RETURN DISTINCT n.size AS value",
+            "Battery Capacity": "MATCH (n:Battery) RETURN DISTINCT n.capacity AS value",
+            "Screen Size": "MATCH (n:Screen) RETURN DISTINCT n.size AS value",
+            "Mobile Weight": "MATCH (n:Weight) RETURN DISTINCT n.value AS value",
+            "Launched Year": "MATCH (n:Year) RETURN DISTINCT n.year AS value",
+        }
+        entities: Dict[str, Set[str]] = {}
+        with driver.session() as session:
+            for column, query in queries.items():
+                entities[column] = {str(r["value"]) for r in session.run(query) if r["value"] is not None}
+            for record in session.run("MATCH (n:Price) RETURN DISTINCT n.country AS country, n.value AS value"):
+                entities.setdefault(f"Launched Price ({record['country']})", set()).add(str(record["value"]))
+        return cls(entities, **kwargs)
+
+    def _constraint(self, constraints, attribute, op, value, vocabulary=None) -> bool:
+        """Record one equality or range constraint; False if it cannot be served"""
+        if op is None:
+            if attribute in constraints:
+                return False
+            if vocabulary is not None:
+                # Giá trị phải có trong đồ thị
+                value = vocabulary.get(value)
+                if value is None:
+                    return False
+            constraints[attribute] = value
+            return True
+        current = constraints.setdefault(attribute, {})
+        if not isinstance(current, dict) or range_param_names[op] in {range_param_names[o] for o in current}:
+            return False
+        current[op] = value
+        return True
+
+    def extract(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return the constraints found in the question, or None if it needs the LLM.
+
+        Equality constraints map to a graph value (``{"ram": "8GB"}``), ranges
+        to ``{operator: number}`` (``{"price": {"<": 200000}}``).
+        """
+        text = normalize_question(str(question).replace("$", " usd "))
+        if _BLOCKING_PATTERN.search(text) or _CHANGES_MEANING_PATTERN.search(text):
+            return None
+        padded = f" {text} "
+        if any(f" {model} " in padded for model in self.models):
+            return None
+
+        constraints: Dict[str, Any] = {}
+        spans = []
+
+        for match in _PRICE_PATTERN.finditer(text):
+            country = currency_countries[match.group(1)]
+            if constraints.setdefault("country", country) != country:
+                return None
+            op = _comparator(text, match.start())
+            value = _number(match.group(2))
+            if op is None:
+                value = self.prices.get(country, {}).get(value)
+                if value is None:
+                    return None
+                if not self._constraint(constraints, "price", None, value):
+                    return None
+            elif not self._constraint(constraints, "price", op, int(value)):
+                return None
+            spans.append(match.span())
+
+        for match in _GB_PATTERN.finditer(text):
+            before = text[max(0, match.start() - 15):match.start()]
+            after = text[match.end():match.end() + 5]
+            if "ram" not in before and not after.strip().startswith("ram"):
+                continue  # dung lượng bộ nhớ trong (128gb) -> không xử lý
+            if not self._numeric(constraints, text, match, "ram"):
+                return None
+            spans.append(match.span())
+
+        for pattern, attribute in ((_BATTERY_PATTERN, "battery"), (_SCREEN_PATTERN, "screen"), (_WEIGHT_PATTERN, "weight")):
+            for match in pattern.finditer(text):
+                if any(start <= match.start() < end for start, end in spans):
+                    continue
+                if not self._numeric(constraints, text, match, attribute):
+                    return None
+                spans.append(match.span())
+
+        for match in _YEAR_PATTERN.finditer(text):
+            if any(start <= match.start() < end for start, end in spans):
+                continue
+            year = int(match.group(1))
+            op = _comparator(text, match.start())
+            if op is None and self.years and year not in self.years:
+                return None
+            if not self._constraint(constraints, "year", op, year):
+                return None
+            spans.append(match.span())
+
+        # Còn số chưa giải thích được (128gb, 50mp, ...) thì để LLM xử lý
+        consumed = text
+        for start, end in sorted(spans, reverse=True):
+            consumed = consumed[:start] + " " + consumed[end:]
+        if _NUMBER_PATTERN.search(consumed):
+            return None
+
+        companies = self._find_companies(consumed)
+        if len(companies) > 1 or self._unknown_company(consumed):
+            return None
+        if companies:
+            constraints["company"] = companies[0]
+
+        if "price" not in constraints:
+            constraints.pop("country", None)
+        return constraints or None
+
+    def _numeric(self, constraints, text, match, attribute) -> bool:
+        op = _comparator(text, match.start())
+        value = _number(match.group(1))
+        if op is None:
+            vocabulary = self.vocabularies[attribute]
+            if not vocabulary:
+                if attribute != "ram":
+                    return False
+                # Không có từ vựng: dùng định dạng chuẩn của RAM trong dữ liệu
+                return self._constraint(constraints, attribute, None, f"{int(value)}GB")
+            return self._constraint(constraints, attribute, None, value, vocabulary)
+        return self._constraint(constraints, attribute, op, value)
+
+    def _find_companies(self, text: str) -> List[str]:
+        """Companies mentioned by name or by product line, in catalog order"""
+        padded = f" {text} "
+        found = []
+        for normalized, company in self.companies.items():
+            if f" {normalized} " in padded and company not in found:
+                found.append(company)
+        for alias, company in company_aliases.items():
+            if (f" {alias} " in padded and (not self.companies or company in self.companies.values())
+                    and company not in found):
+                found.append(company)
+        return found
+
+    def _unknown_company(self, text: str) -> bool:
+        """True if the text names a brand or product line the catalog has no phones of"""
+        if not self.companies:
+            return False
+        padded = f" {text} "
+        return any(f" {word} " in padded and normalize_question(company) not in self.companies
+                   for word, company in itertools.chain(phone_brands.items(), company_aliases.items()))
+
+    def _find_company(self, text: str) -> Optional[str]:
+        """The one company mentioned, or None when there is none or several ("Samsung và Apple")"""
+        companies = self._find_companies(text)
+        return companies[0] if len(companies) == 1 else None
+
+    def _find_models(self, text: str) -> List[str]:
+        """Model names mentioned in a normalized question; longer names win over their prefixes"""
+        padded = f" {text} "
+        found = []
+        for model in self.models:
+            position = padded.find(f" {model} ")
+            if position >= 0:
+                found.append((position, self.model_names[model]))
+                padded = padded.replace(f" {model} ", " | " + " " * (len(model) - 1))
+        return [name for _, name in sorted(found)]
+
+    def canonicalize(self, question: str) -> Tuple[str, List[Mention]]:
+        """The question with typed model/company mentions replaced by catalog names"""
+        return self.names.canonicalize(question)
+
+    def resolve_models(self, names: Iterable[str]) -> List[str]:
+        """Catalog names for typed model names: exact match first, else the name index"""
+        resolved = []
+        for name in names:
+            match = self.model_names.get(normalize_question(name)) or self.names.resolve(name)
+            if match is not None and match not in resolved:
+                resolved.append(match)
+        return resolved
+
+    def route_compare(self, question: str) -> Optional[RoutedQuery]:
+        """One UNWIND query for "so sánh A và B" when at least two models can be resolved"""
+        text = normalize_question(question)
+        if _COMPARE_PATTERN.search(text) is None:
+            return None
+        models = self._find_models(text)
+        if len(models) < 2:
+            # normalize_question bỏ dấu phẩy, nên tách theo dấu phẩy trên câu gốc trước
+            pieces = " , ".join(normalize_question(piece) for piece in str(question).split(","))
+            parts = _COMPARE_SEPARATOR_PATTERN.split(_COMPARE_PATTERN.sub(",", pieces))
+            models = self.resolve_models(part for part in parts if part)
+        if len(models) < 2:
+            return None
+        return compare_query(models)
+
+    def route_details(self, question: str) -> Optional[RoutedQuery]:
+        """Single-node details query when the question asks for the specs of exactly one known model"""
+        text = normalize_question(question)
+        if not _DETAILS_PATTERN.search(text) or _MULTI_MODEL_PATTERN.search(text):
+            return None
+        models = self._find_models(text)
+        if len(models) != 1:
+            return None
+        return RoutedQuery("model_details", MODEL_DETAILS_QUERY, {"name": models[0]}, {"model": models[0]})
+
+    def route_similar(self, question: str) -> Optional[RoutedQuery]:
+        """Single-hop SIMILAR_TO read for "máy giống A (rẻ hơn)" when exactly one model is mentioned"""
+        text = normalize_question(question)
+        if not _SIMILAR_PATTERN.search(text) or _COMPARE_PATTERN.search(text):
+            return None
+        models = self._find_models(text)
+        if len(models) != 1:
+            return None
+        # Ràng buộc khác (giá, RAM, ...) ngoài tên model: để LLM xử lý
+        consumed = f" {text} ".replace(f" {normalize_question(models[0])} ", " ")
+        if _NUMBER_PATTERN.search(consumed):
+            return None
+        cheaper = _CHEAPER_PATTERN.search(text) is not None
+        params = {"name": models[0], "cheaper": cheaper, "limit": SIMILAR_LIMIT}
+        return RoutedQuery("similar_models", SIMILAR_MODELS_QUERY, params, {"similar_to": models[0], "cheaper": cheaper})
+
+    def route_recommend(self, question: str) -> Optional[RoutedQuery]:
+        """Needs-based recommendation ("chơi game dưới USD 500"), served by recommender.Recommender"""
+        text = normalize_question(str(question).replace("$", " usd "))
+        use_cases = [use_case for use_case, pattern in _USE_CASE_PATTERNS.items() if pattern.search(text)]
+        if not use_cases and not _RECOMMEND_PATTERN.search(text):
+            return None
+        constraints: Dict[str, Any] = {}
+        spans = []
+        prices = [(m.start(), m.span(), m.group(1), m.group(2)) for m in _PRICE_PATTERN.finditer(text)]
+        prices += [(m.start(), m.span(), m.group(2), m.group(1)) for m in _PRICE_AFTER_PATTERN.finditer(text)]
+        for start, span, currency, amount in sorted(prices):
+            if any(s <= start < e for s, e in spans):
+                continue
+            country = currency_countries[currency]
+            if constraints.setdefault("country", country) != country:
+                return None
+            # Không có từ so sánh: số tiền là ngân sách tối đa
+            op = _comparator(text, start) or "<="
+            if not self._constraint(constraints, "price", op, _number(amount)):
+                return None
+            spans.append(span)
+        consumed = text
+        for start, end in sorted(spans, reverse=True):
+            consumed = consumed[:start] + " " + consumed[end:]
+        # Ràng buộc khác (RAM, năm, ...) hoặc chỉ hỏi tư vấn chung chung: để LLM xử lý
+        if _NUMBER_PATTERN.search(consumed) or not (use_cases or "price" in constraints):
+            return None
+        constraints["use_cases"] = use_cases or ["all_round"]
+        companies = self._find_companies(consumed)
+        if len(companies) > 1 or self._unknown_company(consumed):
+            return None
+        if companies:
+            constraints["company"] = companies[0]
+        return RoutedQuery("recommend", CATALOG_SPECS_QUERY, {"limit": RECOMMEND_LIMIT}, constraints)
+
+    def route(self, question: str) -> Optional[RoutedQuery]:
+        # Mọi route (kể cả tư vấn, máy tương tự) đều bỏ qua phủ định/sắp xếp: để LLM xử lý
+        if _CHANGES_MEANING_PATTERN.search(normalize_question(question)):
+            return None
+        special = (self.route_compare(question) or self.route_details(question)
+                   or self.route_similar(question) or self.route_recommend(question))
+        if special is not None:
+            return special
+        constraints = self.extract(question)
+        if constraints is None:
+            return None
+        shape = []
+        params: Dict[str, Any] = {"limit": self.limit}
+        for attribute in attribute_schema:
+            if attribute not in constraints:
+                continue
+            value = constraints[attribute]
+            if isinstance(value, dict):
+                ops = tuple(sorted(value))
+                for op, number in value.items():
+                    params[f"{attribute}_{range_param_names[op]}"] = number
+            else:
+                ops = ()
+                params[attribute] = value
+            shape.append((attribute, ops))
+        if "country" in constraints:
+            params["country"] = constraints["country"]
+        shape = tuple(shape)
+        return RoutedQuery(shape_name(shape), build_query(shape), params, constraints)
@@ -1,21 +1,125 @@
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from neo4j import GraphDatabase
-from typing import List, Any, Optional
+import asyncio
+import itertools
+import os
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, List, Any, Optional, Dict, AsyncIterator, Iterator, Tuple
+from translation_cache import TranslationCache, question_tokens
+from conversation_memory import ConversationMemory, count_tokens
+from result_cache import ResultCache, read_catalog_version
+from cypher_guard import CypherGuard, explain_plan, static_violation
+from hybrid_retrieval import BranchResult, fan_out, reciprocal_rank_fusion
+from intent_router import IntentRouter, RoutedQuery, compare_query, cypher_templates
+from model_specs import comparison_records
+from single_flight import MicroBatcher, SingleFlight
+from tracing import Span, Trace, Tracer
+
+# LangChain, neo4j, FAISS, NumPy và pandas chỉ được import ở lần dùng đầu tiên (khởi động nhanh)
+if TYPE_CHECKING:
+    from catalog_snapshot import CatalogSnapshot
+    from embedded_graph import EmbeddedGraph
+    from recommender import Recommender
+    from vector_store import VectorStore
 
 # Neo4j config
 NEO4J_URL = ""
 NEO4J_USER = ""
 NEO4J_PASSWORD = ""
 
-driver = GraphDatabase.driver(NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Backend đồ thị: "neo4j" (tự chuyển sang đồ thị nhúng khi Neo4j không truy cập được)
+# hoặc "embedded" (đồ thị trong bộ nhớ dựng từ CATALOG_CSV, không cần server)
+GRAPH_BACKEND = "neo4j"
+CATALOG_CSV = "data/Mobiles-Dataset(2025).csv"
+# Bản columnar của catalog (python catalog_snapshot.py), map vào bộ nhớ thay cho đọc lại CSV
+CATALOG_SNAPSHOT = "data/catalog_snapshot"
+
+# Driver bất đồng bộ cho app (pool kết nối dùng chung giữa các phiên)
+NEO4J_MAX_POOL_SIZE = 50
+
+# Driver, LLM và prompt được tạo ở lần dùng đầu tiên qua get_driver(), get_llm(), ...
+# (import module không cần cấu hình hay kết nối; có thể gán sẵn để thay thế khi test)
+driver = None
+async_driver = None
+llm = None
+cypher_prompt_template = None
+_init_lock = threading.RLock()
+
+def neo4j_enabled() -> bool:
+    """Chỉ dùng Neo4j khi chọn backend "neo4j" và đã cấu hình NEO4J_URL"""
+    return GRAPH_BACKEND == "neo4j" and bool(NEO4J_URL)
+
+def get_driver():
+    global driver
+    if driver is None:
+        with _init_lock:
+            if driver is None:
+                from neo4j import GraphDatabase
+                driver = GraphDatabase.driver(NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    return driver
+
+def get_async_driver():
+    global async_driver
+    if async_driver is None:
+        with _init_lock:
+            if async_driver is None:
+                from neo4j import AsyncGraphDatabase
+                async_driver = AsyncGraphDatabase.driver(
+                    NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD), max_connection_pool_size=NEO4J_MAX_POOL_SIZE
+                )
+    return async_driver
+
+def get_llm():
+    global llm
+    if llm is None:
+        with _init_lock:
+            if llm is None:
+                # LLM config
+                from langchain_openai import ChatOpenAI
+                llm = ChatOpenAI(temperature=0)
+    return llm
+
+def get_cypher_prompt():
+    global cypher_prompt_template
+    if cypher_prompt_template is None:
+        from langchain.prompts import PromptTemplate
+        cypher_prompt_template = PromptTemplate.from_template(CYPHER_PROMPT)
+    return cypher_prompt_template
+
+def _is_connection_error(e: Exception) -> bool:
+    from neo4j.exceptions import DriverError
+    return isinstance(e, DriverError)
 
-# LLM config
-llm = ChatOpenAI(temperature=0)
+# Cache câu hỏi -> Cypher (đặt đường dẫn file để giữ cache giữa các lần chạy)
+TRANSLATION_CACHE_PATH: Optional[str] = None
+translation_cache = TranslationCache(path=TRANSLATION_CACHE_PATH)
+
+# Câu hỏi giống nhau (sau chuẩn hoá) tới cùng lúc dùng chung một lời gọi LLM và một truy vấn Neo4j;
+# bản dịch tới khi không có lời gọi LLM nào đang chạy được gửi ngay, còn các bản dịch tới trong lúc
+# một lô đang chạy được gom trong LLM_BATCH_WINDOW giây thành một lời gọi llm.batch (None: không gom)
+LLM_BATCH_WINDOW: Optional[float] = 0.01
+LLM_BATCH_MAX_SIZE = 16
+
+def _llm_batch(prompts: List[str]):
+    return get_llm().batch(prompts, return_exceptions=True)
+
+async def _allm_batch(prompts: List[str]):
+    return await get_llm().abatch(prompts, return_exceptions=True)
+
+translation_flights = SingleFlight()
+query_flights = SingleFlight()
+# Đọc cấu hình ở mỗi lần submit: gán lại LLM_BATCH_WINDOW sau khi import vẫn có hiệu lực
+llm_batcher = MicroBatcher(_llm_batch, _allm_batch, lambda: LLM_BATCH_WINDOW, lambda: LLM_BATCH_MAX_SIZE)
 
 # Cypher prompt for LLM
-cypher_prompt_template = PromptTemplate.from_template("""
+CYPHER_PROMPT = """
 Bạn là một trợ lý AI truy vấn hệ thống đồ thị Neo4j lưu thông tin điện thoại.
+Các thuộc tính số (đã chuẩn hoá đơn vị, có range index) dùng cho so sánh lớn/nhỏ hơn:
+Price.amount (số nguyên, theo tiền tệ của Price.country), RAM.gb, Battery.mah, Screen.inches, Weight.grams, Year.year.
+Luôn dùng các thuộc tính số này với <, <=, >, >= thay vì CONTAINS trên chuỗi.
+Mỗi node Model có sẵn bản sao thông số (chuỗi): company, weight, ram, front_camera, back_camera, processor,
+battery, screen, price_pakistan, price_india, price_china, price_usa, price_dubai, year.
+Khi hỏi chi tiết / giá / thông số của một điện thoại cụ thể, đọc các thuộc tính này trên node Model, không MATCH thêm quan hệ.
 
 Dưới đây là một số ví dụ:
 Câu hỏi: các điện thoại nào có cân nặng 194g.
@@ -46,6 +150,20 @@ Cypher query:
 MATCH (m:Model)-[:HAS_PAKISTAN_PRICE]->(p:Price {{value: "PKR 200,000", country: "Pakistan"}})
 RETURN m.name
 
+Câu hỏi: Điện thoại nào giá dưới PKR 200,000?
+Cypher query:
+MATCH (m:Model)-[:HAS_PAKISTAN_PRICE]->(p:Price)
+WHERE p.amount < 200000
+RETURN m.name, p.value
+
+Câu hỏi: Điện thoại nào có pin trên 4000mAh và màn hình từ 6.5 inches?
+Cypher query:
+MATCH (m:Model)-[:HAS_BATTERY]->(b:Battery)
+WHERE b.mah > 4000
+MATCH (m)-[:HAS_SCREEN]->(s:Screen)
+WHERE s.inches >= 6.5
+RETURN m.name, b.capacity, s.size
+
 Câu hỏi: Điện thoại nào có pin 5000mAh?
 Cypher query:
 MATCH (m:Model)-[:HAS_BATTERY]->(b:Battery {{capacity: "5000mAh"}})
@@ -63,29 +181,405 @@ RETURN m.name
 
 Câu hỏi: Giá trung quốc của điện thoại iPhone 15 Pro 128GB là bao nhiêu?
 Cypher query:
-MATCH (m:Model {{name: 'iPhone 15 Pro 128GB'}}) - [:HAS_CHINA_PRICE] -> (p:Price)
-RETURN p.value
+MATCH (m:Model {{name: 'iPhone 15 Pro 128GB'}})
+RETURN m.name AS model, m.price_china AS price
 
 Câu hỏi: Thông tin chi tiết điện thoại iPhone 15 Pro 128GB.
 Cypher query:
-MATCH (m:Model {{name: 'iPhone 15 Pro 128GB'}})-[:HAS_RAM]->(r:RAM),       (m)-[:HAS_WEIGHT]->(w:Weight),       (m)-[:HAS_SCREEN]->(s:Screen),       (m)-[:HAS_COMPANY_NAME]->(c:Company),       (m)-[:HAS_FRONT_CAMERA]->(cam:Camera),       (m)-[p:HAS_USA_PRICE]->(price)
-RETURN m.name AS model, r.size AS ram, w.value AS weight, s.size AS screen, c.name AS company, cam.name AS camera, price.value AS price
+MATCH (m:Model {{name: 'iPhone 15 Pro 128GB'}})
+RETURN m.name AS model, m.company AS company, m.ram AS ram, m.weight AS weight, m.screen AS screen, m.processor AS processor, m.battery AS battery, m.front_camera AS front_camera, m.back_camera AS back_camera, m.price_usa AS price, m.year AS year
 
 Câu hỏi: {query}
 Cypher query:
-""")
+"""
 
-def run_cypher_query(cypher_query: str):
+# Cache kết quả Cypher theo (query chuẩn hoá, tham số); tự xoá khi loader tăng version catalog
+RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+def _catalog_version():
+    return read_catalog_version(get_driver()) if neo4j_enabled() else None
+
+result_cache = ResultCache(RESULT_CACHE_MAX_BYTES, version_loader=_catalog_version)
+
+# Cypher do LLM sinh: chặn mệnh đề ghi, thêm LIMIT và EXPLAIN ước lượng số dòng trước khi chạy
+def _explain(cypher_query: str):
+    # CypherGuard gộp các lần kiểm tra cùng truy vấn: mỗi truy vấn một EXPLAIN
+    return explain_plan(get_driver(), cypher_query)
+
+cypher_guard = CypherGuard(explain=_explain)
+
+# Trace từng request (span cho từng bước) và thống kê p50/p95/p99: tracer.export_json() / export_prometheus()
+tracer = Tracer()
+
+def run_cypher_query(cypher_query: str, params: Optional[Dict[str, Any]] = None):
     cypher_query = str(cypher_query)  # Đảm bảo là chuỗi
-    with driver.session() as session:
-        result = session.run(cypher_query)  # type: ignore
-        return [record.data() for record in result]
+    result_cache.check_version()
+    records = result_cache.get(cypher_query, params)
+    if records is not None:
+        return records
+
+    def fetch():
+        with get_driver().session() as session:
+            result = session.run(cypher_query, params or {})  # type: ignore
+            fetched = [record.data() for record in result]
+        result_cache.put(cypher_query, params, fetched)
+        return fetched
+
+    records, _ = query_flights.do(result_cache.key(cypher_query, params), fetch)
+    return records
+
+def _record_summary(span: Optional[Span], records: List[Dict[str, Any]], summary) -> None:
+    # Thời gian phía server: tới khi có kết quả đầu tiên / tới khi đọc xong (ms)
+    if span is not None:
+        span.set(
+            result_cache_hit=False,
+            rows=len(records),
+            neo4j_result_available_after_ms=summary.result_available_after,
+            neo4j_result_consumed_after_ms=summary.result_consumed_after,
+        )
+
+def stream_cypher_query(cypher_query: str, params: Optional[Dict[str, Any]] = None,
+                        span: Optional[Span] = None) -> Iterator[Dict[str, Any]]:
+    # Trả từng bản ghi ngay khi Neo4j gửi về, session đóng khi generator kết thúc
+    cypher_query = str(cypher_query)
+    result_cache.check_version()
+    records = result_cache.get(cypher_query, params)
+    if records is not None:
+        if span is not None:
+            span.set(result_cache_hit=True, rows=len(records))
+        yield from records
+        return
+    # Cùng truy vấn đang chạy: chờ kết quả của nó thay vì gửi thêm một round-trip
+    key = result_cache.key(cypher_query, params)
+    flight, leader = query_flights.begin(key)
+    if not leader:
+        records = flight.result()
+        if not flight.abandoned:
+            if span is not None:
+                span.set(result_cache_hit=False, coalesced=True, rows=len(records))
+            yield from records
+            return
+    records = []
+    try:
+        with get_driver().session() as session:
+            result = session.run(cypher_query, params or {})  # type: ignore
+            for record in result:
+                data = record.data()
+                records.append(data)
+                yield data
+            _record_summary(span, records, result.consume())
+        # Chỉ lưu khi đã đọc hết kết quả
+        result_cache.put(cypher_query, params, records)
+        if leader:
+            query_flights.finish(key, flight, records)
+    except Exception as e:
+        if leader:
+            query_flights.finish(key, flight, error=e)
+        raise
+    finally:
+        # Người đọc dừng giữa chừng: follower tự chạy truy vấn
+        if leader:
+            query_flights.finish(key, flight, abandoned=True)
+
+# Đồ thị nhúng dựng từ CSV ở lần dùng đầu tiên (None nếu không có file CSV)
+embedded_graph: Optional["EmbeddedGraph"] = None
+
+# Snapshot của CATALOG_CSV nếu đã dựng và còn khớp với file CSV (None: đọc CSV như cũ)
+catalog_snapshot: Optional["CatalogSnapshot"] = None
+_catalog_snapshot_checked = False
+
+def get_catalog_snapshot() -> Optional["CatalogSnapshot"]:
+    global catalog_snapshot, _catalog_snapshot_checked
+    if not _catalog_snapshot_checked:
+        with _init_lock:
+            if not _catalog_snapshot_checked:
+                from catalog_snapshot import load_snapshot
+                catalog_snapshot = load_snapshot(CATALOG_SNAPSHOT, source=CATALOG_CSV)
+                _catalog_snapshot_checked = True
+    return catalog_snapshot
+
+def get_embedded_graph() -> Optional["EmbeddedGraph"]:
+    global embedded_graph
+    if embedded_graph is None:
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None or os.path.exists(CATALOG_CSV):
+            from embedded_graph import EmbeddedGraph
+            embedded_graph = EmbeddedGraph.from_snapshot(snapshot) if snapshot is not None else EmbeddedGraph.from_csv(CATALOG_CSV)
+    return embedded_graph
+
+# Tư vấn theo nhu cầu: ma trận đặc trưng của toàn catalog, dựng lại khi catalog version đổi
+recommender: Optional["Recommender"] = None
+
+def get_recommender() -> Optional["Recommender"]:
+    global recommender
+    result_cache.check_version()
+    if recommender is not None and recommender.version == result_cache.version:
+        return recommender
+    with _init_lock:
+        if recommender is None or recommender.version != result_cache.version:
+            from recommender import Recommender
+            loaded = None
+            if neo4j_enabled():
+                try:
+                    loaded = Recommender.from_graph(get_driver())
+                except Exception as e:
+                    print("❌ Could not load recommender from Neo4j:", e)
+            if loaded is None and get_catalog_snapshot() is not None:
+                loaded = Recommender.from_snapshot(get_catalog_snapshot())
+            elif loaded is None and os.path.exists(CATALOG_CSV):
+                loaded = Recommender.from_csv(CATALOG_CSV)
+            if loaded is not None:
+                loaded.version = result_cache.version
+            recommender = loaded
+    return recommender
+
+def stream_graph_query(cypher_query: str, params: Optional[Dict[str, Any]] = None,
+                       routed: Optional[RoutedQuery] = None, span: Optional[Span] = None) -> Iterator[Dict[str, Any]]:
+    """Bản ghi của một truy vấn từ backend đã chọn.
+
+    Truy vấn của router chạy thẳng trên đồ thị nhúng khi GRAPH_BACKEND = "embedded",
+    và chuyển sang đồ thị nhúng nếu Neo4j không truy cập được. Câu hỏi tư vấn
+    được chấm điểm trong bộ nhớ bởi recommender, không truy vấn đồ thị.
+    """
+    if routed is not None and routed.name == "recommend":
+        if span is not None:
+            span.set(backend="recommender")
+        engine = get_recommender()
+        if engine is not None:
+            yield from engine.run_routed(routed)
+        return
+    graph = get_embedded_graph() if routed is not None and not neo4j_enabled() else None
+    if graph is not None:
+        if span is not None:
+            span.set(backend="embedded")
+        yield from graph.run_routed(routed)
+        return
+    if span is not None:
+        span.set(backend="neo4j")
+    started = False
+    try:
+        for record in stream_cypher_query(cypher_query, params, span):
+            started = True
+            yield record
+    except Exception as e:
+        graph = get_embedded_graph() if routed is not None and not started and _is_connection_error(e) else None
+        if graph is None:
+            raise
+        print("⚠️ Neo4j unavailable, using embedded graph:", e)
+        if span is not None:
+            span.set(backend="embedded", neo4j_error=repr(e))
+        yield from graph.run_routed(routed)
+
+# Router dựa trên từ vựng trong đồ thị, khởi tạo ở lần dùng đầu tiên
+intent_router: Optional[IntentRouter] = None
+
+def get_intent_router() -> IntentRouter:
+    global intent_router
+    if intent_router is None:
+        try:
+            if not neo4j_enabled():
+                raise RuntimeError("Neo4j is not configured")
+            intent_router = IntentRouter.from_graph(get_driver())
+        except Exception as e:
+            # Không đọc được từ Neo4j: từ vựng là từ điển của snapshot, hoặc lấy từ đồ thị nhúng
+            snapshot = get_catalog_snapshot()
+            if snapshot is not None:
+                intent_router = IntentRouter.from_snapshot(snapshot)
+            else:
+                graph = get_embedded_graph()
+                if graph is None:
+                    print("❌ Could not load router vocabularies:", e)
+                intent_router = IntentRouter(graph.entities() if graph is not None else None)
+    return intent_router
+
+def resolve_names(query: str, span: Optional[Span] = None) -> str:
+    """Thay tên điện thoại/hãng gõ tắt hoặc sai chính tả bằng tên trong catalog (trước khi route/dịch)"""
+    resolved, mentions = get_intent_router().canonicalize(query)
+    if span is not None:
+        span.set(name_mentions=len(mentions), names_resolved=resolved != query)
+    if resolved != query:
+        print("🔤 Resolved names:", resolved)
+    return resolved
+
+def route_question(query: str) -> Optional[RoutedQuery]:
+    """Trả về template Cypher có tham số nếu câu hỏi đơn giản, ngược lại None (dùng LLM)"""
+    return get_intent_router().route(query)
+
+def is_cypher_like(cypher_query: str) -> bool:
+    # Chỉ truy vấn đọc một câu lệnh (không CREATE/MERGE/SET/DELETE, ...)
+    return static_violation(str(cypher_query)) is None
+
+def guard_cypher(cypher_query: str, span: Optional[Span] = None) -> Tuple[str, bool]:
+    """Kiểm tra Cypher của LLM bằng cypher_guard; trả về (truy vấn đã thêm LIMIT, có được chạy không)"""
+    verdict = cypher_guard.check(cypher_query)
+    if span is not None:
+        span.set(valid=verdict.ok, limit_rewritten=verdict.rewritten, estimated_rows=verdict.estimated_rows)
+    if not verdict.ok:
+        print("🛡️ Cypher rejected:", verdict.reason)
+        if span is not None:
+            span.set(rejected_reason=verdict.reason)
+    return verdict.cypher, verdict.ok
+
+def _record_llm_usage(span: Optional[Span], prompt: str, answer: str, usage: Optional[Dict[str, Any]] = None) -> None:
+    # Số token thật nếu LLM trả usage_metadata, ngược lại ước lượng
+    if span is None:
+        return
+    if usage:
+        span.set(prompt_tokens=usage.get("input_tokens", 0), completion_tokens=usage.get("output_tokens", 0))
+    else:
+        span.set(prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(answer), tokens_estimated=True)
+
+def _translation_key(query: str) -> str:
+    # Cùng khoá với translation_cache: hai câu chỉ khác từ đệm/dấu dùng chung một lời gọi LLM
+    return TranslationCache.make_key(question_tokens(query))
+
+def _translated(query: str, prompt: str, response) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    cypher_query = str(response.content)
+    if is_cypher_like(cypher_query):
+        translation_cache.put(query, cypher_query)
+    return prompt, cypher_query, getattr(response, "usage_metadata", None)
+
+def _record_translation(span: Optional[Span], translation, shared: bool) -> str:
+    prompt, cypher_query, usage = translation
+    if span is not None:
+        span.set(translation_coalesced=shared)
+    # Token chỉ tính cho request đã thực sự gọi LLM
+    if not shared:
+        _record_llm_usage(span, prompt, cypher_query, usage)
+    return cypher_query
+
+def translate_to_cypher(query: str, span: Optional[Span] = None) -> str:
+    # Tra cache trước, chỉ gọi LLM khi chưa có bản dịch
+    cypher_query = translation_cache.get(query)
+    if span is not None:
+        span.set(translation_cache_hit=cypher_query is not None)
+    if cypher_query is not None:
+        return cypher_query
+
+    def translate():
+        prompt = get_cypher_prompt().format(query=query)
+        return _translated(query, prompt, llm_batcher.submit(prompt))
+
+    return _record_translation(span, *translation_flights.do(_translation_key(query), translate))
+
+async def _acheck_catalog_version() -> None:
+    if result_cache.version_check_due():
+        # Đọc version bằng driver đồng bộ, chạy ngoài event loop
+        await asyncio.to_thread(result_cache.check_version)
+
+async def arun_cypher_query(cypher_query: str, params: Optional[Dict[str, Any]] = None):
+    cypher_query = str(cypher_query)
+    await _acheck_catalog_version()
+    records = result_cache.get(cypher_query, params)
+    if records is not None:
+        return records
+
+    async def fetch():
+        async with get_async_driver().session() as session:
+            result = await session.run(cypher_query, params or {})  # type: ignore
+            fetched = [record.data() async for record in result]
+        result_cache.put(cypher_query, params, fetched)
+        return fetched
+
+    records, _ = await query_flights.ado(result_cache.key(cypher_query, params), fetch)
+    return records
+
+async def astream_cypher_query(cypher_query: str, params: Optional[Dict[str, Any]] = None,
+                               span: Optional[Span] = None) -> AsyncIterator[Dict[str, Any]]:
+    cypher_query = str(cypher_query)
+    await _acheck_catalog_version()
+    records = result_cache.get(cypher_query, params)
+    if records is not None:
+        if span is not None:
+            span.set(result_cache_hit=True, rows=len(records))
+        for record in records:
+            yield record
+        return
+    key = result_cache.key(cypher_query, params)
+    flight, leader = query_flights.begin(key)
+    if not leader:
+        records = await flight.aresult()
+        if not flight.abandoned:
+            if span is not None:
+                span.set(result_cache_hit=False, coalesced=True, rows=len(records))
+            for record in records:
+                yield record
+            return
+    records = []
+    try:
+        async with get_async_driver().session() as session:
+            result = await session.run(cypher_query, params or {})  # type: ignore
+            async for record in result:
+                data = record.data()
+                records.append(data)
+                yield data
+            _record_summary(span, records, await result.consume())
+        result_cache.put(cypher_query, params, records)
+        if leader:
+            query_flights.finish(key, flight, records)
+    except Exception as e:
+        if leader:
+            query_flights.finish(key, flight, error=e)
+        raise
+    finally:
+        if leader:
+            query_flights.finish(key, flight, abandoned=True)
+
+async def astream_graph_query(cypher_query: str, params: Optional[Dict[str, Any]] = None,
+                              routed: Optional[RoutedQuery] = None, span: Optional[Span] = None) -> AsyncIterator[Dict[str, Any]]:
+    if routed is not None and routed.name == "recommend":
+        if span is not None:
+            span.set(backend="recommender")
+        # Lần đầu (và khi catalog đổi) đọc catalog bằng driver đồng bộ, ngoài event loop
+        engine = await asyncio.to_thread(get_recommender)
+        if engine is not None:
+            for record in engine.run_routed(routed):
+                yield record
+        return
+    # Đồ thị nhúng được dựng (đọc CSV) ngoài event loop ở lần đầu
+    graph = await asyncio.to_thread(get_embedded_graph) if routed is not None and not neo4j_enabled() else None
+    if graph is not None:
+        if span is not None:
+            span.set(backend="embedded")
+        for record in graph.run_routed(routed):
+            yield record
+        return
+    if span is not None:
+        span.set(backend="neo4j")
+    started = False
+    try:
+        async for record in astream_cypher_query(cypher_query, params, span):
+            started = True
+            yield record
+    except Exception as e:
+        usable = routed is not None and not started and _is_connection_error(e)
+        graph = await asyncio.to_thread(get_embedded_graph) if usable else None
+        if graph is None:
+            raise
+        print("⚠️ Neo4j unavailable, using embedded graph:", e)
+        if span is not None:
+            span.set(backend="embedded", neo4j_error=repr(e))
+        for record in graph.run_routed(routed):
+            yield record
+
+async def atranslate_to_cypher(query: str, span: Optional[Span] = None) -> str:
+    cypher_query = translation_cache.get(query)
+    if span is not None:
+        span.set(translation_cache_hit=cypher_query is not None)
+    if cypher_query is not None:
+        return cypher_query
+
+    async def translate():
+        prompt = get_cypher_prompt().format(query=query)
+        return _translated(query, prompt, await llm_batcher.asubmit(prompt))
+
+    return _record_translation(span, *await translation_flights.ado(_translation_key(query), translate))
 
 def run_cypher_query_from_nl(query: str):
-    cypher_query = llm.invoke(cypher_prompt_template.format(query=query)).content
+    cypher_query = translate_to_cypher(resolve_names(query))
     print("🔎 Generated Cypher:\n", cypher_query)
-    # Kiểm tra Cypher hợp lệ
-    if not str(cypher_query).strip().lower().startswith(("match", "call", "return", "with", "create")):
+    # Kiểm tra Cypher hợp lệ và chi phí trước khi chạy
+    cypher_query, valid = guard_cypher(cypher_query)
+    if not valid:
         return [], cypher_query
     try:
         results = run_cypher_query(str(cypher_query))
@@ -94,83 +588,580 @@ def run_cypher_query_from_nl(query: str):
         print("❌ Cypher error:", e)
         return [], cypher_query
 
-def format_product_result(records):
+def format_product_result(records, align: bool = False):
     # Nếu records là list các dict, hiển thị dạng bảng
     if not records:
         return "Không tìm thấy kết quả phù hợp."
     if isinstance(records, list) and isinstance(records[0], dict):
-        keys = records[0].keys()
-        lines = [" | ".join(keys)]
-        lines.append("-" * (len(lines[0])))
-        for rec in records:
-            lines.append(" | ".join(str(rec[k]) for k in keys))
-        return "\n".join(lines)
+        if align:
+            return _aligned_table(records)
+        return "".join(iter_product_result(records))
     # Nếu là list các giá trị đơn
     if isinstance(records, list):
         return "\n".join(str(r) for r in records)
     return str(records)
 
-# Một số Cypher template mẫu cho các truy vấn phổ biến
-cypher_templates = {
-    "find_by_company": lambda company: f"""
-        MATCH (m:Model)-[:HAS_COMPANY_NAME]->(c:Company {{name: '{company}'}})
-        RETURN m.name AS model, c.name AS company LIMIT 10
-    """,
-    "find_by_ram": lambda ram: f"""
-        MATCH (m:Model)-[:HAS_RAM]->(r:RAM {{size: '{ram}'}})
-        RETURN m.name AS model, r.size AS ram LIMIT 10
-    """,
-    "find_by_price": lambda price: f"""
-        MATCH (m:Model)-[:HAS_PAKISTAN_PRICE]->(p:Price)
-        WHERE p.value CONTAINS '{price}'
-        RETURN m.name AS model, p.value AS price LIMIT 10
-    """,
-    "find_by_year": lambda year: f"""
-        MATCH (m:Model)-[:HAS_YEAR]->(y:Year {{year: {year}}})
-        RETURN m.name AS model, y.year AS year LIMIT 10
-    """,
-}
-
-def answer_general_question(query: str, history: Optional[List[Any]] = None) -> str:
+def _table_header(keys) -> str:
+    header = " | ".join(keys)
+    return header + "\n" + "-" * len(header)
+
+def _table_row(rec, keys) -> str:
+    return "\n" + " | ".join(str(rec[k]) for k in keys)
+
+def _aligned_table(records) -> str:
+    # Đã có đủ bản ghi: căn cột theo giá trị dài nhất
+    keys = list(records[0].keys())
+    widths = [max(len(str(k)), *(len(str(rec[k])) for rec in records)) for k in keys]
+    lines = [" | ".join(str(k).ljust(w) for k, w in zip(keys, widths)).rstrip()]
+    lines.append("-" * len(lines[0]))
+    lines += [" | ".join(str(rec[k]).ljust(w) for k, w in zip(keys, widths)).rstrip() for rec in records]
+    return "\n".join(lines)
+
+def iter_product_result(records) -> Iterator[str]:
+    """Như format_product_result cho các bản ghi dict, nhưng trả bảng từng dòng khi bản ghi tới"""
+    keys = None
+    for rec in records:
+        if keys is None:
+            keys = list(rec.keys())
+            yield _table_header(keys)
+        yield _table_row(rec, keys)
+    if keys is None:
+        yield "Không tìm thấy kết quả phù hợp."
+
+async def aiter_product_result(records) -> AsyncIterator[str]:
+    keys = None
+    async for rec in records:
+        if keys is None:
+            keys = list(rec.keys())
+            yield _table_header(keys)
+        yield _table_row(rec, keys)
+    if keys is None:
+        yield "Không tìm thấy kết quả phù hợp."
+
+def iter_routed_result(routed: Optional[RoutedQuery], records) -> Iterator[str]:
+    """Bảng kết quả; kết quả so sánh được xoay thành một cột cho mỗi điện thoại"""
+    if routed is not None and routed.name == "compare_models":
+        yield format_product_result(comparison_records(records, routed.params["names"]), align=True)
+    else:
+        yield from iter_product_result(records)
+
+async def aiter_routed_result(routed: Optional[RoutedQuery], records) -> AsyncIterator[str]:
+    if routed is not None and routed.name == "compare_models":
+        records = [rec async for rec in records]
+        yield format_product_result(comparison_records(records, routed.params["names"]), align=True)
+    else:
+        async for chunk in aiter_product_result(records):
+            yield chunk
+
+async def _aprepend(first, records) -> AsyncIterator[Any]:
+    yield first
+    async for rec in records:
+        yield rec
+
+async def _aiter_list(records) -> AsyncIterator[Any]:
+    for rec in records:
+        yield rec
+
+# Vector Search (RAG): index FAISS các tài liệu thông số, map từ thư mục khi khởi động
+VECTOR_INDEX_DIR = "vector_index"
+VECTOR_TOP_K = 5
+# Embedder: None = embedder ghi trong index (OpenAI khi dựng mới), "hashing[:dim]" hoặc "openai[:model]"
+VECTOR_EMBEDDER: Optional[str] = None
+vector_store: Optional["VectorStore"] = None
+
+def get_vector_store() -> "VectorStore":
+    global vector_store
+    if vector_store is None:
+        from vector_store import VectorStore, documents_from_csv, documents_from_graph, make_embedder
+        embedder = make_embedder(VECTOR_EMBEDDER) if VECTOR_EMBEDDER else None
+        if os.path.exists(os.path.join(VECTOR_INDEX_DIR, "index.faiss")):
+            vector_store = VectorStore.load(VECTOR_INDEX_DIR, embedder)
+        else:
+            # Chưa có index: dựng từ đồ thị (hoặc CSV khi dùng đồ thị nhúng) và lưu lại cho lần sau
+            documents = documents_from_graph(get_driver()) if neo4j_enabled() else documents_from_csv(CATALOG_CSV)
+            vector_store = VectorStore.build(documents, embedder)
+            vector_store.save(VECTOR_INDEX_DIR)
+    return vector_store
+
+def vector_index_available() -> bool:
+    return vector_store is not None or os.path.exists(os.path.join(VECTOR_INDEX_DIR, "index.faiss"))
+
+def search_documents(query: str, k: int = VECTOR_TOP_K) -> List[Tuple[str, str, float]]:
+    """Top-k (tên điện thoại, tài liệu, điểm) từ index FAISS"""
+    return get_vector_store().search(query, k)
+
+def retrieve_documents(query: str, k: int = VECTOR_TOP_K) -> List[str]:
+    return [text for _, text, _ in search_documents(query, k)]
+
+# Hybrid retrieval (achat_stream khi router không khớp): nhánh đồ thị (LLM -> Cypher) và nhánh
+# vector chạy song song, mỗi nhánh có hạn chót riêng (giây, tính từ lúc bắt đầu)
+HYBRID_DEADLINES = {"graph": 8.0, "vector": 2.0}
+# Nếu sau chừng ấy giây đồ thị chưa có kết quả thì bắt đầu sẵn câu trả lời tự do (huỷ nếu đồ thị
+# có kết quả); None (mặc định): chỉ gọi LLM trả lời sau khi đồ thị không có kết quả. Một bản dịch
+# LLM thường lâu hơn vài trăm ms, nên đặt giá trị nhỏ hơn p95 của bước "translate"
+# (tracer.percentiles()) sẽ thêm một lời gọi LLM cho gần như mọi câu hỏi không khớp template
+HYBRID_HEDGE_DELAY: Optional[float] = None
+
+def _record_model(record: Dict[str, Any]) -> Optional[str]:
+    name = record.get("model", record.get("name"))
+    return name if isinstance(name, str) else None
+
+def fuse_results(records: List[Dict[str, Any]], hits: List[Tuple[str, str, float]],
+                 ordered: bool = False) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Xếp bản ghi của đồ thị và tài liệu vector theo reciprocal-rank fusion trên tên điện thoại.
+
+    Bản ghi của truy vấn có ORDER BY (``ordered``) giữ nguyên thứ tự của Cypher.
+    """
+    rankings = {
+        "graph": [name for name in map(_record_model, records) if name is not None],
+        "vector": [name for name, _, _ in hits],
+    }
+    rank = {name: i for i, (name, _) in enumerate(reciprocal_rank_fusion(rankings))}
+    if not ordered:
+        records = sorted(records, key=lambda rec: rank.get(_record_model(rec), len(rank)))
+    hits = sorted(hits, key=lambda hit: rank.get(hit[0], len(rank)))
+    return records, [text for _, text, _ in hits]
+
+async def _agraph_branch(query: str, trace: Trace) -> Tuple[str, List[Dict[str, Any]]]:
+    """Nhánh đồ thị: dịch sang Cypher -> guard -> chạy; trả về (Cypher, mọi bản ghi)"""
+    if not neo4j_enabled():
+        # Đồ thị nhúng chỉ chạy được truy vấn của router
+        return "", []
+    with trace.span("translate") as span:
+        cypher_query = await atranslate_to_cypher(query, span)
+    print("🔎 Generated Cypher:\n", cypher_query)
+    with trace.span("validate") as span:
+        # EXPLAIN chạy bằng driver đồng bộ, ngoài event loop
+        cypher_query, valid = await asyncio.to_thread(guard_cypher, cypher_query, span)
+    if not valid:
+        return cypher_query, []
+    with trace.span("execute") as span:
+        records = [record async for record in astream_graph_query(cypher_query, None, None, span)]
+    return cypher_query, records
+
+async def _avector_branch(query: str, trace: Trace) -> List[Tuple[str, str, float]]:
+    with trace.span("vector") as span:
+        # FAISS nhả GIL khi tìm kiếm, chạy trong thread để không chặn event loop
+        hits = await asyncio.to_thread(search_documents, query)
+        span.set(documents=len(hits))
+    return hits
+
+async def _aspeculate(query: str, history: Optional[List[Any]], context: "asyncio.Future[List[str]]",
+                      start: asyncio.Event, buffer: "asyncio.Queue[Optional[str]]", trace: Trace) -> None:
+    """Câu trả lời tự do chạy trước, đẩy từng đoạn vào ``buffer`` (None khi kết thúc)"""
+    try:
+        try:
+            await asyncio.wait_for(start.wait(), HYBRID_HEDGE_DELAY)
+        except asyncio.TimeoutError:
+            pass
+        documents = await context
+        with trace.span("fallback", speculative=True) as span:
+            try:
+                async for chunk in astream_general_question(query, history, documents or None, span):
+                    buffer.put_nowait(chunk)
+            except asyncio.CancelledError:
+                span.set(cancelled=True)
+                raise
+    finally:
+        buffer.put_nowait(None)
+
+async def _adrain(buffer: "asyncio.Queue[Optional[str]]", task: "asyncio.Task[None]") -> AsyncIterator[str]:
+    try:
+        while True:
+            chunk = await buffer.get()
+            if chunk is None:
+                break
+            yield chunk
+        # Lỗi của LLM (nếu có) được ném ra ở đây
+        await task
+    finally:
+        # Người đọc dừng giữa chừng: dừng luôn lời gọi LLM
+        task.cancel()
+
+async def ahybrid_retrieve(query: str, resolved: str, history: Optional[List[Any]],
+                           trace: Trace) -> Tuple[List[Dict[str, Any]], List[str], Optional[AsyncIterator[str]]]:
+    """Chạy song song nhánh đồ thị và nhánh vector (nếu có index) với hạn chót riêng.
+
+    Trả về (bản ghi đã fusion, tài liệu ngữ cảnh, câu trả lời tự do đã bắt đầu sẵn hoặc None).
+    Khi đồ thị có kết quả, các nhánh còn chạy và câu trả lời đoán trước bị huỷ;
+    ngược lại câu trả lời tự do đã chạy song song với nhánh đồ thị, không nối tiếp sau nó.
+    """
+    loop = asyncio.get_running_loop()
+    context: "asyncio.Future[List[str]]" = loop.create_future()
+    start = asyncio.Event()
+    buffer: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    speculation = None
+    if HYBRID_HEDGE_DELAY is not None:
+        speculation = asyncio.ensure_future(_aspeculate(query, history, context, start, buffer, trace))
+    branches = {"graph": lambda: _agraph_branch(resolved, trace)}
+    if vector_index_available():
+        branches["vector"] = lambda: _avector_branch(resolved, trace)
+    else:
+        context.set_result([])
+
+    def graph_answered(results: Dict[str, BranchResult]) -> bool:
+        graph = results.get("graph")
+        return graph is not None and graph.status == "done" and bool(graph.value[1])
+
+    def on_result(result: BranchResult) -> None:
+        if result.status == "error":
+            print(f"❌ Hybrid branch {result.name} error:", result.error)
+            trace.error(result.name, result.error)
+        elif result.status == "timeout":
+            print(f"⏳ Hybrid branch {result.name} timed out after {result.elapsed_ms:.0f}ms")
+        if result.name == "vector" and not context.done():
+            hits = result.value if result.status == "done" else []
+            context.set_result([text for _, text, _ in hits])
+        elif result.name == "graph" and not (result.status == "done" and result.value[1]):
+            # Đồ thị không trả lời được: bắt đầu câu trả lời tự do ngay
+            start.set()
+
+    with trace.span("hybrid") as span:
+        try:
+            results = await fan_out(branches, HYBRID_DEADLINES, graph_answered, on_result)
+        except BaseException:
+            if speculation is not None:
+                speculation.cancel()
+            raise
+        span.set(**{f"{name}_status": result.status for name, result in results.items()})
+    graph, vector = results["graph"], results.get("vector")
+    cypher_query, records = graph.value if graph.status == "done" else ("", [])
+    hits = vector.value if vector is not None and vector.status == "done" else []
+    ordered = re.search(r"\border\s+by\b", cypher_query, re.IGNORECASE) is not None
+    records, documents = fuse_results(records, hits, ordered)
+    if records and speculation is not None:
+        speculation.cancel()
+        await asyncio.gather(speculation, return_exceptions=True)
+        speculation = None
+    answer = _adrain(buffer, speculation) if speculation is not None else None
+    return records, documents, answer
+
+def build_general_prompt(query: str, history: Optional[List[Any]] = None, context: Optional[List[str]] = None) -> str:
     # Tạo prompt có lịch sử hội thoại
     if history is None:
         history = []
     # Ghép lịch sử thành đoạn hội thoại
     history_text = ""
-    for turn in history:
-        if isinstance(turn, dict):
-            # Nếu lưu dạng dict {"user": "...", "bot": "..."}
-            history_text += f"User: {turn.get('user', '')}\nBot: {turn.get('bot', '')}\n"
-        else:
-            history_text += f"{turn}\n"
+    if isinstance(history, ConversationMemory):
+        # Bộ nhớ có giới hạn token: các sự kiện đã biết + vài lượt gần nhất
+        history_text = history.render()
+    else:
+        for turn in history:
+            if isinstance(turn, dict):
+                # Nếu lưu dạng dict {"user": "...", "bot": "..."}
+                history_text += f"User: {turn.get('user', '')}\nBot: {turn.get('bot', '')}\n"
+            else:
+                history_text += f"{turn}\n"
     prompt = f"{history_text}User: {query}\nBot:"
-    response = llm.invoke(prompt)
+    if context:
+        # Đưa tài liệu truy xuất được vào đầu prompt
+        context_text = "\n".join(f"- {doc}" for doc in context)
+        prompt = f"Thông tin sản phẩm liên quan:\n{context_text}\n\n{prompt}"
+    if isinstance(history, ConversationMemory):
+        history.record_prompt(prompt)
+    return prompt
+
+def _response_text(response) -> str:
     if hasattr(response, "content"):
         return str(response.content)
     return str(response)
 
-def chat(query: str, history: Optional[List[Any]] = None):
+def answer_general_question(query: str, history: Optional[List[Any]] = None, context: Optional[List[str]] = None) -> str:
+    response = get_llm().invoke(build_general_prompt(query, history, context))
+    return _response_text(response)
+
+async def aanswer_general_question(query: str, history: Optional[List[Any]] = None, context: Optional[List[str]] = None) -> str:
+    response = await get_llm().ainvoke(build_general_prompt(query, history, context))
+    return _response_text(response)
+
+def _add_usage(usage: Dict[str, int], chunk) -> None:
+    # Khi stream, usage_metadata (nếu có) nằm rải rác trên các chunk
+    for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+        if isinstance(value, int):
+            usage[key] = usage.get(key, 0) + value
+
+def stream_general_question(query: str, history: Optional[List[Any]] = None, context: Optional[List[str]] = None,
+                            span: Optional[Span] = None) -> Iterator[str]:
+    # Trả từng đoạn token của LLM ngay khi nhận được
+    prompt = build_general_prompt(query, history, context)
+    parts: List[str] = []
+    usage: Dict[str, int] = {}
+    for chunk in get_llm().stream(prompt):
+        _add_usage(usage, chunk)
+        text = _response_text(chunk)
+        if text:
+            parts.append(text)
+            yield text
+    _record_llm_usage(span, prompt, "".join(parts), usage)
+
+async def astream_general_question(query: str, history: Optional[List[Any]] = None, context: Optional[List[str]] = None,
+                                   span: Optional[Span] = None) -> AsyncIterator[str]:
+    prompt = build_general_prompt(query, history, context)
+    parts: List[str] = []
+    usage: Dict[str, int] = {}
+    async for chunk in get_llm().astream(prompt):
+        _add_usage(usage, chunk)
+        text = _response_text(chunk)
+        if text:
+            parts.append(text)
+            yield text
+    _record_llm_usage(span, prompt, "".join(parts), usage)
+
+def _finish_trace(trace: Trace) -> None:
+    tracer.finish(trace)
+    print("⏱️ " + trace.summary())
+
+def chat_stream(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None) -> Iterator[str]:
+    """Trả lời một câu hỏi dạng stream: route/translate -> validate -> execute -> format, nếu không có kết quả thì fallback.
+
+    Mỗi bước chạy đúng một lần; bảng kết quả được trả từng dòng khi bản ghi tới
+    và câu trả lời của LLM được trả từng đoạn token. Mỗi bước là một span của
+    ``trace`` (tạo mới nếu không truyền vào) và được gộp vào ``tracer``
+    ("execute" là thời gian tới bản ghi đầu tiên).
+    """
     if history is None:
         history = []
+    if trace is None:
+        trace = tracer.start(query)
+    parts: List[str] = []
+    rows = None
     try:
-        cypher_query = run_cypher_query_from_nl(query)
-        if isinstance(cypher_query, tuple):
-            cypher_query = cypher_query[1] if len(cypher_query) > 1 else cypher_query[0]
-        if isinstance(cypher_query, str) and cypher_query:
-            records = run_cypher_query(cypher_query)
+        with trace.span("route") as span:
+            resolved = resolve_names(query, span)
+            routed = route_question(resolved)
+            span.set(template=routed.name if routed is not None else None)
+        if routed is not None:
+            cypher_query, params = routed.cypher, routed.params
+            print("🧭 Routed to template:", routed.name, params)
+        elif not neo4j_enabled():
+            # Đồ thị nhúng chỉ chạy được truy vấn của router
+            cypher_query, params = "", None
+        else:
+            with trace.span("translate") as span:
+                cypher_query, params = translate_to_cypher(resolved, span), None
+            print("🔎 Generated Cypher:\n", cypher_query)
+        with trace.span("validate") as span:
+            if routed is None and cypher_query:
+                cypher_query, valid = guard_cypher(cypher_query, span)
+            else:
+                valid = is_cypher_like(cypher_query)
+                span.set(valid=valid)
+        if valid:
+            with trace.span("execute") as span:
+                rows = stream_graph_query(cypher_query, params, routed, span)
+                first = next(rows, None)
+            if first is None:
+                rows.close()
+                rows = None
+    except Exception as e:
+        print("❌ Graph pipeline error:", e)
+        trace.error("graph", e)
+        rows = None
+    if rows is not None:
+        try:
+            with trace.span("format"):
+                for chunk in iter_routed_result(routed, itertools.chain([first], rows)):
+                    parts.append(chunk)
+                    yield chunk
+        except Exception as e:
+            print("❌ Graph pipeline error:", e)
+            trace.error("format", e)
+    else:
+        # Nếu không có kết quả, trả lời tự do
+        with trace.span("fallback") as span:
+            for chunk in stream_general_question(query, history, span=span):
+                parts.append(chunk)
+                yield chunk
+    _finish_trace(trace)
+    # Lưu vào history
+    history.append({"user": query, "bot": "".join(parts)})
+
+def chat(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None):
+    """Như chat_stream() nhưng trả về toàn bộ câu trả lời"""
+    return "".join(chat_stream(query, history, trace))
+
+def chat_vector_stream(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None) -> Iterator[str]:
+    """Vector Search (RAG): lấy top-k tài liệu thông số từ FAISS rồi để LLM trả lời (stream)"""
+    if history is None:
+        history = []
+    if trace is None:
+        trace = tracer.start(query, kind="vector")
+    parts: List[str] = []
+    with trace.span("retrieve") as span:
+        context = retrieve_documents(query)
+        span.set(documents=len(context))
+    with trace.span("answer") as span:
+        for chunk in stream_general_question(query, history, context, span):
+            parts.append(chunk)
+            yield chunk
+    _finish_trace(trace)
+    history.append({"user": query, "bot": "".join(parts)})
+
+def chat_vector(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None):
+    return "".join(chat_vector_stream(query, history, trace))
+
+async def achat_stream(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None) -> AsyncIterator[str]:
+    """Phiên bản async của chat_stream(): LLM và Neo4j đều không chặn event loop.
+
+    Câu hỏi router không khớp đi qua hybrid retrieval (ahybrid_retrieve): nhánh
+    đồ thị, nhánh vector và câu trả lời tự do chạy song song thay vì nối tiếp.
+    """
+    if history is None:
+        history = []
+    if trace is None:
+        trace = tracer.start(query)
+    parts: List[str] = []
+    rows = None
+    routed = None
+    context: Optional[List[str]] = None
+    answer: Optional[AsyncIterator[str]] = None
+    try:
+        if intent_router is None:
+            # Lần đầu tải từ vựng bằng driver đồng bộ, chạy ngoài event loop
+            await asyncio.to_thread(get_intent_router)
+        with trace.span("route") as span:
+            resolved = resolve_names(query, span)
+            routed = route_question(resolved)
+            span.set(template=routed.name if routed is not None else None)
+        if routed is not None:
+            print("🧭 Routed to template:", routed.name, routed.params)
+            with trace.span("validate") as span:
+                valid = is_cypher_like(routed.cypher)
+                span.set(valid=valid)
+            if valid:
+                with trace.span("execute") as span:
+                    rows = astream_graph_query(routed.cypher, routed.params, routed, span)
+                    first = await anext(rows, None)
+                if first is None:
+                    await rows.aclose()
+                    rows = None
+        else:
+            records, context, answer = await ahybrid_retrieve(query, resolved, history, trace)
             if records:
-                answer = format_product_result(records)
-                # Lưu vào history
-                history.append({"user": query, "bot": answer})
-                return answer
+                first, rows = records[0], _aiter_list(records[1:])
     except Exception as e:
-        pass
-    # Nếu không có kết quả, trả lời tự do và lưu vào history
-    answer = answer_general_question(query, history)
-    history.append({"user": query, "bot": answer})
-    return answer
+        print("❌ Graph pipeline error:", e)
+        trace.error("graph", e)
+        rows = None
+    if rows is not None:
+        try:
+            with trace.span("format"):
+                async for chunk in aiter_routed_result(routed, _aprepend(first, rows)):
+                    parts.append(chunk)
+                    yield chunk
+        except Exception as e:
+            print("❌ Graph pipeline error:", e)
+            trace.error("format", e)
+    elif answer is not None:
+        # Câu trả lời tự do đã chạy song song với nhánh đồ thị
+        async for chunk in answer:
+            parts.append(chunk)
+            yield chunk
+    else:
+        with trace.span("fallback") as span:
+            async for chunk in astream_general_question(query, history, context or None, span):
+                parts.append(chunk)
+                yield chunk
+    _finish_trace(trace)
+    history.append({"user": query, "bot": "".join(parts)})
+
+async def achat(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None):
+    return "".join([chunk async for chunk in achat_stream(query, history, trace)])
+
+async def achat_vector_stream(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None) -> AsyncIterator[str]:
+    if history is None:
+        history = []
+    if trace is None:
+        trace = tracer.start(query, kind="vector")
+    parts: List[str] = []
+    with trace.span("retrieve") as span:
+        # FAISS nhả GIL khi tìm kiếm, chạy trong thread để không chặn event loop
+        context = await asyncio.to_thread(retrieve_documents, query)
+        span.set(documents=len(context))
+    with trace.span("answer") as span:
+        async for chunk in astream_general_question(query, history, context, span):
+            parts.append(chunk)
+            yield chunk
+    _finish_trace(trace)
+    history.append({"user": query, "bot": "".join(parts)})
+
+async def achat_vector(query: str, history: Optional[List[Any]] = None, trace: Optional[Trace] = None):
+    return "".join([chunk async for chunk in achat_vector_stream(query, history, trace)])
 
 # Hàm chat sử dụng Cypher trực tiếp (nếu muốn)
+def _refused(reason: Optional[str]) -> str:
+    return f"🛡️ Không chạy truy vấn này: {reason}"
+
 def chat_neo4j(cypher_query: str):
-    results = run_cypher_query(cypher_query)
+    # Cypher người dùng gõ trực tiếp cũng qua cypher_guard như Cypher do LLM sinh
+    verdict = cypher_guard.check(cypher_query)
+    if not verdict.ok:
+        return _refused(verdict.reason)
+    results = run_cypher_query(verdict.cypher)
+    return format_product_result(results)
+
+async def achat_neo4j(cypher_query: str):
+    verdict = await asyncio.to_thread(cypher_guard.check, cypher_query)
+    if not verdict.ok:
+        return _refused(verdict.reason)
+    results = await arun_cypher_query(verdict.cypher)
     return format_product_result(results)
+
+async def achat_neo4j_stream(cypher_query: str) -> AsyncIterator[str]:
+    verdict = await asyncio.to_thread(cypher_guard.check, cypher_query)
+    if not verdict.ok:
+        yield _refused(verdict.reason)
+        return
+    async for chunk in aiter_product_result(astream_cypher_query(verdict.cypher)):
+        yield chunk
+
+def compare_models(names: List[str]) -> str:
+    """So sánh nhiều điện thoại (tên gõ gần đúng được khớp với catalog) bằng một truy vấn UNWIND $names"""
+    routed = compare_query(get_intent_router().resolve_models(names))
+    if not routed.params["names"]:
+        return format_product_result([])
+    return "".join(iter_routed_result(routed, stream_graph_query(routed.cypher, routed.params, routed)))
+
+async def acompare_models(names: List[str]) -> str:
+    if intent_router is None:
+        await asyncio.to_thread(get_intent_router)
+    routed = compare_query(get_intent_router().resolve_models(names))
+    if not routed.params["names"]:
+        return format_product_result([])
+    records = astream_graph_query(routed.cypher, routed.params, routed)
+    return "".join([chunk async for chunk in aiter_routed_result(routed, records)])
+
+def warm_up(background: bool = True) -> Optional[threading.Thread]:
+    """Tạo trước driver/LLM, kết nối Neo4j và nạp router, đồ thị nhúng, index vector.
+
+    Chạy trong thread nền (mặc định) để app phục vụ ngay; câu hỏi tới trước khi
+    warm-up xong vẫn tự khởi tạo những gì còn thiếu.
+    """
+    def verify_neo4j():
+        get_driver().verify_connectivity()
+        get_async_driver()
+
+    def load_vector_store():
+        # Chỉ map index có sẵn, không dựng index mới (tốn lời gọi embedding)
+        if os.path.exists(os.path.join(VECTOR_INDEX_DIR, "index.faiss")):
+            get_vector_store()
+
+    steps = [get_llm, get_cypher_prompt]
+    steps += [verify_neo4j] if neo4j_enabled() else [get_embedded_graph]
+    steps += [get_intent_router, get_recommender, load_vector_store]
+
+    def run():
+        started = time.perf_counter()
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                print(f"❌ Warm-up step {step.__name__} failed:", e)
+        print(f"🔥 Warm-up done in {time.perf_counter() - started:.2f}s")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,96 @@
+import argparse
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+# Cột CSV -> thuộc tính phẳng trên node Model: bản sao của các quan hệ để câu hỏi
+# chi tiết / so sánh chỉ đọc một node cho mỗi điện thoại thay vì mở rộng nhiều quan hệ
+spec_properties = {
+    'Company Name': 'company',
+    'Mobile Weight': 'weight',
+    'RAM': 'ram',
+    'Front Camera': 'front_camera',
+    'Back Camera': 'back_camera',
+    'Processor': 'processor',
+    'Battery Capacity': 'battery',
+    'Screen Size': 'screen',
+    'Launched Price (Pakistan)': 'price_pakistan',
+    'Launched Price (India)': 'price_india',
+    'Launched Price (China)': 'price_china',
+    'Launched Price (USA)': 'price_usa',
+    'Launched Price (Dubai)': 'price_dubai',
+    'Launched Year': 'year',
+}
+
+SPEC_RETURN = "m.name AS model, " + ", ".join(f"m.{prop} AS {prop}" for prop in spec_properties.values())
+MODEL_DETAILS_QUERY = f"MATCH (m:Model {{name: $name}}) RETURN {SPEC_RETURN}"
+# So sánh nhiều điện thoại trong một round-trip
+COMPARE_MODELS_QUERY = f"UNWIND $names AS name MATCH (m:Model {{name: name}}) RETURN {SPEC_RETURN}"
+# Toàn bộ catalog trong một truy vấn (recommender)
+CATALOG_SPECS_QUERY = f"MATCH (m:Model) RETURN {SPEC_RETURN}"
+# Điện thoại tương tự: quan hệ SIMILAR_TO tính trước (similar_phones), chỉ đọc một bước
+SIMILAR_PROPERTIES = ["company", "ram", "processor", "back_camera", "battery", "screen", "price_usa"]
+SIMILAR_MODELS_QUERY = (
+    "MATCH (:Model {name: $name})-[s:SIMILAR_TO]->(m:Model) WHERE NOT $cheaper OR s.price_ratio < 1 "
+    "RETURN m.name AS model, round(s.score, 3) AS similarity, s.price_ratio AS price_ratio, "
+    + ", ".join(f"m.{prop} AS {prop}" for prop in SIMILAR_PROPERTIES)
+    + " ORDER BY s.rank LIMIT $limit"
+)
+
+@lru_cache(maxsize=2)
+def refresh_query(all_models: bool = False) -> str:
+    """SET every spec property from the model's current relationships.
+
+    A missing relationship gives ``null``, which removes the property, so the
+    projection always mirrors the graph. A model with several targets for
+    one relationship keeps the first one.
+    """
+    from etl import column_mapping
+
+    assignments = []
+    for column, prop in spec_properties.items():
+        relationship, _, target_property = column_mapping[column]
+        assignments.append(f"m.{prop} = head([(m)-[:{relationship}]->(t) | t.{target_property}])")
+    match = "MATCH (m:Model)" if all_models else "UNWIND $models AS name MATCH (m:Model {name: name})"
+    return f"{match} SET " + ", ".join(assignments)
+
+def comparison_records(records: Iterable[Dict[str, Any]], names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Transpose spec records to one row per attribute and one column per phone (in ``names`` order)"""
+    by_model = {record["model"]: record for record in records}
+    order = [name for name in (names or list(by_model)) if name in by_model]
+    rows = []
+    for prop in spec_properties.values():
+        values = [by_model[name].get(prop) for name in order]
+        if all(value is None for value in values):
+            continue
+        row: Dict[str, Any] = {"spec": prop}
+        row.update((name, "" if value is None else value) for name, value in zip(order, values))
+        rows.append(row)
+    return rows
+
+def refresh_model_specs(tx, models=None):
+    """Rebuild the projection of ``models`` (all models when None) inside a write transaction"""
+    if models is None:
+        return tx.run(refresh_query(all_models=True)).consume()
+    return tx.run(refresh_query(), models=list(models)).consume()
+
+def main():
+    from neo4j import GraphDatabase
+
+    from bulk_loader import NEO4J_PASSWORD, NEO4J_URL, NEO4J_USER
+    from result_cache import bump_catalog_version
+
+    argparse.ArgumentParser(
+        description="Rebuild the denormalized spec properties of every Model node (after loading the Cypher files)"
+    ).parse_args()
+    driver = GraphDatabase.driver(NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        with driver.session() as session:
+            summary = session.execute_write(refresh_model_specs)
+            version = session.execute_write(bump_catalog_version)
+    finally:
+        driver.close()
+    print(f"Spec properties set: {summary.counters.properties_set}")
+    print(f"Catalog version: {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import re
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from translation_cache import FILLER_WORDS, normalize_question
+
+# kind: "model" hoặc "company"; start/end: vị trí của đoạn nhắc tới trong câu hỏi gốc
+Mention = namedtuple("Mention", ["kind", "text", "name", "start", "end", "score"])
+
+MIN_COVERAGE = 0.6
+MAX_MENTION_TOKENS = 8
+
+# Viết tắt hay gặp -> token trong tên
+token_aliases = {
+    "ip": ("iphone",),
+    "ipro": ("iphone", "pro"),
+    "ss": ("samsung",),
+    "sam": ("samsung",),
+    "sgs": ("galaxy", "s"),
+    "pm": ("pro", "max"),
+    "prm": ("pro", "max"),
+    "promax": ("pro", "max"),
+    "rn": ("redmi", "note"),
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+(?:\.\d+)?")
+_UNIT_TOKENS = {"gb", "tb", "mb"}
+_STORAGE_PATTERN = re.compile(r"^\d+(?:gb|tb|mb)$")
+_DIGITS_PATTERN = re.compile(r"^\d+$")
+# Dung lượng trong tên gốc ("iPhone 15 Pro 128GB", "Galaxy S24 256 GB")
+_NAME_STORAGE_PATTERN = re.compile(r"\s*\b\d+\s*(?:gb|tb|mb)\b", re.IGNORECASE)
+
+def _trigrams(token: str) -> FrozenSet[str]:
+    padded = f" {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def _max_typos(token: str) -> int:
+    return 1 if len(token) < 7 else 2
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance (an adjacent swap counts as one edit), stopping early once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            # "iphnoe" -> "iphone": hai ký tự liền kề bị đảo
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+class NameIndex:
+    """In-memory resolver from typed phone/company mentions to catalog names.
+
+    Names are split into normalized tokens (no case or diacritics, "8 gb" ->
+    "8gb"); ``postings[token]`` lists the names containing a token. A typed
+    token maps to the vocabulary exactly, through ``token_aliases`` ("ip" ->
+    "iphone"), as a number prefix ("256" -> "256gb") or, for misspellings,
+    through a trigram index over the vocabulary. Candidates are the
+    intersection of the postings of every typed token, ranked by how much of
+    the name (storage size aside) the mention covers, so a lookup is a few
+    set operations instead of a scan over all names. Among the candidates the
+    name with the fewest other tokens wins.
+    """
+
+    def __init__(self, models: Iterable[str] = (), companies: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.name_ids: Dict[str, int] = {}
+        self.tokens: List[Tuple[str, ...]] = []
+        # Token không phải dung lượng của mỗi tên và khoá xếp hạng (ít token hơn thắng, hoà thì theo tên)
+        self.cores: List[FrozenSet[str]] = []
+        # Tên không kèm dung lượng, dùng khi người dùng không gõ đúng dung lượng của tên
+        self.core_names: List[str] = []
+        self.ranks: List[Tuple[int, int, str]] = []
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.heads: Set[str] = set()
+        self.companies: Dict[str, str] = {}
+        self.token_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        for model in dict.fromkeys(models):
+            tokens = tuple(normalize_question(model).split())
+            if not tokens:
+                continue
+            model_id = len(self.names)
+            self.names.append(model)
+            self.name_ids[model] = model_id
+            self.tokens.append(tokens)
+            core = frozenset(t for t in tokens if not _STORAGE_PATTERN.match(t))
+            self.cores.append(core)
+            self.core_names.append(_NAME_STORAGE_PATTERN.sub("", model).strip() or model)
+            self.ranks.append((len(core), len(tokens), model))
+            if tokens[0] not in FILLER_WORDS:
+                self.heads.add(tokens[0])
+            for token in tokens:
+                self.postings[token].add(model_id)
+        for company in companies:
+            normalized = normalize_question(company)
+            if normalized:
+                self.companies[normalized] = company
+        # Từ đệm ("phone", "mobile") không là đích của so khớp gần đúng
+        for token in set(self.postings) | set(self.companies):
+            if not _DIGITS_PATTERN.match(token) and not _STORAGE_PATTERN.match(token) and token not in FILLER_WORDS:
+                for trigram in _trigrams(token):
+                    self.token_trigrams[trigram].add(token)
+        # Kết quả ánh xạ token phụ thuộc từ vựng của từng index
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _lookup(self, token: str) -> FrozenSet[str]:
+        """Vocabulary tokens a typed token can stand for"""
+        if token in self.postings or token in self.companies:
+            return frozenset([token])
+        if _DIGITS_PATTERN.match(token):
+            # "256" -> "256gb"
+            return frozenset(t for t in (token + unit for unit in _UNIT_TOKENS) if t in self.postings)
+        if len(token) < 4 or token in FILLER_WORDS:
+            return frozenset()
+        # Gõ sai: ứng viên chung ít nhất 2 trigram, rồi kiểm tra khoảng cách sửa
+        counts: Dict[str, int] = defaultdict(int)
+        for trigram in _trigrams(token):
+            for candidate in self.token_trigrams.get(trigram, ()):
+                counts[candidate] += 1
+        limit = _max_typos(token)
+        distances = {
+            candidate: edit_distance(token, candidate, limit)
+            for candidate, common in counts.items() if common >= 2
+        }
+        best = min(distances.values(), default=limit + 1)
+        if best > limit:
+            return frozenset()
+        return frozenset(candidate for candidate, distance in distances.items() if distance == best)
+
+    def _expand(self, tokens: Iterable[str]) -> List[str]:
+        expanded = []
+        for token in tokens:
+            expanded.extend(token_aliases.get(token, (token,)))
+        return expanded
+
+    def _best_model(self, tokens: List[str]) -> Optional[Tuple[int, float]]:
+        """(name id, coverage) of the best name containing a match for every typed token"""
+        candidates: Optional[Set[int]] = None
+        matched: Set[str] = set()
+        for token in tokens:
+            options = self.lookup(token)
+            if len(options) == 1:
+                ids = self.postings.get(next(iter(options)), set())
+            else:
+                ids = set().union(*(self.postings.get(option, ()) for option in options))
+            if not ids:
+                return None
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return None
+            matched |= options
+        if not candidates:
+            return None
+        # Mọi ứng viên đều chứa các token đã gõ: tên ít token khác nhất phủ được nhiều nhất
+        model_id = min(candidates, key=self.ranks.__getitem__)
+        core = self.cores[model_id]
+        coverage = len(core & matched) / len(core) if core else 1.0
+        if coverage < MIN_COVERAGE:
+            return None
+        return model_id, coverage
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Catalog model name for a typed model name (other words around it are ignored), or None"""
+        for mention in self.find_mentions(text):
+            if mention.kind == "model":
+                return mention.name
+        return None
+
+    def resolve_company(self, text: str) -> Optional[str]:
+        tokens = self._expand(normalize_question(text).split())
+        if len(tokens) != 1:
+            return None
+        for option in self.lookup(tokens[0]):
+            if option in self.companies:
+                return self.companies[option]
+        return None
+
+    def _question_tokens(self, question: str) -> List[Tuple[str, int, int]]:
+        """(normalized token, start, end) with "256 gb" glued and aliases expanded"""
+        tokens: List[Tuple[str, int, int]] = []
+        for match in _TOKEN_PATTERN.finditer(question):
+            token = normalize_question(match.group(0))
+            if not token:
+                continue
+            if token in _UNIT_TOKENS and tokens and _DIGITS_PATTERN.match(tokens[-1][0]):
+                tokens[-1] = (tokens[-1][0] + token, tokens[-1][1], match.end())
+                continue
+            for part in token_aliases.get(token, (token,)):
+                tokens.append((part, match.start(), match.end()))
+        return tokens
+
+    def find_mentions(self, question: str) -> List[Mention]:
+        """Model and company mentions in a question, longest model match first"""
+        question = str(question)
+        tokens = self._question_tokens(question)
+        mentions: List[Mention] = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i][0]
+            options = self.lookup(token)
+            found = None
+            if options & self.heads:
+                # Mở rộng tối đa rồi thu hẹp dần tới khi khớp một tên
+                end = i + 1
+                while end < len(tokens) and end - i < MAX_MENTION_TOKENS and self.lookup(tokens[end][0]):
+                    end += 1
+                while end > i and found is None:
+                    best = self._best_model([t for t, _, _ in tokens[i:end]])
+                    if best is not None:
+                        found = (end, best)
+                    else:
+                        end -= 1
+            if found is not None:
+                end, (model_id, score) = found
+                start_char, end_char = tokens[i][1], tokens[end - 1][2]
+                mentions.append(Mention("model", question[start_char:end_char], self.names[model_id],
+                                        start_char, end_char, score))
+                i = end
+                continue
+            companies = [self.companies[option] for option in options if option in self.companies]
+            if companies:
+                start_char, end_char = tokens[i][1], tokens[i][2]
+                mentions.append(Mention("company", question[start_char:end_char], companies[0],
+                                        start_char, end_char, 1.0))
+            i += 1
+        return mentions
+
+    def _rewrite(self, mention: Mention) -> str:
+        """Text to put in place of a mention: the catalog name, without its storage unless it was typed"""
+        if mention.kind != "model":
+            return mention.name
+        model_id = self.name_ids[mention.name]
+        storage = set(self.tokens[model_id]) - self.cores[model_id]
+        typed = {option for token, _, _ in self._question_tokens(mention.text)
+                 for option in self.lookup(token) if _STORAGE_PATTERN.match(option)}
+        # "ip 15 pro" khớp nhiều bản dung lượng: không chọn hộ người dùng một bản
+        return mention.name if storage and storage <= typed else self.core_names[model_id]
+
+    def canonicalize(self, question: str) -> Tuple[str, List[Mention]]:
+        """Replace typed model/company mentions with their catalog names.
+
+        A model's storage size is only written when the mention typed it;
+        otherwise the name without storage is used ("ip 15 pro" -> "iPhone 15
+        Pro"), and a typed size no name has stays as typed, outside the
+        mention ("... 512gb").
+        """
+        question = str(question)
+        mentions = self.find_mentions(question)
+        for mention in reversed(mentions):
+            name = self._rewrite(mention)
+            if normalize_question(mention.text) != normalize_question(name):
+                question = question[:mention.start] + name + question[mention.end:]
+        return question, mentions
@@ -0,0 +1,218 @@
+import operator
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from intent_router import DEFAULT_LIMIT, RoutedQuery, currency_countries
+from model_specs import CATALOG_SPECS_QUERY, spec_properties
+from spec_parsing import parse_battery_mah, parse_price, parse_ram_gb, parse_screen_inches, parse_weight_grams, parse_year
+
+# Cột của ma trận đặc trưng (mỗi cột được chuẩn hoá về [0, 1] trên toàn catalog)
+feature_columns = ["ram", "battery", "back_camera", "front_camera", "screen", "weight", "processor", "year", "price"]
+countries = list(currency_countries.values())
+
+# Nhu cầu -> trọng số trên các đặc trưng (âm: càng nhỏ càng tốt)
+use_case_profiles = {
+    "gaming": {"processor": 0.4, "ram": 0.25, "battery": 0.15, "screen": 0.1, "year": 0.1},
+    "photography": {"back_camera": 0.45, "processor": 0.2, "year": 0.15, "front_camera": 0.1, "ram": 0.1},
+    "selfie": {"front_camera": 0.6, "back_camera": 0.15, "year": 0.15, "processor": 0.1},
+    "battery": {"battery": 0.65, "year": 0.15, "processor": 0.1, "weight": -0.1},
+    "compact": {"weight": -0.5, "screen": -0.3, "processor": 0.1, "year": 0.1},
+    "budget": {"price": -0.6, "processor": 0.15, "battery": 0.15, "ram": 0.1},
+    "big_screen": {"screen": 0.55, "battery": 0.2, "year": 0.15, "processor": 0.1},
+    "all_round": {"processor": 0.25, "battery": 0.2, "back_camera": 0.2, "year": 0.2, "ram": 0.15},
+}
+
+# Hạng chip (1-5) theo tên; mẫu đầu tiên khớp được dùng
+processor_tiers = [
+    (r"snapdragon 8 (gen|elite)|\ba1[7-9]\b|dimensity 9\d{3}|tensor g[3-9]|exynos 2[2-9]\d\d|kirin 9\d{3}", 5),
+    (r"snapdragon 8\d\d|snapdragon 8\+?|\ba1[56]\b|dimensity [89]\d{3}|tensor|exynos 2[01]\d\d|kirin 9\d0", 4),
+    (r"snapdragon 7|\ba1[34]\b|dimensity [78]\d{2,3}|exynos 1[34]\d\d|helio g9\d|kirin 8", 3),
+    (r"snapdragon 6|\ba1[0-2]\b|dimensity [6]\d{2,3}|exynos \d{3,4}|helio g[78]\d|unisoc t[67]", 2),
+    (r"snapdragon|helio|unisoc|dimensity|exynos|kirin|bionic|tensor", 1),
+]
+_TIER_PATTERNS = [(re.compile(pattern), tier) for pattern, tier in processor_tiers]
+_MEGAPIXEL_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*mp", re.IGNORECASE)
+# Toán tử so sánh của ràng buộc giá (RoutedQuery.constraints["price"])
+_PRICE_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+def processor_tier(name: Any) -> Optional[float]:
+    text = str(name or "").lower()
+    if not text:
+        return None
+    for pattern, tier in _TIER_PATTERNS:
+        if pattern.search(text):
+            return float(tier)
+    return None
+
+def parse_megapixels(text: Any) -> Optional[float]:
+    """'50MP + 12MP + 10MP' -> 50.0 (the main sensor)"""
+    numbers = [float(number) for number in _MEGAPIXEL_PATTERN.findall(str(text or ""))]
+    return max(numbers) if numbers else None
+
+def _normalize(column: np.ndarray) -> Tuple[np.ndarray, Tuple[Optional[float], ...]]:
+    """Min-max scale to [0, 1]; a missing value gets the column median (neutral).
+
+    Also returns the scale used: (low, high, fill), fill None when nothing was missing.
+    """
+    finite = np.isfinite(column)
+    if not finite.any():
+        return np.zeros_like(column), (None, None, None)
+    low, high = column[finite].min(), column[finite].max()
+    scaled = (column - low) / (high - low) if high > low else np.zeros_like(column)
+    fill = None
+    if not finite.all():
+        fill = float(np.median(scaled[finite]))
+        scaled[~finite] = fill
+    return scaled, (float(low), float(high), fill)
+
+class Recommender:
+    """Needs-based ranking over the whole catalog held as a NumPy feature matrix.
+
+    ``features`` has one row per model and one [0, 1]-scaled column per
+    entry of ``feature_columns``. The price column is each model's mean
+    price rank across countries, so a model missing one country's price
+    still has a price level. Raw prices per country stay in ``prices`` for
+    budget filters. A request is one matrix-vector product plus a boolean
+    mask and ``argpartition``, so every phone is scored without a graph
+    traversal. ``scale`` keeps the min-max bounds (and median fill) of
+    every column, so callers can tell when a catalog change rescaled them.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        records = [record for record in records if record.get("model")]
+        self.models = np.array([record["model"] for record in records], dtype=object)
+        # Giá trị gốc để hiển thị
+        self.specs = {prop: np.array([record.get(prop) or "" for record in records], dtype=object)
+                      for prop in spec_properties.values()}
+        self.companies = np.array([str(record.get("company") or "").lower() for record in records], dtype=object)
+        parsers = {
+            "ram": parse_ram_gb,
+            "battery": parse_battery_mah,
+            "back_camera": parse_megapixels,
+            "front_camera": parse_megapixels,
+            "screen": parse_screen_inches,
+            "weight": parse_weight_grams,
+            "processor": processor_tier,
+            "year": parse_year,
+        }
+        raw = np.full((len(records), len(feature_columns)), np.nan)
+        for j, column in enumerate(feature_columns[:-1]):
+            parse = parsers[column]
+            raw[:, j] = [np.nan if value is None else value for value in map(parse, self.specs[column])]
+        self.prices = np.full((len(records), len(countries)), np.nan)
+        for j, country in enumerate(countries):
+            amounts = [parse_price(value)[1] if value else None for value in self.specs[f"price_{country.lower()}"]]
+            self.prices[:, j] = [np.nan if amount is None else amount for amount in amounts]
+        self.scale: Dict[str, Tuple[Optional[float], ...]] = {}
+        price_ranks = np.full((len(records), len(countries)), np.nan)
+        for j, country in enumerate(countries):
+            if np.isfinite(self.prices[:, j]).any():
+                price_ranks[:, j], self.scale[f"price_{country.lower()}"] = _normalize(self.prices[:, j])
+        # Trung bình các quốc gia có giá (không có giá nào: NaN)
+        priced = np.isfinite(price_ranks)
+        counts = priced.sum(axis=1)
+        raw[:, -1] = np.where(counts > 0, np.where(priced, price_ranks, 0).sum(axis=1) / np.maximum(counts, 1), np.nan)
+        self.features = np.zeros_like(raw)
+        for j, column in enumerate(feature_columns):
+            self.features[:, j], self.scale[column] = _normalize(raw[:, j])
+        self.version: Any = None
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    @classmethod
+    def from_frame(cls, df) -> "Recommender":
+        """From a catalog frame with the CSV column names"""
+        from etl import clean_frame, first_row_per_model
+
+        # Như node Model trong đồ thị: mỗi tên một dòng (dòng đầu tiên)
+        df = first_row_per_model(clean_frame(df))
+        columns = [column for column in spec_properties if column in df.columns]
+        records = [
+            {"model": row[0], **{spec_properties[column]: value for column, value in zip(columns, row[1:])}}
+            for row in df[['Model Name'] + columns].itertuples(index=False, name=None)
+        ]
+        return cls(records)
+
+    @classmethod
+    def from_csv(cls, csv_file: str) -> "Recommender":
+        from etl import read_csv_data
+
+        started = time.perf_counter()
+        recommender = cls.from_frame(read_csv_data(csv_file))
+        print(f"Recommender: {len(recommender)} models in {time.perf_counter() - started:.2f}s")
+        return recommender
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "Recommender":
+        """From a ``catalog_snapshot.CatalogSnapshot``: first row of each model, like ``from_frame``"""
+        columns = [column for column in spec_properties if column in snapshot.columns]
+        return cls(
+            {"model": row[0], **{spec_properties[column]: value for column, value in zip(columns, row[1:])}}
+            for row in snapshot.iter_rows(['Model Name'] + columns, first_per_model=True)
+        )
+
+    @classmethod
+    def from_graph(cls, driver) -> "Recommender":
+        """From the spec properties on the Model nodes (model_specs), in one query"""
+        with driver.session() as session:
+            return cls(record.data() for record in session.run(CATALOG_SPECS_QUERY))
+
+    @staticmethod
+    def weights(use_cases: Iterable[str]) -> np.ndarray:
+        """Sum of the use-case profiles as a vector over ``feature_columns``"""
+        vector = np.zeros(len(feature_columns))
+        for use_case in use_cases:
+            for column, weight in use_case_profiles[use_case].items():
+                vector[feature_columns.index(column)] += weight
+        return vector
+
+    def recommend(self, use_cases: Iterable[str], country: str = "USA", price: Optional[Dict[str, float]] = None,
+                  company: Optional[str] = None, k: int = 5) -> List[Dict[str, Any]]:
+        """Top-``k`` models for the use cases within the budget ``price``.
+
+        ``price`` maps a comparison operator to an amount in ``country``'s
+        currency, like the router's constraints: ``{"<": 500}`` is a strict
+        budget, ``{">=": 300, "<=": 600}`` an inclusive range.
+        """
+        use_cases = list(use_cases) or ["all_round"]
+        weights = self.weights(use_cases)
+        scores = self.features @ weights
+        mask = np.ones(len(self), dtype=bool)
+        amounts = self.prices[:, countries.index(country)]
+        if price:
+            # Không có giá ở quốc gia này thì không so được với ngân sách
+            mask &= np.isfinite(amounts)
+            with np.errstate(invalid="ignore"):
+                for op, amount in price.items():
+                    mask &= _PRICE_OPERATORS[op](amounts, amount)
+        if company:
+            mask &= self.companies == company.lower()
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        # Cùng điểm thì rẻ hơn đứng trước
+        order = np.lexsort((np.nan_to_num(amounts[candidates], nan=np.inf), -scores[candidates]))
+        columns = [column for column in feature_columns[:-1] if abs(weights[feature_columns.index(column)]) >= 0.1]
+        price_column = f"price_{country.lower()}"
+        results = []
+        for i in candidates[order]:
+            record: Dict[str, Any] = {"model": self.models[i]}
+            record.update((column, self.specs[column][i]) for column in columns)
+            record[price_column] = self.specs[price_column][i]
+            record["score"] = round(float(scores[i]), 3)
+            results.append(record)
+        return results
+
+    def run_routed(self, routed: RoutedQuery) -> Iterator[Dict[str, Any]]:
+        constraints = routed.constraints or {}
+        return iter(self.recommend(
+            constraints.get("use_cases", ()),
+            constraints.get("country", "USA"),
+            price=constraints.get("price"),
+            company=constraints.get("company"),
+            k=routed.params.get("limit", DEFAULT_LIMIT),
+        ))
@@ -0,0 +1,132 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_VERSION_CHECK_INTERVAL = 30.0
+
+# Nút đánh dấu phiên bản catalog, loader tăng version sau mỗi lần nạp
+BUMP_CATALOG_VERSION_QUERY = (
+    "MERGE (v:CatalogVersion {id: 'catalog'}) "
+    "SET v.version = coalesce(v.version, 0) + 1, v.updated_at = datetime() "
+    "RETURN v.version AS version"
+)
+CATALOG_VERSION_QUERY = "MATCH (v:CatalogVersion {id: 'catalog'}) RETURN v.version AS version"
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_WRITE_PATTERN = re.compile(r"\b(create|merge|set|delete|detach|remove|drop|load\s+csv)\b", re.IGNORECASE)
+
+def bump_catalog_version(tx) -> int:
+    """Increment the catalog version stamp (run inside the loader's write transaction)"""
+    return tx.run(BUMP_CATALOG_VERSION_QUERY).single()["version"]
+
+def read_catalog_version(driver) -> int:
+    with driver.session() as session:
+        record = session.run(CATALOG_VERSION_QUERY).single()
+    return record["version"] if record is not None else 0
+
+def normalize_cypher(cypher_query: str) -> str:
+    """Collapse whitespace and trailing semicolons; literals keep their case"""
+    return _WHITESPACE_PATTERN.sub(" ", str(cypher_query)).strip().rstrip(";").strip()
+
+def is_read_only(cypher_query: str) -> bool:
+    return _WRITE_PATTERN.search(cypher_query) is None
+
+class ResultCache:
+    """Byte-bounded LRU cache of Cypher results.
+
+    Keys are the normalized query text plus the JSON-encoded parameters.
+    Entries are dropped all at once when the catalog version stamp changes;
+    ``version_loader`` is polled at most every ``version_check_interval``
+    seconds. Cached record lists are shared, callers must not modify them.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 version_loader: Optional[Callable[[], Any]] = None,
+                 version_check_interval: float = DEFAULT_VERSION_CHECK_INTERVAL):
+        self.max_bytes = max_bytes
+        self.version_loader = version_loader
+        self.version_check_interval = version_check_interval
+        self.version: Any = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[Dict[str, Any]], int]]" = OrderedDict()
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(cypher_query: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        return normalize_cypher(cypher_query), json.dumps(params or {}, sort_keys=True, default=str)
+
+    def version_check_due(self) -> bool:
+        return self.version_loader is not None and time.monotonic() - self._checked_at >= self.version_check_interval
+
+    def check_version(self) -> None:
+        """Clear the cache if the catalog version stamp moved since the last check"""
+        if not self.version_check_due():
+            return
+        self._checked_at = time.monotonic()
+        try:
+            version = self.version_loader()
+        except Exception as e:
+            print("❌ Could not read catalog version:", e)
+            return
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.bytes = 0
+                self.version = version
+
+    def get(self, cypher_query: str, params: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        key = self.key(cypher_query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, cypher_query: str, params: Optional[Dict[str, Any]], records: List[Dict[str, Any]]) -> bool:
+        """Store a result; returns False for write queries and results larger than the cache"""
+        if not is_read_only(cypher_query):
+            return False
+        key = self.key(cypher_query, params)
+        size = len(key[0]) + len(key[1]) + len(json.dumps(records, default=str))
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (records, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "version": self.version,
+        }
@@ -0,0 +1,260 @@
+import argparse
+import json
+import time
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from model_specs import CATALOG_SPECS_QUERY
+from recommender import Recommender, feature_columns
+
+# price_ratio: giá của máy tương tự / giá của máy gốc (trung bình các quốc gia có cả hai giá)
+Neighbour = namedtuple("Neighbour", ["model", "score", "price_ratio"])
+
+DEFAULT_K = 10
+DEFAULT_BATCH_SIZE = 500
+# Tỷ trọng của khoảng cách số trong điểm tương tự (phần còn lại là weighted Jaccard)
+NUMERIC_SHARE = 0.5
+# Số ô tối đa của một khối điểm (hàng x toàn catalog) tính cùng lúc
+MAX_BLOCK_CELLS = 1 << 22
+
+# Node thuộc tính dùng chung -> trọng số trong weighted Jaccard (giá gần như không trùng nên để cho phần số)
+attribute_weights = {
+    "processor": 3.0,
+    "back_camera": 2.0,
+    "ram": 1.5,
+    "battery": 1.5,
+    "screen": 1.5,
+    "company": 1.0,
+    "front_camera": 1.0,
+    "year": 1.0,
+    "weight": 0.5,
+}
+numeric_weights = {
+    "processor": 1.5, "ram": 1.0, "battery": 1.0, "back_camera": 1.0, "screen": 1.0,
+    "price": 1.0, "front_camera": 0.5, "weight": 0.5, "year": 0.5,
+}
+
+DELETE_SIMILAR_QUERY = "UNWIND $names AS name MATCH (:Model {name: name})-[s:SIMILAR_TO]->() DELETE s"
+WRITE_SIMILAR_QUERY = """
+UNWIND $rows AS row
+MATCH (a:Model {name: row.model}), (b:Model {name: row.neighbour})
+MERGE (a)-[s:SIMILAR_TO]->(b)
+SET s.score = row.score, s.rank = row.rank, s.price_ratio = row.price_ratio
+"""
+# Thang chuẩn hoá (min/max, median) của các đặc trưng số ứng với SIMILAR_TO đang lưu
+READ_SIMILAR_SCALE_QUERY = "MATCH (s:SimilarityScale {id: 'similar'}) RETURN s.scale AS scale"
+WRITE_SIMILAR_SCALE_QUERY = "MERGE (s:SimilarityScale {id: 'similar'}) SET s.scale = $scale"
+READ_SIMILAR_QUERY = (
+    "MATCH (a:Model)-[s:SIMILAR_TO]->(b:Model) "
+    "RETURN a.name AS model, collect(b.name) AS neighbours, min(s.score) AS floor"
+)
+
+class SimilarityIndex:
+    """Top-k nearest phones by shared attribute nodes and numeric distance.
+
+    ``value_ids`` is the sparse model x attribute-node incidence matrix in
+    CSR form (``indptr``/``value_ids``) and ``postings`` its columns (CSC),
+    so the weighted intersections of a block of models with the whole
+    catalog are one ``bincount`` over the postings of their attribute
+    nodes. Weighted Jaccard is ``S / (W_a + W_b - S)``. The numeric part
+    reuses the recommender's [0, 1]-scaled features (``1 -`` weighted mean
+    absolute difference). The score is their ``NUMERIC_SHARE`` blend, and
+    both parts are symmetric. Those features depend on the catalog-wide
+    min/max, so ``scale`` (a JSON stamp of the recommender's ``scale``)
+    changes whenever a change rescales every score.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        engine = Recommender(records)
+        self.models: List[str] = list(engine.models)
+        self.model_ids = {name: i for i, name in enumerate(self.models)}
+        self.numeric = engine.features
+        self.prices = engine.prices
+        self.scale = json.dumps(sorted(engine.scale.items()))
+        weights = np.array([numeric_weights.get(column, 0.0) for column in feature_columns])
+        self.numeric_weights = weights / weights.sum()
+        # Mỗi giá trị (thuộc tính, giá trị) là một node dùng chung
+        vocabulary: Dict[Tuple[str, str], int] = {}
+        value_weights: List[float] = []
+        indptr = [0]
+        value_ids: List[int] = []
+        for i in range(len(self.models)):
+            for attribute, weight in attribute_weights.items():
+                value = str(engine.specs[attribute][i])
+                if not value:
+                    continue
+                key = (attribute, value)
+                if key not in vocabulary:
+                    vocabulary[key] = len(vocabulary)
+                    value_weights.append(weight)
+                value_ids.append(vocabulary[key])
+            indptr.append(len(value_ids))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.value_ids = np.array(value_ids, dtype=np.int64)
+        self.value_weights = np.array(value_weights, dtype=float)
+        rows = np.repeat(np.arange(len(self.models)), np.diff(self.indptr))
+        order = np.argsort(self.value_ids, kind="stable")
+        self.postings_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.value_ids, minlength=len(vocabulary)))])
+        self.postings = rows[order]
+        self.row_weights = np.bincount(rows, weights=self.value_weights[self.value_ids], minlength=len(self.models))
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def scores(self, rows: Sequence[int]) -> np.ndarray:
+        """Similarity of each model in ``rows`` to every model (len(rows) x n)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(self.models)
+        # Giao có trọng số: với mỗi node của hàng, cộng trọng số vào mọi model có node đó
+        cells, weights = [], []
+        for block_row, i in enumerate(rows):
+            for value in self.value_ids[self.indptr[i]:self.indptr[i + 1]]:
+                models = self.postings[self.postings_ptr[value]:self.postings_ptr[value + 1]]
+                cells.append(block_row * n + models)
+                weights.append(np.full(len(models), self.value_weights[value]))
+        shared = np.zeros(len(rows) * n)
+        if cells:
+            shared = np.bincount(np.concatenate(cells), weights=np.concatenate(weights), minlength=len(rows) * n)
+        shared = shared.reshape(len(rows), n)
+        union = self.row_weights[rows][:, None] + self.row_weights[None, :] - shared
+        jaccard = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+        distance = np.abs(self.numeric[rows][:, None, :] - self.numeric[None, :, :]) @ self.numeric_weights
+        return (1 - NUMERIC_SHARE) * jaccard + NUMERIC_SHARE * (1 - distance)
+
+    def _blocks(self, rows: Sequence[int]) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+        rows = np.asarray(rows, dtype=np.int64)
+        size = max(1, MAX_BLOCK_CELLS // max(1, len(self.models) * len(feature_columns)))
+        for start in range(0, len(rows), size):
+            block = rows[start:start + size]
+            yield block, self.scores(block)
+
+    def price_ratio(self, a: int, b: int) -> Optional[float]:
+        both = np.isfinite(self.prices[a]) & np.isfinite(self.prices[b]) & (self.prices[a] > 0)
+        if not both.any():
+            return None
+        return round(float(np.mean(self.prices[b][both] / self.prices[a][both])), 3)
+
+    def top_k(self, models: Optional[Iterable[str]] = None, k: int = DEFAULT_K) -> Dict[str, List[Neighbour]]:
+        """Nearest ``k`` models of each of ``models`` (all models when None), best first"""
+        if models is None:
+            rows = list(range(len(self.models)))
+        else:
+            rows = [self.model_ids[name] for name in models if name in self.model_ids]
+        k = min(k, len(self.models) - 1)
+        result: Dict[str, List[Neighbour]] = {}
+        for block, scores in self._blocks(rows):
+            scores[np.arange(len(block)), block] = -np.inf
+            if k <= 0:
+                result.update((self.models[i], []) for i in block)
+                continue
+            nearest = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for block_row, i in enumerate(block):
+                ids = nearest[block_row][np.argsort(-scores[block_row, nearest[block_row]], kind="stable")]
+                result[self.models[i]] = [
+                    Neighbour(self.models[j], round(float(scores[block_row, j]), 4), self.price_ratio(i, j)) for j in ids
+                ]
+        return result
+
+    def neighbours(self, model: str, limit: int = DEFAULT_K, cheaper: bool = False,
+                   k: int = DEFAULT_K) -> List[Neighbour]:
+        """Like ``model_specs.SIMILAR_MODELS_QUERY`` over the stored top-``k``"""
+        if model not in self.model_ids:
+            return []
+        candidates = self.top_k([model], k)[model]
+        if cheaper:
+            candidates = [n for n in candidates if n.price_ratio is not None and n.price_ratio < 1]
+        return candidates[:limit]
+
+    def affected(self, changed: Iterable[str], current: Dict[str, Tuple[List[str], float]],
+                 k: int = DEFAULT_K) -> Set[str]:
+        """Models whose stored top-k may differ after ``changed`` models were inserted, updated or deleted.
+
+        Assumes the stored top-k were computed with the same ``scale``
+        (otherwise every model may differ). ``current`` maps a model to (stored neighbours, lowest stored score).
+        Besides the changed models, a model is refreshed when it pointed at a
+        changed model, holds fewer than ``k`` neighbours, or now scores a
+        changed model above its lowest stored neighbour. Scores are
+        symmetric, so the rows of the changed models give that last column.
+        """
+        changed = set(changed)
+        affected = {name for name in changed if name in self.model_ids}
+        k = min(k, len(self.models) - 1)
+        for name in self.models:
+            neighbours, _ = current.get(name, ([], 0.0))
+            if len(neighbours) < k or changed.intersection(neighbours):
+                affected.add(name)
+        floors = np.array([current.get(name, ([], np.inf))[1] for name in self.models], dtype=float)
+        rows = [self.model_ids[name] for name in sorted(changed) if name in self.model_ids]
+        for block, scores in self._blocks(rows):
+            # Không tính điểm của một model với chính nó
+            scores[np.arange(len(block)), block] = -np.inf
+            for j in np.flatnonzero(scores.max(axis=0) >= floors):
+                affected.add(self.models[j])
+        return affected
+
+def read_similarities(driver) -> Dict[str, Tuple[List[str], float]]:
+    with driver.session() as session:
+        return {record["model"]: (record["neighbours"], record["floor"]) for record in session.run(READ_SIMILAR_QUERY)}
+
+def write_similarities(tx, neighbours: Dict[str, List[Neighbour]]):
+    """Replace the outgoing SIMILAR_TO relationships of the given models"""
+    tx.run(DELETE_SIMILAR_QUERY, names=list(neighbours)).consume()
+    rows = [
+        {"model": model, "neighbour": n.model, "score": n.score, "rank": rank, "price_ratio": n.price_ratio}
+        for model, nearest in neighbours.items()
+        for rank, n in enumerate(nearest, 1)
+    ]
+    return tx.run(WRITE_SIMILAR_QUERY, rows=rows).consume()
+
+def read_similarity_scale(driver) -> Optional[str]:
+    with driver.session() as session:
+        record = session.run(READ_SIMILAR_SCALE_QUERY).single()
+    return record["scale"] if record is not None else None
+
+def refresh_similarities(driver, changed: Optional[Iterable[str]] = None, k: int = DEFAULT_K,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """Recompute SIMILAR_TO for every model (``changed`` None) or only for the models a change can affect.
+
+    A change that moves the min/max (or median fill) of any feature rescales
+    every score, so it falls back to a full refresh.
+    """
+    started = time.perf_counter()
+    with driver.session() as session:
+        index = SimilarityIndex(record.data() for record in session.run(CATALOG_SPECS_QUERY))
+    full = changed is None or read_similarity_scale(driver) != index.scale
+    if full:
+        models = list(index.models)
+    else:
+        models = sorted(index.affected(changed, read_similarities(driver), k))
+    with driver.session() as session:
+        for start in range(0, len(models), batch_size):
+            session.execute_write(write_similarities, index.top_k(models[start:start + batch_size], k))
+        session.run(WRITE_SIMILAR_SCALE_QUERY, scale=index.scale).consume()
+    return {"models": len(index), "refreshed": len(models), "full": full, "seconds": time.perf_counter() - started}
+
+def main():
+    from neo4j import GraphDatabase
+
+    from bulk_loader import NEO4J_PASSWORD, NEO4J_URL, NEO4J_USER
+    from result_cache import bump_catalog_version
+
+    parser = argparse.ArgumentParser(description="Precompute SIMILAR_TO relationships (top-k similar phones per model)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--models", nargs="*", help="only refresh what changing these models can affect")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(NEO4J_URL, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        stats = refresh_similarities(driver, args.models, args.k, args.batch_size)
+        with driver.session() as session:
+            version = session.execute_write(bump_catalog_version)
+    finally:
+        driver.close()
+    print(f"Refreshed {stats['refreshed']} of {stats['models']} models in {stats['seconds']:.2f}s")
+    print(f"Catalog version: {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_BATCH_WINDOW = 0.01
+DEFAULT_MAX_BATCH_SIZE = 16
+
+def _wake(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+class Flight:
+    """One in-flight call, shared by its leader and the callers that joined it.
+
+    Followers block on ``result()`` (threads) or await ``aresult()`` (event
+    loops; any loop, any thread). Both return the leader's value or raise its
+    exception. When the leader gave up (cancelled, generator closed early)
+    ``abandoned`` is set and the value is None: the follower runs the call
+    itself.
+    """
+
+    def __init__(self):
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.abandoned = False
+        self.followers = 0
+        self._done = threading.Event()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def settled(self) -> bool:
+        return self._done.is_set()
+
+    def _settle(self, value: Any, error: Optional[BaseException], abandoned: bool) -> bool:
+        with self._lock:
+            if self._done.is_set():
+                return False
+            self.value, self.error, self.abandoned = value, error, abandoned
+            self._done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            # Follower có thể đang chờ ở event loop của thread khác
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass
+        return True
+
+    def _outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def result(self) -> Any:
+        self._done.wait()
+        return self._outcome()
+
+    async def aresult(self) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._done.is_set():
+                future.set_result(None)
+            else:
+                self._waiters.append((loop, future))
+        await future
+        return self._outcome()
+
+class SingleFlight:
+    """Coalesce concurrent identical calls: one leader runs, the others share its outcome.
+
+    Only calls that overlap in time are merged; a key is forgotten as soon as
+    its call settles, so this is not a cache (the caches sit in front of it).
+    ``do``/``ado`` wrap a plain call; streaming callers use ``begin`` and
+    settle the flight themselves with ``finish``.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.shared = 0
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def begin(self, key: Hashable) -> Tuple[Flight, bool]:
+        """(flight, True) for a new leader, (flight, False) for a follower of the call in flight"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.shared += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self.leaders += 1
+            return flight, True
+
+    def finish(self, key: Hashable, flight: Flight, value: Any = None, error: Optional[BaseException] = None,
+               abandoned: bool = False) -> None:
+        """Settle a led flight (later calls are no-ops) and release its followers"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight._settle(value, error, abandoned)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(value, shared): run ``fn`` unless an identical call is in flight, else wait for it"""
+        while True:
+            flight, leader = self.begin(key)
+            if leader:
+                break
+            value = flight.result()
+            if not flight.abandoned:
+                return value, True
+        try:
+            value = fn()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        except BaseException:
+            self.finish(key, flight, abandoned=True)
+            raise
+        self.finish(key, flight, value)
+        return value, False
+
+    async def ado(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Like ``do`` for coroutines; a cancelled leader hands the call over to a follower"""
+        while True:
+            flight, leader = self.begin(key)
+            if leader:
+                break
+            value = await flight.aresult()
+            if not flight.abandoned:
+                return value, True
+        try:
+            value = await factory()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        except BaseException:
+            self.finish(key, flight, abandoned=True)
+            raise
+        self.finish(key, flight, value)
+        return value, False
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "shared": self.shared}
+
+class _Batch:
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.items: List[Any] = []
+        self.results: List[Any] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.loop = loop
+        self.futures: List["asyncio.Future[Any]"] = []
+        self.timer: Optional[asyncio.Handle] = None
+
+def _batch_results(results: Sequence[Any], size: int) -> List[Any]:
+    results = list(results)
+    if len(results) != size:
+        error = RuntimeError(f"batch returned {len(results)} results for {size} items")
+        return [error] * size
+    return results
+
+class MicroBatcher:
+    """Group items submitted while a batch call is in flight into one batch call.
+
+    ``run_batch(items)`` (threads, ``submit``) and ``arun_batch(items)``
+    (coroutines, ``asubmit``) return one result per item, in order; a result
+    that is an exception is raised to the caller of that item only. An item
+    submitted while no batch is in flight is sent at once (coroutines
+    submitted in the same event loop iteration share it); while a batch is in
+    flight, new items wait at most ``window`` seconds for company, and a batch
+    reaching ``max_size`` items is sent at once. ``window=None`` sends every
+    item alone. ``window`` and ``max_size`` may be callables read at each
+    submit, so configuration changed after construction takes effect.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], Sequence[Any]],
+                 arun_batch: Optional[Callable[[List[Any]], Awaitable[Sequence[Any]]]] = None,
+                 window: Union[Optional[float], Callable[[], Optional[float]]] = DEFAULT_BATCH_WINDOW,
+                 max_size: Union[int, Callable[[], int]] = DEFAULT_MAX_BATCH_SIZE):
+        self.run_batch = run_batch
+        self.arun_batch = arun_batch
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._pending: Optional[_Batch] = None
+        self._running = 0
+        self._apending: Dict[asyncio.AbstractEventLoop, _Batch] = {}
+        self._arunning: Dict[asyncio.AbstractEventLoop, int] = {}
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+
+    def _settings(self) -> Tuple[Optional[float], int]:
+        window = self.window() if callable(self.window) else self.window
+        max_size = self.max_size() if callable(self.max_size) else self.max_size
+        return window, max_size
+
+    @staticmethod
+    def _result(result: Any) -> Any:
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def submit(self, item: Any) -> Any:
+        window, max_size = self._settings()
+        with self._lock:
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                # Không có lô nào đang chạy: gửi ngay, không chờ thêm item
+                wait = window is not None and self._running > 0
+                if wait:
+                    self._pending = batch
+                else:
+                    self._running += 1
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= max_size:
+                batch.full.set()
+                if self._pending is batch:
+                    self._pending = None
+        if not leader:
+            batch.done.wait()
+            return self._result(batch.results[index])
+        if wait:
+            batch.full.wait(window)
+            with self._lock:
+                # Từ đây lô không nhận thêm item
+                if self._pending is batch:
+                    self._pending = None
+                self._running += 1
+        self.batches += 1
+        self.items += len(batch.items)
+        try:
+            batch.results = _batch_results(self.run_batch(batch.items), len(batch.items))
+        except Exception as e:
+            batch.results = [e] * len(batch.items)
+        except BaseException:
+            # Leader bị ngắt (KeyboardInterrupt, ...): không để follower chờ mãi
+            batch.results = [RuntimeError("batch abandoned")] * len(batch.items)
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+            batch.done.set()
+        return self._result(batch.results[index])
+
+    async def asubmit(self, item: Any) -> Any:
+        if self.arun_batch is None:
+            return await asyncio.to_thread(self.submit, item)
+        window, max_size = self._settings()
+        loop = asyncio.get_running_loop()
+        batch = self._apending.get(loop)
+        if batch is None:
+            batch = _Batch(loop)
+            if window is not None:
+                self._apending[loop] = batch
+                if self._arunning.get(loop):
+                    batch.timer = loop.call_later(window, self._aflush, batch)
+                else:
+                    # Không có lô nào đang chạy: gửi ở vòng lặp kế tiếp của event loop
+                    batch.timer = loop.call_soon(self._aflush, batch)
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if window is None or len(batch.items) >= max_size:
+            self._aflush(batch)
+        return self._result(await future)
+
+    def _aflush(self, batch: _Batch) -> None:
+        if self._apending.get(batch.loop) is batch:
+            del self._apending[batch.loop]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._arunning[batch.loop] = self._arunning.get(batch.loop, 0) + 1
+        # Giữ tham chiếu tới task tới khi chạy xong
+        task = batch.loop.create_task(self._arun(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _arun(self, batch: _Batch) -> None:
+        self.batches += 1
+        self.items += len(batch.items)
+        try:
+            results = _batch_results(await self.arun_batch(batch.items), len(batch.items))
+        except Exception as e:
+            results = [e] * len(batch.items)
+        except BaseException:
+            # Task bị huỷ (event loop đóng): huỷ luôn các item đang chờ
+            for future in batch.futures:
+                future.cancel()
+            raise
+        finally:
+            self._arunning[batch.loop] -= 1
+            if not self._arunning[batch.loop]:
+                del self._arunning[batch.loop]
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0}
@@ -0,0 +1,97 @@
+import re
+
+_NUMBER_PATTERN = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+_CURRENCY_PATTERN = re.compile(r"[A-Za-z]{3}")
+
+def _first_number(text):
+    match = _NUMBER_PATTERN.search(str(text))
+    if match is None:
+        return None
+    return float(match.group(0).replace(",", ""))
+
+def parse_weight_grams(text):
+    """'174g' -> 174.0, '1.2 kg' -> 1200.0"""
+    number = _first_number(text)
+    if number is None:
+        return None
+    if re.search(r"\d\s*kg", str(text).lower()):
+        number *= 1000
+    return number
+
+def parse_ram_gb(text):
+    """'8GB' -> 8.0, '512MB' -> 0.5"""
+    number = _first_number(text)
+    if number is None:
+        return None
+    if re.search(r"\d\s*mb", str(text).lower()):
+        number /= 1024
+    return number
+
+def parse_battery_mah(text):
+    """'3,600mAh' -> 3600"""
+    number = _first_number(text)
+    return int(number) if number is not None else None
+
+def parse_screen_inches(text):
+    """'6.1 inches' -> 6.1, '7.6 inches (unfolded)' -> 7.6"""
+    return _first_number(text)
+
+def parse_price(text):
+    """'PKR 224,999' -> ('PKR', 224999)"""
+    number = _first_number(text)
+    if number is None:
+        return None, None
+    currency = _CURRENCY_PATTERN.search(str(text))
+    return (currency.group(0).upper() if currency else None), int(round(number))
+
+def parse_year(text):
+    number = _first_number(text)
+    return int(number) if number is not None else None
+
+numeric_columns = {
+    'Mobile Weight', 'RAM', 'Battery Capacity', 'Screen Size',
+    'Launched Price (Pakistan)', 'Launched Price (India)', 'Launched Price (China)',
+    'Launched Price (USA)', 'Launched Price (Dubai)',
+}
+
+def numeric_properties(column, value):
+    """Typed, unit-normalized properties for the target node of a CSV column"""
+    if column == 'Mobile Weight':
+        grams = parse_weight_grams(value)
+        return {"grams": grams} if grams is not None else {}
+    if column == 'RAM':
+        gb = parse_ram_gb(value)
+        return {"gb": gb} if gb is not None else {}
+    if column == 'Battery Capacity':
+        mah = parse_battery_mah(value)
+        return {"mah": mah} if mah is not None else {}
+    if column == 'Screen Size':
+        inches = parse_screen_inches(value)
+        return {"inches": inches} if inches is not None else {}
+    if column.startswith('Launched Price'):
+        currency, amount = parse_price(value)
+        if amount is None:
+            return {}
+        return {"amount": amount, "currency": currency} if currency else {"amount": amount}
+    return {}
+
+def numeric_properties_cypher(column, value):
+    """Render numeric_properties as extra entries of a Cypher map literal"""
+    parts = []
+    for key, prop in numeric_properties(column, value).items():
+        if isinstance(prop, str):
+            parts.append(f", {key}: '{prop}'")
+        elif isinstance(prop, float) and prop.is_integer():
+            parts.append(f", {key}: {int(prop)}")
+        else:
+            parts.append(f", {key}: {prop}")
+    return "".join(parts)
+
+# Range index cho các thuộc tính số, để planner phục vụ điều kiện <, >, BETWEEN từ index
+range_index_queries = [
+    "CREATE RANGE INDEX weight_grams_index IF NOT EXISTS FOR (w:Weight) ON (w.grams)",
+    "CREATE RANGE INDEX ram_gb_index IF NOT EXISTS FOR (r:RAM) ON (r.gb)",
+    "CREATE RANGE INDEX battery_mah_index IF NOT EXISTS FOR (b:Battery) ON (b.mah)",
+    "CREATE RANGE INDEX screen_inches_index IF NOT EXISTS FOR (s:Screen) ON (s.inches)",
+    "CREATE RANGE INDEX price_amount_index IF NOT EXISTS FOR (pr:Price) ON (pr.amount)",
+]
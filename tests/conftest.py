@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# Các module nằm phẳng ở thư mục gốc của repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Catalog nhỏ theo cột của CSV; "Galaxy S24 128GB" lặp lại với thông số khác ở dòng cuối
+CATALOG_ROWS = [
+    ("Apple", "iPhone 15 128GB", "171g", "6GB", "12MP", "48MP", "A16 Bionic", "3,349mAh", "6.1 inches",
+     "PKR 250,000", "INR 79,900", "CNY 5,999", "USD 799", "AED 3,399", "2023"),
+    ("Apple", "iPhone 15 Pro 128GB", "187g", "8GB", "12MP", "48MP", "A17 Pro", "3,274mAh", "6.1 inches",
+     "PKR 350,000", "INR 134,900", "CNY 7,999", "USD 999", "AED 4,299", "2023"),
+    ("Samsung", "Galaxy S24 128GB", "167g", "8GB", "12MP", "50MP", "Exynos 2400", "4,000mAh", "6.2 inches",
+     "PKR 240,000", "INR 79,999", "CNY 5,999", "USD 500", "AED 3,199", "2024"),
+    ("Samsung", "Galaxy A15 128GB", "200g", "4GB", "13MP", "50MP", "Helio G99", "5,000mAh", "6.5 inches",
+     "PKR 55,000", "INR 19,999", "CNY 1,499", "USD 199", "AED 799", "2023"),
+    ("Xiaomi", "Redmi Note 13 128GB", "188g", "8GB", "16MP", "108MP", "Snapdragon 685", "5,000mAh", "6.67 inches",
+     "PKR 60,000", "INR 17,999", "CNY 1,199", "USD 249", "AED 899", "2024"),
+    ("Samsung", "Galaxy S24 128GB", "168g", "12GB", "12MP", "50MP", "Snapdragon 8 Gen 3", "4,000mAh", "6.2 inches",
+     "PKR 260,000", "INR 84,999", "CNY 6,499", "USD 899", "AED 3,499", "2024"),
+]
+CATALOG_COLUMNS = [
+    "Company Name", "Model Name", "Mobile Weight", "RAM", "Front Camera", "Back Camera", "Processor",
+    "Battery Capacity", "Screen Size", "Launched Price (Pakistan)", "Launched Price (India)",
+    "Launched Price (China)", "Launched Price (USA)", "Launched Price (Dubai)", "Launched Year",
+]
+
+@pytest.fixture
+def catalog():
+    """Raw catalog frame, as ``etl.read_csv_data`` returns it"""
+    import pandas as pd
+
+    return pd.DataFrame(CATALOG_ROWS, columns=CATALOG_COLUMNS)
+
+@pytest.fixture
+def catalog_csv(tmp_path, catalog):
+    path = tmp_path / "catalog.csv"
+    catalog.to_csv(path, index=False)
+    return str(path)
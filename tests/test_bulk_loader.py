@@ -0,0 +1,77 @@
+"""bulk_loader sends constant parameterized UNWIND statements, one row per model"""
+import pytest
+
+import bulk_loader
+from bulk_loader import MERGE_MODELS_QUERY, build_merge_query, iter_batches, load_catalog, merge_queries
+from etl import clean_frame, column_mapping, first_row_per_model
+
+class RecordingSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.driver.queries.append((query, params))
+        return self
+
+    def consume(self):
+        return None
+
+    def execute_write(self, fn, *args):
+        return fn(self, *args)
+
+class RecordingDriver:
+    def __init__(self):
+        self.queries = []
+
+    def session(self, **kwargs):
+        return RecordingSession(self)
+
+def test_merge_queries_keep_values_in_parameters():
+    for column in column_mapping:
+        query = build_merge_query(column)
+        assert query.startswith("UNWIND $rows AS row MATCH (m:Model {name: row.model}) MERGE (t:")
+    assert "(t:Camera {name: row.value, type: 'Front'})" in build_merge_query('Front Camera')
+    assert "(t:Price {value: row.value, country: 'India'})" in build_merge_query('Launched Price (India)')
+    assert build_merge_query('RAM').endswith("SET t += row.props")
+    assert "SET" not in build_merge_query('Processor')
+
+def test_batches_carry_typed_values(catalog):
+    df = first_row_per_model(clean_frame(catalog))
+    batches = list(iter_batches(df, 2))
+    assert [len(models) for models, _ in batches] == [2, 2, 1]
+    models, rows_by_column = batches[0]
+    assert models == [{"model": "iPhone 15 128GB"}, {"model": "iPhone 15 Pro 128GB"}]
+    assert rows_by_column['Launched Year'][0]["value"] == 2023
+    assert rows_by_column['RAM'][0] == {"model": "iPhone 15 128GB", "value": "6GB", "props": {"gb": 6}}
+    assert "props" not in rows_by_column['Processor'][0]
+
+def test_load_sends_each_model_once_with_its_first_row(monkeypatch, catalog):
+    monkeypatch.setattr(bulk_loader, "refresh_similarities", lambda driver: {"refreshed": 5, "seconds": 0.0})
+    monkeypatch.setattr(bulk_loader, "bump_catalog_version", lambda tx: 7)
+    driver = RecordingDriver()
+    stats = load_catalog(driver, catalog, batch_size=2)
+    assert (stats["rows"], stats["version"]) == (5, 7)
+
+    sent = [row["model"] for query, params in driver.queries if query == MERGE_MODELS_QUERY for row in params["rows"]]
+    assert sorted(sent) == sorted(set(sent)) and len(sent) == 5
+    ram = [(row["model"], row["value"]) for query, params in driver.queries
+           if query == merge_queries['RAM'] for row in params["rows"]]
+    assert ("Galaxy S24 128GB", "8GB") in ram and ("Galaxy S24 128GB", "12GB") not in ram
+    assert stats["relationships"] == sum(len(params["rows"]) for query, params in driver.queries
+                                         if query in merge_queries.values())
+
+@pytest.mark.parametrize("batch_size", [1, 2, 500])
+def test_query_text_does_not_depend_on_the_data(monkeypatch, catalog, batch_size):
+    monkeypatch.setattr(bulk_loader, "refresh_similarities", lambda driver: {"refreshed": 5, "seconds": 0.0})
+    monkeypatch.setattr(bulk_loader, "bump_catalog_version", lambda tx: 1)
+    driver = RecordingDriver()
+    load_catalog(driver, catalog, batch_size=batch_size)
+    statements = {query for query, params in driver.queries if "rows" in params}
+    assert statements <= {MERGE_MODELS_QUERY, *merge_queries.values()}
+    assert not any(model in query for query, _ in driver.queries for model in catalog['Model Name'])
@@ -0,0 +1,63 @@
+"""CatalogSnapshot reads back the cleaned CSV, follows the duplicate-model rule and survives rebuilds"""
+import json
+import os
+
+import pytest
+
+from catalog_snapshot import MANIFEST_FILE, CatalogSnapshot, build_snapshot, load_snapshot
+from etl import clean_frame, first_row_per_model, read_csv_data
+from extract_entities import extract_unique_entities
+
+@pytest.fixture
+def snapshot_dir(catalog_csv, tmp_path):
+    path = str(tmp_path / "snapshot")
+    build_snapshot(catalog_csv, path)
+    return path
+
+def test_round_trips_the_cleaned_frame(snapshot_dir, catalog_csv):
+    snapshot = CatalogSnapshot.open(snapshot_dir)
+    expected = clean_frame(read_csv_data(catalog_csv))
+    assert len(snapshot) == len(expected)
+    assert snapshot.to_frame().equals(expected.reset_index(drop=True))
+
+def test_numeric_properties_are_parsed_per_row(snapshot_dir):
+    snapshot = CatalogSnapshot.open(snapshot_dir)
+    assert snapshot.numeric('RAM', 'gb').tolist() == [6, 8, 8, 4, 8, 12]
+    assert snapshot.numeric('RAM', 'mah') is None
+
+def test_first_rows_and_entities_follow_the_loaders(snapshot_dir, catalog_csv):
+    snapshot = CatalogSnapshot.open(snapshot_dir)
+    df = clean_frame(read_csv_data(catalog_csv))
+    assert snapshot.first_rows().tolist() == first_row_per_model(df).index.tolist()
+    assert snapshot.entities() == extract_unique_entities(catalog_csv)
+    rows = list(snapshot.iter_rows(['Model Name', 'RAM'], first_per_model=True))
+    assert ("Galaxy S24 128GB", "8GB") in rows and ("Galaxy S24 128GB", "12GB") not in rows
+
+def test_stale_snapshot_is_not_loaded(snapshot_dir, catalog_csv):
+    assert load_snapshot(snapshot_dir, catalog_csv) is not None
+    with open(catalog_csv, "a", encoding="utf-8") as f:
+        f.write("Google,Pixel 8 128GB,187g,8GB,10.5MP,50MP,Tensor G3,4575mAh,6.2 inches,"
+                "PKR 180000,INR 75999,CNY 4999,USD 699,AED 2899,2023\n")
+    assert not CatalogSnapshot.open(snapshot_dir).matches(catalog_csv)
+    assert load_snapshot(snapshot_dir, catalog_csv) is None
+
+def test_rebuild_keeps_the_build_an_open_snapshot_reads(snapshot_dir, catalog_csv):
+    opened = CatalogSnapshot.open(snapshot_dir)
+    build_snapshot(catalog_csv, snapshot_dir)
+    assert os.path.isdir(opened.build_path)
+    assert opened.values('Model Name') == CatalogSnapshot.open(snapshot_dir).values('Model Name')
+
+    build_snapshot(catalog_csv, snapshot_dir)
+    builds = [name for name in os.listdir(snapshot_dir) if name.startswith("build-")]
+    assert len(builds) == 2 and not os.path.exists(opened.build_path)
+
+def test_unknown_format_is_rejected(snapshot_dir):
+    manifest_file = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(manifest_file, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["format"] = 1
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError):
+        CatalogSnapshot.open(snapshot_dir)
+    assert load_snapshot(snapshot_dir) is None
@@ -0,0 +1,102 @@
+"""chat() runs each stage once: one graph execution per question, no LLM call when it repeats"""
+import pytest
+
+import langgraph_rag as rag
+from benchmarks.bench_chat import StubDriver, StubLLM, StubSession
+from intent_router import IntentRouter
+from translation_cache import TranslationCache
+
+LLM_QUESTION = "Điện thoại nào có camera sau 50MP?"
+TEMPLATE_QUESTION = "Samsung phones"
+
+class CountingSession(StubSession):
+    def run(self, query, params=None):
+        self.driver.queries.append(query)
+        return super().run(query, params)
+
+    def _rows(self, query):
+        if "CatalogVersion" in query:
+            return [{"version": 1}]
+        return [{"model": f"Phone {i}"} for i in range(3)]
+
+class CountingDriver(StubDriver):
+    """Stub driver that records every query sent through ``session.run``"""
+
+    def __init__(self):
+        super().__init__(latency_ms=0)
+        self.queries = []
+
+    def session(self, **kwargs):
+        return CountingSession(self)
+
+    def executions(self):
+        # EXPLAIN của cypher_guard và đọc version của result_cache không phải lần chạy truy vấn
+        return [q for q in self.queries if not q.lstrip().upper().startswith("EXPLAIN") and "CatalogVersion" not in q]
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    from langchain_core.prompts import PromptTemplate
+
+    llm = StubLLM(latency_ms=0)
+    driver = CountingDriver()
+    monkeypatch.setattr(rag, "GRAPH_BACKEND", "neo4j")
+    monkeypatch.setattr(rag, "NEO4J_URL", "bolt://stub")
+    monkeypatch.setattr(rag, "llm", llm)
+    monkeypatch.setattr(rag, "driver", driver)
+    monkeypatch.setattr(rag, "cypher_prompt_template", PromptTemplate.from_template(rag.CYPHER_PROMPT))
+    monkeypatch.setattr(rag, "intent_router", IntentRouter({"Company Name": {"Samsung"}, "Model Name": {"Galaxy S24 128GB"}}))
+    monkeypatch.setattr(rag, "translation_cache", TranslationCache())
+    rag.result_cache.clear()
+    rag.cypher_guard.clear()
+    yield llm, driver
+    rag.result_cache.clear()
+    rag.cypher_guard.clear()
+
+def test_translated_question_executes_once(pipeline):
+    llm, driver = pipeline
+    answer = rag.chat(LLM_QUESTION)
+    assert "Phone 0" in answer
+    assert llm.calls == 1
+    assert len(driver.executions()) == 1
+
+def test_repeated_question_skips_llm_and_database(pipeline):
+    llm, driver = pipeline
+    first = rag.chat(LLM_QUESTION)
+    second = rag.chat(LLM_QUESTION)
+    assert second == first
+    assert llm.calls == 1
+    assert len(driver.executions()) == 1
+
+def test_routed_question_executes_once_without_llm(pipeline):
+    llm, driver = pipeline
+    answer = rag.chat(TEMPLATE_QUESTION)
+    assert "Phone 0" in answer
+    assert llm.calls == 0
+    executions = driver.executions()
+    assert len(executions) == 1
+    assert executions[0] == rag.route_question(TEMPLATE_QUESTION).cypher
+
+def test_stage_timings_are_recorded(pipeline):
+    trace = rag.tracer.start(LLM_QUESTION)
+    rag.chat(LLM_QUESTION, trace=trace)
+    assert {"route", "translate", "validate", "execute", "format"} <= set(trace.timings())
+
+def test_raw_cypher_mode_refuses_writes(pipeline):
+    import asyncio
+
+    _, driver = pipeline
+
+    async def collect():
+        return [chunk async for chunk in rag.achat_neo4j_stream("MATCH (n) DETACH DELETE n")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == 1 and chunks[0].startswith("🛡️")
+    assert rag.chat_neo4j("CREATE (:Model {name: 'x'})").startswith("🛡️")
+    assert driver.executions() == []
+
+def test_raw_cypher_mode_runs_guarded_query(pipeline):
+    _, driver = pipeline
+    answer = rag.chat_neo4j("MATCH (m:Model) RETURN m.name AS model")
+    assert "Phone 0" in answer
+    executions = driver.executions()
+    assert len(executions) == 1 and "LIMIT" in executions[0]
@@ -0,0 +1,92 @@
+"""CypherGuard: write/procedure rejection, LIMIT rewrites and EXPLAIN-based cost checks"""
+import threading
+import time
+
+import pytest
+
+from cypher_guard import CypherGuard, enforce_limit, static_violation
+
+@pytest.mark.parametrize("cypher_query", [
+    "MATCH (n) DETACH DELETE n",
+    "MATCH (m:Model) SET m.name = 'x' RETURN m",
+    "CREATE (:Model {name: 'x'})",
+    "MERGE (m:Model {name: 'x'}) RETURN m",
+    "LOAD CSV FROM 'file:///x.csv' AS row RETURN row",
+    "CALL dbms.killQuery('1')",
+    "CALL apoc.periodic.iterate('MATCH (n) RETURN n', 'DELETE n', {})",
+    "MATCH (m) RETURN m; MATCH (n) DETACH DELETE n",
+])
+def test_rejects_writes_unknown_procedures_and_multiple_statements(cypher_query):
+    assert static_violation(cypher_query) is not None
+    verdict = CypherGuard().check(cypher_query)
+    assert not verdict.ok and verdict.reason
+
+@pytest.mark.parametrize("cypher_query", [
+    "MATCH (m:Model {name: 'Delete Set Create'}) RETURN m.name",
+    "MATCH (m:Model) WHERE m.`set` = 1 RETURN m.set, m.create",
+    "CALL db.labels() YIELD label RETURN label",
+])
+def test_keywords_inside_literals_and_read_procedures_are_allowed(cypher_query):
+    assert static_violation(cypher_query) is None
+
+def test_adds_limit_and_lowers_large_limits():
+    assert enforce_limit("MATCH (m:Model) RETURN m.name", 50) == "MATCH (m:Model) RETURN m.name LIMIT 50"
+    assert enforce_limit("MATCH (m:Model) RETURN m.name LIMIT 1000;", 50) == "MATCH (m:Model) RETURN m.name LIMIT 50"
+    assert enforce_limit("MATCH (m:Model) RETURN m.name LIMIT 5", 50) == "MATCH (m:Model) RETURN m.name LIMIT 5"
+
+def test_limit_rewrite_covers_every_union_branch():
+    rewritten = enforce_limit(
+        "MATCH (m:Model) RETURN m.name AS name UNION MATCH (c:Company) RETURN c.name AS name LIMIT 500", 50
+    )
+    assert rewritten == (
+        "MATCH (m:Model) RETURN m.name AS name LIMIT 50 UNION MATCH (c:Company) RETURN c.name AS name LIMIT 50"
+    )
+
+def test_limit_rewrite_skips_return_inside_call_subquery():
+    cypher_query = "CALL { MATCH (m:Model) RETURN m } RETURN m.name"
+    assert enforce_limit(cypher_query, 50) == "CALL { MATCH (m:Model) RETURN m } RETURN m.name LIMIT 50"
+    inner_only = "MATCH (c:Company) CALL { WITH c MATCH (c)<--(m) RETURN m LIMIT 3 } WITH c, m WHERE m IS NOT NULL RETURN c"
+    assert enforce_limit(inner_only, 50).endswith("RETURN m LIMIT 3 } WITH c, m WHERE m IS NOT NULL RETURN c LIMIT 50")
+
+def plan(operator, rows, *children):
+    return {"operatorType": operator, "arguments": {"EstimatedRows": rows}, "children": list(children)}
+
+def test_explain_estimates_refuse_expensive_plans():
+    guard = CypherGuard(explain=lambda q: plan("ProduceResults", 10, plan("CartesianProduct", 5000)))
+    verdict = guard.check("MATCH (a:Model), (b:Model) RETURN a, b")
+    assert not verdict.ok and "cartesian" in verdict.reason
+    guard = CypherGuard(explain=lambda q: plan("ProduceResults", 10, plan("AllNodesScan", 10 ** 6)))
+    assert not guard.check("MATCH (n) RETURN n").ok
+    guard = CypherGuard(explain=lambda q: plan("ProduceResults", 10, plan("NodeIndexSeek", 10)))
+    verdict = guard.check("MATCH (m:Model {name: 'x'}) RETURN m")
+    assert verdict.ok and verdict.estimated_rows == 10 and verdict.rewritten
+
+def test_verdicts_are_cached_and_concurrent_checks_share_one_explain():
+    explained = []
+
+    def explain(cypher_query):
+        explained.append(cypher_query)
+        time.sleep(0.05)
+        return plan("ProduceResults", 1)
+
+    guard = CypherGuard(explain=explain)
+    threads = [threading.Thread(target=guard.check, args=("MATCH (m:Model) RETURN m.name",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    guard.check("MATCH (m:Model)\n  RETURN m.name;")
+    assert len(explained) == 1
+    assert guard.stats()["checked"] == 9
+
+def test_failed_explain_is_refused_and_not_cached():
+    calls = []
+
+    def explain(cypher_query):
+        calls.append(cypher_query)
+        raise RuntimeError("syntax error")
+
+    guard = CypherGuard(explain=explain)
+    assert not guard.check("MATCH (m) RETURN m").ok
+    assert not guard.check("MATCH (m) RETURN m").ok
+    assert len(calls) == 2
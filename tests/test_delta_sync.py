@@ -0,0 +1,118 @@
+"""delta_sync writes only models whose row changed and saves the manifest only after a successful sync"""
+import json
+
+import pytest
+
+import delta_sync
+from bulk_loader import MERGE_MODELS_QUERY
+from delta_sync import DELETE_MODELS_QUERY, DELETE_RELATIONSHIPS_QUERY, sync_catalog
+
+class RecordingTx:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **params):
+        if self.driver.fail_on is not None and self.driver.fail_on in query:
+            raise RuntimeError("write failed")
+        self.driver.writes.append((query, params))
+        return self
+
+    def consume(self):
+        return None
+
+class RecordingSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return RecordingTx(self.driver)
+
+    def execute_write(self, fn, *args):
+        return fn(RecordingTx(self.driver), *args)
+
+class RecordingDriver:
+    """Fake driver that keeps every query sent in a write transaction"""
+
+    def __init__(self, fail_on=None):
+        self.writes = []
+        self.fail_on = fail_on
+
+    def session(self, **kwargs):
+        return RecordingSession(self)
+
+    def names(self, query):
+        """Model names sent with ``query``"""
+        names = []
+        for sent, params in self.writes:
+            if sent == query:
+                names += params.get("names") or [row["model"] for row in params.get("rows", [])]
+        return sorted(names)
+
+@pytest.fixture
+def synced(monkeypatch, tmp_path, catalog):
+    refreshed = []
+    monkeypatch.setattr(delta_sync, "refresh_similarities",
+                        lambda driver, names: refreshed.append(sorted(names)) or {"refreshed": len(names)})
+    monkeypatch.setattr(delta_sync, "bump_catalog_version", lambda tx: 1)
+    manifest_path = str(tmp_path / "manifest.json")
+    sync_catalog(RecordingDriver(), catalog, manifest_path)
+    refreshed.clear()
+    return manifest_path, refreshed
+
+def test_first_sync_inserts_every_model_once(synced):
+    manifest_path, _ = synced
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["version"] == 1
+    assert len(manifest["models"]) == 5
+
+def test_only_changed_models_are_rewritten(synced, catalog):
+    manifest_path, refreshed = synced
+    catalog.loc[catalog['Model Name'] == "Galaxy A15 128GB", 'RAM'] = "6GB"
+    catalog = catalog[catalog['Model Name'] != "iPhone 15 128GB"]
+    driver = RecordingDriver()
+    stats = sync_catalog(driver, catalog, manifest_path)
+
+    assert (stats["inserted"], stats["changed"], stats["deleted"]) == (0, 1, 1)
+    assert driver.names(MERGE_MODELS_QUERY) == ["Galaxy A15 128GB"]
+    assert driver.names(DELETE_RELATIONSHIPS_QUERY) == ["Galaxy A15 128GB"]
+    assert driver.names(DELETE_MODELS_QUERY) == ["iPhone 15 128GB"]
+    assert refreshed == [["Galaxy A15 128GB", "iPhone 15 128GB"]]
+
+def test_later_duplicate_rows_are_not_changes(synced, catalog):
+    manifest_path, _ = synced
+    catalog.loc[catalog.index[-1], 'RAM'] = "16GB"
+    driver = RecordingDriver()
+    stats = sync_catalog(driver, catalog, manifest_path)
+    assert (stats["inserted"], stats["changed"], stats["deleted"]) == (0, 0, 0)
+    assert driver.writes == []
+
+def test_manifest_is_kept_when_the_write_fails(synced, catalog):
+    manifest_path, _ = synced
+    with open(manifest_path, encoding="utf-8") as f:
+        before = f.read()
+    catalog.loc[catalog['Model Name'] == "Galaxy A15 128GB", 'RAM'] = "6GB"
+
+    with pytest.raises(RuntimeError):
+        sync_catalog(RecordingDriver(fail_on=MERGE_MODELS_QUERY), catalog, manifest_path)
+    with open(manifest_path, encoding="utf-8") as f:
+        assert f.read() == before
+
+    # Lần chạy sau vẫn thấy model đó là đã đổi
+    driver = RecordingDriver()
+    assert sync_catalog(driver, catalog, manifest_path)["changed"] == 1
+    assert driver.names(MERGE_MODELS_QUERY) == ["Galaxy A15 128GB"]
+
+def test_dry_run_writes_nothing(synced, catalog):
+    manifest_path, _ = synced
+    catalog.loc[catalog['Model Name'] == "Galaxy A15 128GB", 'RAM'] = "6GB"
+    driver = RecordingDriver()
+    assert sync_catalog(driver, catalog, manifest_path, dry_run=True)["changed"] == 1
+    assert driver.writes == []
+    assert sync_catalog(RecordingDriver(), catalog, manifest_path)["changed"] == 1
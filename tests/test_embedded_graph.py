@@ -0,0 +1,50 @@
+"""EmbeddedGraph answers router constraints like the Neo4j templates, from a CSV or a snapshot"""
+import pytest
+
+from embedded_graph import EmbeddedGraph
+
+@pytest.fixture
+def graph(catalog):
+    return EmbeddedGraph.from_frame(catalog)
+
+def test_equality_constraints_intersect(graph):
+    assert graph.query({"company": "Samsung", "ram": "8GB"}) == [
+        {"model": "Galaxy S24 128GB", "company": "Samsung", "ram": "8GB"},
+    ]
+    assert graph.query({"company": "Samsung", "ram": "6GB"}) == []
+
+def test_range_bounds_follow_the_operator(graph):
+    inclusive = graph.query({"price": {"<=": 500}, "country": "USA"})
+    exclusive = graph.query({"price": {"<": 500}, "country": "USA"})
+    assert {r["model"] for r in inclusive} - {r["model"] for r in exclusive} == {"Galaxy S24 128GB"}
+    assert [r["model"] for r in graph.query({"battery": {">=": 4000, "<": 5000}})] == ["Galaxy S24 128GB"]
+    assert [r["model"] for r in graph.query({"year": {">": 2023}})] == ["Galaxy S24 128GB", "Redmi Note 13 128GB"]
+
+def test_price_ranges_use_the_asked_country(graph):
+    records = graph.query({"price": {"<": 20000}, "country": "India"})
+    assert [(r["model"], r["price"]) for r in records] == [("Galaxy A15 128GB", "INR 19,999"), ("Redmi Note 13 128GB", "INR 17,999")]
+
+def test_duplicated_model_keeps_its_first_row(graph):
+    assert len(graph) == 5
+    details = graph.details("Galaxy S24 128GB")[0]
+    assert (details["ram"], details["processor"], details["price_usa"]) == ("8GB", "Exynos 2400", "USD 500")
+    assert graph.query({"ram": "12GB"}) == []
+
+def test_details_and_limit(graph):
+    assert graph.details("Galaxy S99") == []
+    assert [r["model"] for r in graph.query({"models": ["Galaxy A15 128GB", "Galaxy S99"]})] == ["Galaxy A15 128GB"]
+    assert len(graph.query({}, limit=2)) == 2
+
+def test_cheaper_similar_phones_cost_less(graph):
+    records = graph.similar("iPhone 15 128GB", cheaper=True)
+    assert records and all(r["price_ratio"] < 1 for r in records)
+    assert "iPhone 15 Pro 128GB" not in {r["model"] for r in records}
+
+def test_snapshot_builds_the_same_graph(graph, catalog_csv, tmp_path):
+    from catalog_snapshot import CatalogSnapshot, build_snapshot
+
+    build_snapshot(catalog_csv, str(tmp_path / "snapshot"))
+    from_snapshot = EmbeddedGraph.from_snapshot(CatalogSnapshot.open(str(tmp_path / "snapshot")))
+    assert from_snapshot.models == graph.models
+    assert dict(from_snapshot.adjacency) == dict(graph.adjacency)
+    assert from_snapshot.entities() == graph.entities()
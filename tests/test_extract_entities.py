@@ -0,0 +1,16 @@
+"""Entity script MERGEs only on the constrained key and SETs the typed numeric properties"""
+from extract_entities import generate_cypher_queries
+
+def test_numeric_properties_are_set_not_merged():
+    entities = {
+        'Company Name': set(), 'Model Name': set(), 'Processor': set(),
+        'Front Camera': set(), 'Back Camera': set(), 'RAM': {'8GB'},
+        'Battery Capacity': {'5,000mAh'}, 'Screen Size': set(),
+        'Launched Price (Pakistan)': set(), 'Launched Price (India)': set(),
+        'Launched Price (China)': set(), 'Launched Price (USA)': {'USD 799'},
+        'Launched Price (Dubai)': set(), 'Launched Year': set(), 'Mobile Weight': set(),
+    }
+    queries = generate_cypher_queries(entities)
+    assert "MERGE (r:RAM {size: '8GB'}) SET r += {gb: 8};" in queries
+    assert "MERGE (b:Battery {capacity: '5,000mAh'}) SET b += {mah: 5000};" in queries
+    assert any(q.startswith("MERGE (pr:Price {value: 'USD 799', country: 'USA'}) SET pr += {") for q in queries)
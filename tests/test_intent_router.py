@@ -0,0 +1,63 @@
+"""IntentRouter: template routing, comparator words, and questions that must fall through to the LLM"""
+import pytest
+
+from intent_router import IntentRouter
+
+@pytest.fixture(scope="module")
+def router():
+    from conftest import CATALOG_COLUMNS, CATALOG_ROWS
+
+    return IntentRouter({column: {row[i] for row in CATALOG_ROWS} for i, column in enumerate(CATALOG_COLUMNS)})
+
+def test_routes_equality_questions_to_templates(router):
+    routed = router.route("Điện thoại Samsung nào có RAM 8GB?")
+    assert routed.name == "find_by_company_and_ram"
+    assert routed.params["company"] == "Samsung" and routed.params["ram"] == "8GB"
+    assert router.route("Apple phones launched in 2023").params["year"] == 2023
+
+@pytest.mark.parametrize("question, constraint", [
+    ("Phones with battery above 4000mAh", ("battery", {">": 4000.0})),
+    ("Phones with battery at least 4000mAh", ("battery", {">=": 4000.0})),
+    ("Điện thoại nào có pin từ 4000mAh", ("battery", {">=": 4000.0})),
+    ("pin trên 4000mAh", ("battery", {">": 4000.0})),
+    ("giá dưới USD 500", ("price", {"<": 500})),
+    ("giá không quá USD 500", ("price", {"<=": 500})),
+    ("nặng dưới 180g", ("weight", {"<": 180.0})),
+    ("màn hình lớn hơn 6.5 inches", ("screen", {">": 6.5})),
+    ("ra mắt sau 2023", ("year", {">": 2023})),
+])
+def test_comparator_words_map_to_operators(router, question, constraint):
+    attribute, ranges = constraint
+    assert router.extract(question)[attribute] == ranges
+
+def test_range_template_uses_the_comparator(router):
+    assert "b.mah >= $battery_min" in router.route("Phones with battery at least 4000mAh").cypher
+    assert "b.mah > $battery_min" in router.route("Phones with battery above 4000mAh").cypher
+
+@pytest.mark.parametrize("question", [
+    "Điện thoại không phải Samsung có RAM 8GB",
+    "Phones not from Apple with 8GB RAM",
+    "Phones with RAM 8GB except Samsung",
+    "Apple phones not under USD 900",
+    "Điện thoại Samsung nào rẻ nhất?",
+    "Có bao nhiêu điện thoại Samsung?",
+    "Samsung phones sorted by price",
+    "Samsung hoặc Apple RAM 8GB",
+    "Điện thoại Apple và Samsung RAM 8GB",
+    "Tư vấn điện thoại không phải Samsung chơi game dưới $500",
+])
+def test_negation_counts_ordering_and_several_companies_fall_through(router, question):
+    assert router.route(question) is None
+
+@pytest.mark.parametrize("question", [
+    "Điện thoại Samsung nào có RAM 3GB?",
+    "Điện thoại Nokia nào có RAM 8GB?",
+    "Pixel phones with 8GB RAM",
+    "recommend a gaming phone from Oppo under USD 500",
+])
+def test_values_and_brands_missing_from_the_catalog_fall_through(router, question):
+    assert router.route(question) is None
+
+def test_product_lines_resolve_to_their_company(router):
+    assert router.route("Galaxy phones with RAM 8GB").params["company"] == "Samsung"
+    assert router.route("Redmi phones with RAM 8GB").params["company"] == "Xiaomi"
@@ -0,0 +1,55 @@
+"""NameIndex: typo and alias resolution, and storage kept in canonical names only when typed"""
+import pytest
+
+from name_index import NameIndex, edit_distance
+
+MODELS = [
+    "iPhone 15 Pro 128GB", "iPhone 15 Pro 256GB", "iPhone 15 128GB",
+    "Galaxy S24 Ultra 256GB", "Galaxy S24 128GB", "Redmi Note 13 128GB",
+]
+
+@pytest.fixture(scope="module")
+def index():
+    return NameIndex(MODELS, ["Apple", "Samsung", "Xiaomi"])
+
+def test_edit_distance_counts_adjacent_swaps_once():
+    assert edit_distance("iphnoe", "iphone", 2) == 1
+    assert edit_distance("galaxy", "glaxy", 2) == 1
+    assert edit_distance("redmi", "xiaomi", 1) == 2
+
+@pytest.mark.parametrize("typed, name", [
+    ("iphone 15 pro", "iPhone 15 Pro 128GB"),
+    ("iphnoe 15 pro", "iPhone 15 Pro 128GB"),
+    ("ip 15 pro 256gb", "iPhone 15 Pro 256GB"),
+    ("ip 15 pro 256 gb", "iPhone 15 Pro 256GB"),
+    ("glaxy s24", "Galaxy S24 128GB"),
+    ("galaxy s24 ultra", "Galaxy S24 Ultra 256GB"),
+    ("rn 13", "Redmi Note 13 128GB"),
+])
+def test_resolves_typos_and_aliases(index, typed, name):
+    assert index.resolve(typed) == name
+
+def test_unknown_names_do_not_resolve(index):
+    assert index.resolve("pixel 8") is None
+    assert index.resolve("iphone 99") is None
+
+def test_resolves_companies(index):
+    assert index.resolve_company("samsng") == "Samsung"
+    assert index.resolve_company("ss") == "Samsung"
+    assert index.resolve_company("galaxy s24") is None
+
+@pytest.mark.parametrize("question, canonical", [
+    ("Giá ip 15 pro bao nhiêu", "Giá iPhone 15 Pro bao nhiêu"),
+    ("Giá ip 15 pro 256gb", "Giá iPhone 15 Pro 256GB"),
+    ("iphnoe 15 giá USA", "iPhone 15 giá USA"),
+    ("ip 15 pro 512gb giá", "iPhone 15 Pro 512gb giá"),
+    ("Điện thoại ss nào rẻ", "Điện thoại Samsung nào rẻ"),
+])
+def test_canonicalize_keeps_storage_only_when_typed(index, question, canonical):
+    assert index.canonicalize(question)[0] == canonical
+
+def test_mentions_report_kind_and_span(index):
+    question = "So sánh rn 13 với ss"
+    mentions = index.find_mentions(question)
+    assert [(m.kind, m.name) for m in mentions] == [("model", "Redmi Note 13 128GB"), ("company", "Samsung")]
+    assert [question[m.start:m.end] for m in mentions] == ["rn 13", "ss"]
@@ -0,0 +1,59 @@
+"""Recommender: use-case ranking, strict vs inclusive budgets and the duplicate-model rule"""
+import pytest
+
+from delta_sync import fingerprint_rows
+from embedded_graph import EmbeddedGraph
+from etl import clean_frame, first_row_per_model
+from intent_router import IntentRouter
+from recommender import Recommender
+
+@pytest.fixture
+def engine(catalog):
+    return Recommender.from_frame(catalog)
+
+def models(results):
+    return [record["model"] for record in results]
+
+def test_one_row_per_model_first_row_wins(engine):
+    assert len(engine) == 5
+    (galaxy,) = [i for i, name in enumerate(engine.models) if name == "Galaxy S24 128GB"]
+    assert engine.specs["ram"][galaxy] == "8GB"
+
+def test_strict_budget_excludes_the_limit(engine):
+    strict = models(engine.recommend(["all_round"], "USA", price={"<": 500}, k=10))
+    inclusive = models(engine.recommend(["all_round"], "USA", price={"<=": 500}, k=10))
+    assert "Galaxy S24 128GB" not in strict
+    assert "Galaxy S24 128GB" in inclusive
+    assert set(strict) == {"Galaxy A15 128GB", "Redmi Note 13 128GB"}
+
+def test_price_range_and_company(engine):
+    results = engine.recommend(["gaming"], "USA", price={">=": 500, "<=": 999}, company="apple", k=10)
+    assert models(results) == ["iPhone 15 Pro 128GB", "iPhone 15 128GB"]
+    assert all("price_usa" in record and "processor" in record for record in results)
+
+def test_use_case_changes_the_ranking(engine):
+    assert models(engine.recommend(["photography"], k=1)) == ["Redmi Note 13 128GB"]
+    assert models(engine.recommend(["gaming"], k=1)) == ["Galaxy S24 128GB"]
+    assert models(engine.recommend(["budget"], k=2)) == ["Redmi Note 13 128GB", "Galaxy A15 128GB"]
+
+@pytest.mark.parametrize("question, expected", [
+    ("Tư vấn điện thoại chơi game dưới $500", False),
+    ("recommend a gaming phone under USD 500", False),
+    ("gaming phone at most USD 500", True),
+])
+def test_routed_budget_keeps_its_comparator(engine, catalog, question, expected):
+    router = IntentRouter({column: set(catalog[column]) for column in catalog.columns})
+    routed = router.route(question)
+    assert routed is not None and routed.name == "recommend"
+    assert ("Galaxy S24 128GB" in models(engine.run_routed(routed))) is expected
+
+def test_loaders_agree_on_duplicated_models(catalog, engine):
+    df = clean_frame(catalog)
+    first = first_row_per_model(df)
+    galaxy = first[first["Model Name"] == "Galaxy S24 128GB"].iloc[0]
+    assert galaxy["RAM"] == "8GB"
+    # Fingerprint của model lặp lại là của dòng đầu tiên, như khi bỏ dòng cuối
+    assert fingerprint_rows(df) == fingerprint_rows(df.iloc[:-1])
+    graph = EmbeddedGraph.from_frame(catalog)
+    assert graph.models == list(engine.models)
+    assert "12GB" not in graph.values["RAM"]
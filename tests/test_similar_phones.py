@@ -0,0 +1,109 @@
+"""SimilarityIndex scores and the incremental SIMILAR_TO refresh, with its fallback to a full refresh"""
+import numpy as np
+import pytest
+
+from embedded_graph import EmbeddedGraph
+from model_specs import CATALOG_SPECS_QUERY
+from similar_phones import (READ_SIMILAR_QUERY, READ_SIMILAR_SCALE_QUERY, WRITE_SIMILAR_QUERY, WRITE_SIMILAR_SCALE_QUERY,
+                            SimilarityIndex, refresh_similarities)
+
+K = 2
+
+def spec_records(catalog):
+    graph = EmbeddedGraph.from_frame(catalog)
+    return [graph.details(name)[0] for name in graph.models]
+
+def stored(index, k=K):
+    """``read_similarities`` of a graph where every model holds its current top-k"""
+    return {model: ([n.model for n in nearest], min(n.score for n in nearest))
+            for model, nearest in index.top_k(k=k).items()}
+
+class Record(dict):
+    def data(self):
+        return dict(self)
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.driver.queries.append((query, params))
+        if query == CATALOG_SPECS_QUERY:
+            return FakeResult(Record(record) for record in self.driver.records)
+        if query == READ_SIMILAR_SCALE_QUERY:
+            return FakeResult([] if self.driver.scale is None else [{"scale": self.driver.scale}])
+        if query == READ_SIMILAR_QUERY:
+            return FakeResult({"model": model, "neighbours": neighbours, "floor": floor}
+                              for model, (neighbours, floor) in self.driver.similar.items())
+        return FakeResult()
+
+    def execute_write(self, fn, *args):
+        return fn(self, *args)
+
+class FakeDriver:
+    def __init__(self, records, scale=None, similar=None):
+        self.records = records
+        self.scale = scale
+        self.similar = similar or {}
+        self.queries = []
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def written(self):
+        return {row["model"] for query, params in self.queries if query == WRITE_SIMILAR_QUERY for row in params["rows"]}
+
+@pytest.fixture
+def records(catalog):
+    return spec_records(catalog)
+
+def test_scores_are_symmetric_and_top_k_skips_self(records):
+    index = SimilarityIndex(records)
+    scores = index.scores(range(len(index)))
+    assert np.allclose(scores, scores.T)
+    for model, nearest in index.top_k(k=K).items():
+        assert len(nearest) == K and model not in {n.model for n in nearest}
+        assert [n.score for n in nearest] == sorted((n.score for n in nearest), reverse=True)
+
+def test_incremental_refresh_matches_a_full_recompute(catalog):
+    before = SimilarityIndex(spec_records(catalog))
+    current = stored(before)
+    # Đổi hãng không làm lệch thang chuẩn hoá của phần số
+    catalog.loc[catalog['Model Name'] == "Redmi Note 13 128GB", 'Company Name'] = "Samsung"
+    after = SimilarityIndex(spec_records(catalog))
+    assert after.scale == before.scale
+
+    affected = after.affected(["Redmi Note 13 128GB"], current, K)
+    expected = after.top_k(k=K)
+    assert "Redmi Note 13 128GB" in affected and len(affected) < len(after)
+    for model in set(after.models) - affected:
+        assert current[model][0] == [n.model for n in expected[model]]
+
+def test_refresh_writes_only_affected_models_when_the_scale_is_unchanged(records):
+    index = SimilarityIndex(records)
+    current = stored(index)
+    driver = FakeDriver(records, scale=index.scale, similar=current)
+    stats = refresh_similarities(driver, ["Galaxy A15 128GB"], k=K)
+    assert not stats["full"] and stats["refreshed"] < len(index)
+    assert driver.written() == index.affected(["Galaxy A15 128GB"], current, K)
+
+def test_refresh_falls_back_to_full_when_the_scale_changes(records):
+    index = SimilarityIndex(records)
+    driver = FakeDriver(records, scale="stale", similar=stored(index))
+    stats = refresh_similarities(driver, ["Galaxy A15 128GB"], k=K)
+    assert stats["full"] and stats["refreshed"] == len(index)
+    assert driver.written() == set(index.models)
+    assert (WRITE_SIMILAR_SCALE_QUERY, {"scale": index.scale}) in driver.queries
@@ -0,0 +1,120 @@
+"""SingleFlight coalescing and MicroBatcher batching with fake batch calls"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import MicroBatcher, SingleFlight
+
+class SlowBatch:
+    """Batch call that records the batches it receives and echoes its items"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        time.sleep(self.delay)
+        return list(items)
+
+    async def arun(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(self.delay)
+        return list(items)
+
+def run_threads(fn, args):
+    results = [None] * len(args)
+
+    def run(i):
+        results[i] = fn(args[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(args))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_single_flight_runs_concurrent_identical_calls_once():
+    flights = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = run_threads(lambda _: flights.do("key", fetch), range(8))
+    assert [value for value, _ in results] == ["value"] * 8
+    assert len(calls) == 1
+    assert sum(shared for _, shared in results) == 7
+    assert len(flights) == 0
+
+def test_single_flight_shares_errors_and_forgets_settled_keys():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: 1) == (1, False)
+
+def test_lone_submit_is_sent_without_waiting_for_the_window():
+    batch = SlowBatch(delay=0)
+    batcher = MicroBatcher(batch, window=1.0)
+    started = time.perf_counter()
+    assert batcher.submit("a") == "a"
+    assert time.perf_counter() - started < 0.5
+    assert batch.batches == [["a"]]
+
+def test_items_submitted_while_a_batch_runs_are_grouped():
+    batch = SlowBatch(delay=0.1)
+    batcher = MicroBatcher(batch, window=0.05)
+    first = threading.Thread(target=batcher.submit, args=("first",))
+    first.start()
+    time.sleep(0.02)
+    assert run_threads(batcher.submit, ["b", "c", "d"]) == ["b", "c", "d"]
+    first.join()
+    assert batch.batches[0] == ["first"]
+    assert sorted(batch.batches[1]) == ["b", "c", "d"]
+
+def test_window_and_max_size_are_read_at_submit_time():
+    settings = {"window": 0.05, "max_size": 16}
+    batch = SlowBatch(delay=0.1)
+    batcher = MicroBatcher(batch, window=lambda: settings["window"], max_size=lambda: settings["max_size"])
+    settings["window"] = None
+    assert run_threads(batcher.submit, ["a", "b", "c"]) == ["a", "b", "c"]
+    assert sorted(map(len, batch.batches)) == [1, 1, 1]
+
+def test_exception_result_is_raised_to_its_item_only():
+    batcher = MicroBatcher(lambda items: [ValueError(item) if item == "bad" else item for item in items], window=None)
+    assert batcher.submit("good") == "good"
+    with pytest.raises(ValueError):
+        batcher.submit("bad")
+
+def test_async_items_of_one_loop_iteration_share_a_batch():
+    batch = SlowBatch(delay=0.01)
+    batcher = MicroBatcher(batch, batch.arun, window=1.0)
+
+    async def main():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(batcher.asubmit(i) for i in range(5)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    assert results == list(range(5))
+    assert batch.batches == [[0, 1, 2, 3, 4]]
+    assert elapsed < 0.5
+
+def test_async_batch_respects_max_size():
+    batch = SlowBatch(delay=0.01)
+    batcher = MicroBatcher(batch, batch.arun, window=0.01, max_size=2)
+
+    async def main():
+        return await asyncio.gather(*(batcher.asubmit(i) for i in range(5)))
+
+    assert asyncio.run(main()) == list(range(5))
+    assert [len(items) for items in batch.batches] == [2, 2, 1]
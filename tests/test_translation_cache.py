@@ -0,0 +1,110 @@
+"""TranslationCache with a fake LLM: exact hits, misses, near-duplicates and persistence"""
+import threading
+
+import pytest
+
+from translation_cache import TranslationCache
+
+class FakeLLM:
+    """Translates a question to a Cypher string that names it; counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, question):
+        self.calls += 1
+        return f"// {question}\nMATCH (m:Model) RETURN m.name AS model"
+
+@pytest.fixture
+def llm():
+    return FakeLLM()
+
+def test_exact_hit_ignores_case_diacritics_and_filler(llm):
+    cache = TranslationCache()
+    first = cache.get_or_translate("Điện thoại Samsung RAM 8GB", llm)
+    assert cache.get_or_translate("samsung ram 8 gb phones", llm) == first
+    assert llm.calls == 1
+    assert cache.stats()["hits"] == 1
+
+def test_miss_on_different_values_or_company(llm):
+    cache = TranslationCache()
+    cache.get_or_translate("Samsung RAM 8GB", llm)
+    cache.get_or_translate("Samsung RAM 12GB", llm)
+    cache.get_or_translate("Apple RAM 8GB", llm)
+    assert llm.calls == 3
+    assert cache.stats()["misses"] == 3
+
+def test_near_duplicate_reuses_translation(llm):
+    cache = TranslationCache(similarity_threshold=0.75)
+    first = cache.get_or_translate("Samsung phones RAM 8GB launched 2024", llm)
+    assert cache.get_or_translate("Samsung phones RAM 8GB launched in 2024", llm) == first
+    assert llm.calls == 1
+    assert cache.stats()["near_hits"] == 1
+
+@pytest.mark.parametrize("question", [
+    "cheapest Samsung RAM 8GB",
+    "not Samsung RAM 8GB",
+    "Samsung RAM under 8GB",
+    "điện thoại không phải Samsung RAM 8GB",
+    "Samsung RAM 8GB rẻ nhất",
+])
+def test_operator_negation_and_superlative_words_must_match(llm, question):
+    cache = TranslationCache(similarity_threshold=0.75)
+    cache.get_or_translate("Samsung RAM 8GB", llm)
+    assert cache.get(question) is None
+    cache.get_or_translate(question, llm)
+    assert llm.calls == 2
+
+@pytest.mark.parametrize("cached, question", [
+    ("Giá Trung Quốc của Galaxy S24 Ultra 256GB", "Giá Trung Quốc của Galaxy S24 256GB"),
+    ("Thông tin chi tiết iPhone 15 Pro 128GB giá USA", "Thông tin chi tiết iPhone 15 128GB giá USA"),
+])
+def test_model_variant_words_must_match(llm, cached, question):
+    cache = TranslationCache(similarity_threshold=0.75)
+    cache.get_or_translate(cached, llm)
+    assert cache.get(question) is None
+    assert cache.get(cached) is not None
+
+def test_expired_entries_miss(llm):
+    cache = TranslationCache(ttl_seconds=0)
+    cache.get_or_translate("Samsung RAM 8GB", llm)
+    cache.get_or_translate("Samsung RAM 8GB", llm)
+    assert llm.calls == 2
+
+def test_lru_eviction(llm):
+    cache = TranslationCache(max_entries=2)
+    cache.put("Samsung", "a")
+    cache.put("Apple", "b")
+    cache.get("Samsung")
+    cache.put("Xiaomi", "c")
+    assert cache.get("Apple") is None
+    assert cache.get("Samsung") == "a"
+
+def test_persistence_round_trip(tmp_path, llm):
+    path = str(tmp_path / "translations.json")
+    cache = TranslationCache(path=path)
+    first = cache.get_or_translate("Samsung RAM 8GB", llm)
+    reloaded = TranslationCache(path=path)
+    assert reloaded.get_or_translate("samsung ram 8gb", llm) == first
+    assert llm.calls == 1
+
+def test_concurrent_puts_keep_a_valid_file(tmp_path):
+    path = tmp_path / "translations.json"
+    cache = TranslationCache(path=str(path))
+    errors = []
+
+    def put_many(worker):
+        try:
+            for i in range(20):
+                cache.put(f"Samsung RAM {worker * 100 + i}GB", f"q{worker}-{i}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put_many, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert TranslationCache(path=str(path)).stats()["entries"] == 160
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,63 @@
+"""VectorStore: exact-name search, incremental sync, and the saved embedder identity"""
+import pytest
+
+from vector_store import HashingEmbedder, VectorStore, documents_from_csv, make_embedder
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self, dimension=64):
+        super().__init__(dimension)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+@pytest.fixture
+def documents(catalog_csv):
+    return documents_from_csv(catalog_csv)
+
+def test_documents_use_the_first_row_of_each_model(documents):
+    assert len(documents) == 5
+    assert "RAM: 8GB" in documents["Galaxy S24 128GB"] and "12GB" not in documents["Galaxy S24 128GB"]
+
+def test_search_finds_the_named_model(documents):
+    store = VectorStore.build(documents, HashingEmbedder(), batch_size=2)
+    name, text, _ = store.search("Redmi Note 13 128GB", k=1)[0]
+    assert name == "Redmi Note 13 128GB" and text == documents[name]
+
+def test_sync_embeds_only_changed_documents(documents):
+    embedder = CountingEmbedder()
+    store = VectorStore.build(documents, embedder)
+    embedder.embedded.clear()
+    documents = dict(documents)
+    documents["Galaxy A15 128GB"] += ". RAM: 6GB"
+    del documents["iPhone 15 128GB"]
+    assert store.sync(documents) == (1, 1)
+    assert embedder.embedded == [documents["Galaxy A15 128GB"]]
+    assert len(store) == 4 and "iPhone 15 128GB" not in {name for name, _, _ in store.search("iPhone 15", k=5)}
+
+def test_load_uses_the_saved_embedder(documents, tmp_path):
+    built = VectorStore.build(documents, HashingEmbedder(64))
+    built.save(str(tmp_path))
+    store = VectorStore.load(str(tmp_path))
+    assert isinstance(store.embedder, HashingEmbedder) and store.embedder.dimension == 64
+    assert store.search("Galaxy A15 128GB") == built.search("Galaxy A15 128GB")
+
+    # Index chỉ đọc (mmap) được sao chép trước khi sửa
+    store.add({"Pixel 8 128GB": "Model: Pixel 8 128GB. Company Name: Google"})
+    assert len(store) == 6
+
+def test_mismatched_embedder_is_refused(documents, tmp_path):
+    VectorStore.build(documents, HashingEmbedder(64)).save(str(tmp_path))
+    with pytest.raises(ValueError):
+        VectorStore.load(str(tmp_path), embedder=HashingEmbedder(128))
+
+    store = VectorStore.load(str(tmp_path))
+    store.embedder = HashingEmbedder(128)
+    with pytest.raises(ValueError):
+        store.search("Galaxy")
+
+def test_unknown_embedder_name_is_rejected():
+    assert make_embedder("hashing:32").dimension == 32
+    with pytest.raises(ValueError):
+        make_embedder("word2vec")
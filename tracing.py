@@ -0,0 +1,168 @@
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_MAX_TRACES = 200
+DEFAULT_MAX_SAMPLES = 10000
+PERCENTILES = (50, 95, 99)
+
+_trace_ids = itertools.count(1)
+
+class Span:
+    """One timed stage of a request; ``attributes`` holds cache flags, row and token counts"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.attributes: Dict[str, Any] = {}
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration_ms": self.duration_ms, **self.attributes}
+
+class Trace:
+    """Spans of one chat request (route, translate, validate, execute, format, fallback, ...)"""
+
+    def __init__(self, question: str = "", kind: str = "chat"):
+        self.trace_id = next(_trace_ids)
+        self.question = question
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Span] = []
+        self.errors: List[Dict[str, str]] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = Span(name)
+        span.set(**attributes)
+        self.spans.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=repr(e))
+            raise
+        finally:
+            span.end()
+
+    def error(self, stage: str, e: Exception) -> None:
+        self.errors.append({"stage": stage, "error": repr(e)})
+
+    def end(self) -> None:
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def timings(self) -> Dict[str, float]:
+        return {span.name: span.duration_ms for span in self.spans if span.duration_ms is not None}
+
+    def summary(self) -> str:
+        parts = [f"{name}={ms:.1f}ms" for name, ms in self.timings().items()]
+        if self.duration_ms is not None:
+            parts.append(f"total={self.duration_ms:.1f}ms")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "kind": self.kind,
+            "question": self.question,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": [span.to_dict() for span in self.spans],
+            "errors": self.errors,
+        }
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+class Tracer:
+    """Collect finished traces and aggregate per-stage latency percentiles.
+
+    Keeps the last ``max_traces`` traces for inspection and the last
+    ``max_samples`` durations per stage for p50/p95/p99. Boolean span
+    attributes (``translation_cache_hit``, ``result_cache_hit``, ...) are
+    counted and ``*_tokens`` attributes summed into counters.
+    """
+
+    def __init__(self, max_traces: int = DEFAULT_MAX_TRACES, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.traces: deque = deque(maxlen=max_traces)
+        self.max_samples = max_samples
+        self.samples: Dict[str, deque] = {}
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def start(self, question: str = "", kind: str = "chat") -> Trace:
+        return Trace(question, kind)
+
+    def _sample(self, name: str, duration_ms: float) -> None:
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.max_samples)
+        samples.append(duration_ms)
+
+    def finish(self, trace: Trace) -> Trace:
+        if trace.duration_ms is None:
+            trace.end()
+        with self._lock:
+            self.traces.append(trace)
+            self.counters["requests_total"] += 1
+            self.counters["errors_total"] += len(trace.errors)
+            self._sample("total", trace.duration_ms)
+            for span in trace.spans:
+                if span.duration_ms is not None:
+                    self._sample(span.name, span.duration_ms)
+                for key, value in span.attributes.items():
+                    if isinstance(value, bool):
+                        self.counters[f"{key}_total"] += int(value)
+                    elif key.endswith("_tokens") and isinstance(value, (int, float)):
+                        self.counters[f"{key}_total"] += value
+        return trace
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """Stage -> count, mean and p50/p95/p99 in milliseconds"""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+        stats = {}
+        for name, values in samples.items():
+            stats[name] = {"count": len(values), "mean": sum(values) / len(values) if values else 0.0}
+            for p in PERCENTILES:
+                stats[name][f"p{p}"] = percentile(values, p)
+        return stats
+
+    def export_json(self, include_traces: bool = False) -> str:
+        data: Dict[str, Any] = {"stages": self.percentiles(), "counters": dict(self.counters)}
+        if include_traces:
+            data["traces"] = [trace.to_dict() for trace in list(self.traces)]
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def export_prometheus(self, prefix: str = "chat") -> str:
+        """Prometheus text exposition format (summary per stage + counters)"""
+        lines = [
+            f"# HELP {prefix}_stage_latency_ms Latency of each chat pipeline stage in milliseconds.",
+            f"# TYPE {prefix}_stage_latency_ms summary",
+        ]
+        with self._lock:
+            sums = {name: sum(values) for name, values in self.samples.items()}
+        for name, stats in self.percentiles().items():
+            for p in PERCENTILES:
+                lines.append(f'{prefix}_stage_latency_ms{{stage="{name}",quantile="{p / 100}"}} {stats[f"p{p}"]:.3f}')
+            lines.append(f'{prefix}_stage_latency_ms_sum{{stage="{name}"}} {sums.get(name, 0.0):.3f}')
+            lines.append(f'{prefix}_stage_latency_ms_count{{stage="{name}"}} {stats["count"]}')
+        for key, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{key} counter")
+            lines.append(f"{prefix}_{key} {value:g}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Optional
+
+# Những từ không làm thay đổi truy vấn Cypher sinh ra (sau khi đã bỏ dấu)
+FILLER_WORDS = {
+    "dien", "thoai", "dt", "nao", "co", "cua", "la", "cac", "nhung", "mau", "may",
+    "gi", "hay", "cho", "toi", "minh", "xem", "voi", "va", "duoc",
+    "phone", "phones", "smartphone", "smartphones", "mobile", "mobiles",
+    "which", "what", "show", "me", "list", "all", "the", "a", "an", "with",
+    "have", "has", "of", "is", "are", "that", "please",
+}
+
+# Từ so sánh, phủ định, so sánh nhất và sắp xếp: câu thêm/bớt một từ này là câu khác nghĩa
+MEANING_WORDS = {
+    "duoi", "tren", "hon", "nhat", "da", "thieu", "tu", "den", "truoc", "sau", "giua",
+    "re", "dat", "khong", "ko", "chua", "phai", "tru", "ngoai", "hoac", "bao", "nhieu", "dem", "tong",
+    "sap", "xep", "tang", "giam", "dan",
+    "under", "below", "over", "above", "less", "more", "than", "least", "most", "max", "min",
+    "from", "to", "after", "before", "since", "between", "at",
+    "not", "no", "never", "without", "except", "excluding", "other", "or", "isn", "aren", "don", "doesn",
+    "cheaper", "cheapest", "best", "top", "highest", "lowest", "largest", "smallest", "biggest",
+    "newest", "latest", "oldest", "lightest", "heaviest", "count", "many", "average", "total",
+    "sort", "sorted", "order", "rank", "ranked",
+}
+
+# Từ chỉ phiên bản trong tên máy: "Galaxy S24" và "Galaxy S24 Ultra" là hai model khác nhau
+VARIANT_WORDS = {
+    "pro", "ultra", "plus", "max", "mini", "lite", "fe", "note", "edge", "neo", "prime",
+    "fold", "flip", "se", "air", "xl", "turbo", "power", "play",
+}
+
+_UNIT_PATTERN = re.compile(r"(\d)\s+(gb|mb|tb|mah|mp|g|inch|inches)\b")
+_PUNCT_PATTERN = re.compile(r"[^\w\s.,]")
+_TRAILING_PUNCT_PATTERN = re.compile(r"(?<!\d)[.,]|[.,](?!\d)")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip diacritics, glue numbers to units and collapse whitespace"""
+    text = str(text).lower().replace("đ", "d")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _PUNCT_PATTERN.sub(" ", text)
+    text = _TRAILING_PUNCT_PATTERN.sub(" ", text)
+    text = _UNIT_PATTERN.sub(r"\1\2", text)
+    return _SPACE_PATTERN.sub(" ", text).strip()
+
+def question_tokens(text: str) -> FrozenSet[str]:
+    """Content tokens of a question, without filler words"""
+    return frozenset(t for t in normalize_question(text).split() if t not in FILLER_WORDS)
+
+def _value_tokens(tokens: FrozenSet[str]) -> FrozenSet[str]:
+    # Các token chứa số (8gb, 2024, 200,000), MEANING_WORDS và VARIANT_WORDS phải khớp tuyệt đối
+    return frozenset(
+        t for t in tokens if t in MEANING_WORDS or t in VARIANT_WORDS or any(ch.isdigit() for ch in t)
+    )
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class TranslationCache:
+    """LRU + TTL cache of NL question -> Cypher translations.
+
+    Questions are keyed by their normalized content tokens, so word order,
+    case, diacritics and filler words ("điện thoại", "phones") do not matter.
+    A miss on the exact key falls back to a near-duplicate lookup: entries
+    whose numeric tokens, ``MEANING_WORDS`` ("duoi", "not", "cheapest",
+    ...) and model ``VARIANT_WORDS`` ("pro", "ultra", ...) are identical,
+    whose tokens are a subset/superset of the question's, and whose Jaccard similarity is at least
+    ``similarity_threshold``. With ``path`` every ``put`` rewrites the file;
+    saves are serialized and each writes its own temporary file.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 24 * 3600,
+        similarity_threshold: float = 0.75,
+        path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.path = path
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # value tokens -> keys, giới hạn phạm vi tìm kiếm gần đúng
+        self._by_values: Dict[FrozenSet[str], set] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    @staticmethod
+    def make_key(tokens: FrozenSet[str]) -> str:
+        return " ".join(sorted(tokens))
+
+    def _expired(self, entry: Dict) -> bool:
+        return self.ttl_seconds is not None and time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        values = _value_tokens(entry["tokens"])
+        keys = self._by_values.get(values)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_values[values]
+
+    def _lookup(self, tokens: FrozenSet[str]) -> Optional[str]:
+        key = self.make_key(tokens)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["cypher"]
+            self._remove(key)
+
+        best_key, best_score = None, 0.0
+        for candidate in list(self._by_values.get(_value_tokens(tokens), ())):
+            entry = self._entries[candidate]
+            if self._expired(entry):
+                self._remove(candidate)
+                continue
+            # Chỉ chấp nhận câu thêm/bớt từ, không chấp nhận thay từ (Samsung -> Apple)
+            if not (tokens <= entry["tokens"] or entry["tokens"] <= tokens):
+                continue
+            score = _jaccard(tokens, entry["tokens"])
+            if score > best_score:
+                best_key, best_score = candidate, score
+        if best_key is not None and best_score >= self.similarity_threshold:
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.near_hits += 1
+            return self._entries[best_key]["cypher"]
+
+        self.misses += 1
+        return None
+
+    def get(self, question: str) -> Optional[str]:
+        tokens = question_tokens(question)
+        with self._lock:
+            return self._lookup(tokens)
+
+    def put(self, question: str, cypher: str) -> None:
+        tokens = question_tokens(question)
+        key = self.make_key(tokens)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {"cypher": cypher, "tokens": tokens, "created_at": time.time()}
+            self._by_values.setdefault(_value_tokens(tokens), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        if self.path:
+            self.save()
+
+    def get_or_translate(self, question: str, translate: Callable[[str], str]) -> str:
+        cypher = self.get(question)
+        if cypher is None:
+            cypher = translate(question)
+            self.put(question, cypher)
+        return cypher
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_values.clear()
+            self.hits = self.near_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Lần lưu sau luôn ghi bản chụp mới hơn; file tạm riêng cho mỗi process/thread
+        with self._save_lock:
+            with self._lock:
+                data = [
+                    {"tokens": sorted(entry["tokens"]), "cypher": entry["cypher"], "created_at": entry["created_at"]}
+                    for entry in self._entries.values()
+                ]
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for item in data:
+            tokens = frozenset(item["tokens"])
+            entry = {"cypher": item["cypher"], "tokens": tokens, "created_at": item["created_at"]}
+            if self._expired(entry):
+                continue
+            key = self.make_key(tokens)
+            self._entries[key] = entry
+            self._by_values.setdefault(_value_tokens(tokens), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from etl import clean_frame, column_mapping, first_row_per_model, read_csv_data
+
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "documents.json"
+DEFAULT_BATCH_SIZE = 64
+
+class HashingEmbedder:
+    """Deterministic local embedder (feature hashing of words and char trigrams).
+
+    Implements the LangChain ``Embeddings`` methods so it can stand in for
+    ``OpenAIEmbeddings`` offline and in tests.
+    """
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype="float32")
+        words = re.findall(r"\w+", text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+def default_embedder():
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
+
+def embedder_name(embedder) -> str:
+    """Identity of an embedder, saved with the index: ``hashing:256``, ``openai:text-embedding-ada-002``, ..."""
+    if isinstance(embedder, HashingEmbedder):
+        return f"hashing:{embedder.dimension}"
+    model = getattr(embedder, "model", None)
+    if type(embedder).__name__ == "OpenAIEmbeddings":
+        return f"openai:{model}"
+    return f"{type(embedder).__name__}:{model}" if model else type(embedder).__name__
+
+def make_embedder(name: Optional[str] = None):
+    """Embedder for a name from ``embedder_name`` (None: the default OpenAI embedder)"""
+    if name is None:
+        return default_embedder()
+    kind, _, option = name.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(option)) if option else HashingEmbedder()
+    if kind == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=option) if option else OpenAIEmbeddings()
+    raise ValueError(f"unknown embedder {name!r} (expected hashing[:dimension] or openai[:model])")
+
+def spec_document(model_name: str, specs: Dict[str, str]) -> str:
+    """Render one model's attributes as a short text document"""
+    parts = [f"Model: {model_name}"]
+    parts.extend(f"{column}: {value}" for column, value in specs.items() if value)
+    return ". ".join(parts)
+
+def documents_from_csv(csv_file: str) -> Dict[str, str]:
+    df = first_row_per_model(clean_frame(read_csv_data(csv_file)))
+    documents = {}
+    columns = [column for column in column_mapping if column in df.columns]
+    for row in df.to_dict("records"):
+        model_name = row['Model Name']
+        specs = {column: row[column] for column in columns if row[column]}
+        documents[model_name] = spec_document(model_name, specs)
+    return documents
+
+def documents_from_graph(driver) -> Dict[str, str]:
+    # (relationship type, target property) -> CSV column, để dựng lại tài liệu giống CSV
+    columns = {(rel, prop): column for column, (rel, _, prop) in column_mapping.items()}
+    query = """
+        MATCH (m:Model)
+        OPTIONAL MATCH (m)-[r]->(t)
+        RETURN m.name AS name, collect([type(r), properties(t)]) AS targets
+    """
+    documents = {}
+    with driver.session() as session:
+        for record in session.run(query):
+            specs = {}
+            for rel_type, properties in record["targets"]:
+                for (rel, prop), column in columns.items():
+                    if rel == rel_type and properties and prop in properties:
+                        specs[column] = str(properties[prop])
+            documents[record["name"]] = spec_document(record["name"], specs)
+    return documents
+
+class VectorStore:
+    """FAISS inner-product index over per-model spec documents.
+
+    Vectors are L2-normalized (cosine similarity) and stored in an
+    ``IndexIDMap2`` so single models can be added, replaced or removed
+    without rebuilding the index. The saved index records the embedder's
+    name and dimension; ``load`` uses that embedder unless one is given, and
+    refuses an embedder that does not match.
+    """
+
+    def __init__(self, embedder=None, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.embedder = embedder if embedder is not None else default_embedder()
+        self.batch_size = batch_size
+        self.index = None
+        self.documents: Dict[int, Dict[str, str]] = {}
+        self.ids: Dict[str, int] = {}
+        self._next_id = 0
+        self._mmapped = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _check_dimension(self, matrix: np.ndarray) -> None:
+        if self.index is not None and matrix.shape[1] != self.index.d:
+            raise ValueError(
+                f"embedder {embedder_name(self.embedder)} returns {matrix.shape[1]}-dimensional vectors "
+                f"but the index holds {self.index.d}-dimensional ones; rebuild the index or use its embedder"
+            )
+
+    def _embed_batches(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self.embedder.embed_documents(texts[start:start + self.batch_size]))
+        matrix = np.asarray(vectors, dtype="float32")
+        self._check_dimension(matrix)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    def _writable_index(self, dimension: int):
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        elif self._mmapped:
+            # Index đang được map từ file chỉ đọc: sao chép vào bộ nhớ trước khi sửa
+            self.index = faiss.clone_index(self.index)
+            self._mmapped = False
+        return self.index
+
+    def add(self, documents: Dict[str, str]) -> None:
+        """Add or replace documents keyed by model name"""
+        if not documents:
+            return
+        self.remove(name for name in documents if name in self.ids)
+        names = list(documents)
+        matrix = self._embed_batches([documents[name] for name in names])
+        index = self._writable_index(matrix.shape[1])
+        ids = np.arange(self._next_id, self._next_id + len(names), dtype="int64")
+        index.add_with_ids(matrix, ids)
+        for name, doc_id in zip(names, ids.tolist()):
+            self.ids[name] = doc_id
+            self.documents[doc_id] = {"name": name, "text": documents[name]}
+        self._next_id += len(names)
+
+    def remove(self, names: Iterable[str]) -> int:
+        doc_ids = [self.ids.pop(name) for name in list(names) if name in self.ids]
+        if not doc_ids or self.index is None:
+            return 0
+        index = self._writable_index(self.index.d)
+        index.remove_ids(np.asarray(doc_ids, dtype="int64"))
+        for doc_id in doc_ids:
+            self.documents.pop(doc_id, None)
+        return len(doc_ids)
+
+    def sync(self, documents: Dict[str, str]) -> Tuple[int, int]:
+        """Bring the index in line with ``documents``, re-embedding only what changed"""
+        removed = self.remove([name for name in list(self.ids) if name not in documents])
+        changed = {
+            name: text for name, text in documents.items()
+            if name not in self.ids or self.documents[self.ids[name]]["text"] != text
+        }
+        self.add(changed)
+        return len(changed), removed
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, str, float]]:
+        """Return the top-k (model name, document, score) for a query"""
+        if self.index is None or not self.ids:
+            return []
+        vector = np.asarray([self.embedder.embed_query(query)], dtype="float32")
+        self._check_dimension(vector)
+        faiss.normalize_L2(vector)
+        scores, ids = self.index.search(vector, min(k, len(self.ids)))
+        results = []
+        for score, doc_id in zip(scores[0].tolist(), ids[0].tolist()):
+            document = self.documents.get(doc_id)
+            if document is not None:
+                results.append((document["name"], document["text"], score))
+        return results
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(directory, INDEX_FILE))
+        with open(os.path.join(directory, DOCS_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "embedder": {"name": embedder_name(self.embedder), "dimension": self.index.d},
+                    "next_id": self._next_id,
+                    "documents": {str(k): v for k, v in self.documents.items()},
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, directory: str, embedder=None, mmap: bool = True, **kwargs) -> "VectorStore":
+        """Open a saved index with the embedder it was built with (or ``embedder``, which must match)"""
+        with open(os.path.join(directory, DOCS_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Index cũ không ghi embedder: giả định embedder mặc định
+        saved = data.get("embedder", {}).get("name")
+        if embedder is None:
+            embedder = make_embedder(saved)
+        elif saved is not None and embedder_name(embedder) != saved:
+            raise ValueError(
+                f"index in {directory} was built with embedder {saved}, not {embedder_name(embedder)}; "
+                f"rebuild it or load it with its own embedder"
+            )
+        store = cls(embedder, **kwargs)
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        store.index = faiss.read_index(os.path.join(directory, INDEX_FILE), flags)
+        store._mmapped = mmap
+        dimension = data.get("embedder", {}).get("dimension")
+        if dimension is not None and dimension != store.index.d:
+            raise ValueError(f"{DOCS_FILE} in {directory} records dimension {dimension}, index has {store.index.d}")
+        store._next_id = data["next_id"]
+        store.documents = {int(k): v for k, v in data["documents"].items()}
+        store.ids = {v["name"]: k for k, v in store.documents.items()}
+        return store
+
+    @classmethod
+    def build(cls, documents: Dict[str, str], embedder=None, **kwargs) -> "VectorStore":
+        store = cls(embedder, **kwargs)
+        store.add(documents)
+        return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the FAISS index of model spec documents")
+    parser.add_argument("--csv", default="data/Mobiles-Dataset(2025).csv")
+    parser.add_argument("--out", default="vector_index")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--local", action="store_true", help="use the offline hashing embedder")
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder() if args.local else None
+    documents = documents_from_csv(args.csv)
+    if os.path.exists(os.path.join(args.out, INDEX_FILE)):
+        store = VectorStore.load(args.out, embedder, mmap=False, batch_size=args.batch_size)
+        changed, removed = store.sync(documents)
+        print(f"Updated index: {changed} added/changed, {removed} removed")
+    else:
+        store = VectorStore.build(documents, embedder, batch_size=args.batch_size)
+        print(f"Built index with {len(store)} documents")
+    store.save(args.out)
+    print(f"Index written to {args.out}")
+
+if __name__ == "__main__":
+    main()